@@ -77,24 +77,22 @@ class DocumentAdmin(GuardedModelAdmin):
     created_.short_description = "Created"
 
     def delete_queryset(self, request, queryset):
-        from documents import index
+        from documents.search import get_search_backend
 
-        with index.open_index_writer() as writer:
-            for o in queryset:
-                index.remove_document(writer, o)
+        get_search_backend().remove_documents([o.pk for o in queryset])
 
         super().delete_queryset(request, queryset)
 
     def delete_model(self, request, obj):
-        from documents import index
+        from documents.search import get_search_backend
 
-        index.remove_document_from_index(obj)
+        get_search_backend().remove_document(obj)
         super().delete_model(request, obj)
 
     def save_model(self, request, obj, form, change):
-        from documents import index
+        from documents.search import get_search_backend
 
-        index.add_or_update_document(obj)
+        get_search_backend().add_or_update_document(obj)
         super().save_model(request, obj, form, change)
 
 
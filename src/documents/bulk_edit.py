@@ -2,6 +2,7 @@ import itertools
 
 from django.db.models import Q
 
+from documents.classifier import classifier_labels_changed
 from documents.models import Correspondent
 from documents.models import Document
 from documents.models import DocumentType
@@ -18,6 +19,7 @@ def set_correspondent(doc_ids, correspondent):
     qs = Document.objects.filter(Q(id__in=doc_ids) & ~Q(correspondent=correspondent))
     affected_docs = [doc.id for doc in qs]
     qs.update(correspondent=correspondent)
+    classifier_labels_changed()
 
     bulk_update_documents.delay(document_ids=affected_docs)
 
@@ -33,6 +35,7 @@ def set_storage_path(doc_ids, storage_path):
     )
     affected_docs = [doc.id for doc in qs]
     qs.update(storage_path=storage_path)
+    classifier_labels_changed()
 
     bulk_update_documents.delay(
         document_ids=affected_docs,
@@ -48,6 +51,7 @@ def set_document_type(doc_ids, document_type):
     qs = Document.objects.filter(Q(id__in=doc_ids) & ~Q(document_type=document_type))
     affected_docs = [doc.id for doc in qs]
     qs.update(document_type=document_type)
+    classifier_labels_changed()
 
     bulk_update_documents.delay(document_ids=affected_docs)
 
@@ -63,6 +67,7 @@ def add_tag(doc_ids, tag):
     DocumentTagRelationship.objects.bulk_create(
         [DocumentTagRelationship(document_id=doc, tag_id=tag) for doc in affected_docs],
     )
+    classifier_labels_changed()
 
     bulk_update_documents.delay(document_ids=affected_docs)
 
@@ -78,6 +83,7 @@ def remove_tag(doc_ids, tag):
     DocumentTagRelationship.objects.filter(
         Q(document_id__in=affected_docs) & Q(tag_id=tag),
     ).delete()
+    classifier_labels_changed()
 
     bulk_update_documents.delay(document_ids=affected_docs)
 
@@ -102,6 +108,7 @@ def modify_tags(doc_ids, add_tags, remove_tags):
         ],
         ignore_conflicts=True,
     )
+    classifier_labels_changed()
 
     bulk_update_documents.delay(document_ids=affected_docs)
 
@@ -111,11 +118,9 @@ def modify_tags(doc_ids, add_tags, remove_tags):
 def delete(doc_ids):
     Document.objects.filter(id__in=doc_ids).delete()
 
-    from documents import index
+    from documents.search import get_search_backend
 
-    with index.open_index_writer() as writer:
-        for id in doc_ids:
-            index.remove_document_by_id(writer, id)
+    get_search_backend().remove_documents(doc_ids)
 
     return "OK"
 
@@ -2,8 +2,10 @@ import textwrap
 
 from django.conf import settings
 from django.core.checks import Error
+from django.core.checks import Warning
 from django.core.checks import register
 from django.core.exceptions import FieldError
+from django.db import connection
 from django.db.utils import OperationalError
 from django.db.utils import ProgrammingError
 
@@ -65,3 +67,36 @@ def parser_check(app_configs, **kwargs):
         ]
     else:
         return []
+
+
+@register()
+def search_backend_check(app_configs, **kwargs):
+    from documents.search import SEARCH_BACKENDS
+
+    if settings.SEARCH_BACKEND not in SEARCH_BACKENDS:
+        return [
+            Error(
+                f"Unknown search backend {settings.SEARCH_BACKEND}, use one of "
+                f"{', '.join(SEARCH_BACKENDS)}.",
+            ),
+        ]
+    if settings.SEARCH_BACKEND != "sqlite":
+        return []
+    if connection.vendor != "sqlite":
+        return [
+            Error(
+                "The SQLite search backend requires an SQLite database, use "
+                "the whoosh search backend with other databases.",
+            ),
+        ]
+
+    from documents.search import database_index_exists
+
+    if not database_index_exists():
+        return [
+            Warning(
+                "The full text index of the SQLite search backend does not "
+                "exist yet. Create it with the document_index reindex command.",
+            ),
+        ]
+    return []
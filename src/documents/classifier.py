@@ -1,18 +1,40 @@
+import json
 import logging
 import os
-import pickle
 import re
-import warnings
+import sqlite3
+import threading
+import uuid
+from collections import Counter
+from collections import defaultdict
+from collections.abc import Container
+from collections.abc import Iterable
 from collections.abc import Iterator
+from dataclasses import dataclass
+from dataclasses import field
 from datetime import datetime
 from hashlib import sha256
+from itertools import islice
 from pathlib import Path
 from typing import Optional
 
 from django.conf import settings
-
+from django.core.cache import cache
+from django.db.models import BigIntegerField
+from django.db.models import Count
+from django.db.models import F
+from django.db.models import Max
+from django.db.models import Sum
+from django.db.models import Value
+from django.db.models.functions import Cast
+from django.db.models.functions import Mod
+
+from documents.models import Correspondent
 from documents.models import Document
+from documents.models import DocumentType
 from documents.models import MatchingModel
+from documents.models import StoragePath
+from documents.models import Tag
 
 logger = logging.getLogger("paperless.classifier")
 
@@ -25,14 +47,142 @@ class ClassifierModelCorruptError(Exception):
     pass
 
 
-def load_classifier() -> Optional["DocumentClassifier"]:
+@dataclass(frozen=True)
+class ClassifierPrediction:
+    """
+    The predicted primary keys of the AUTO matching models for a document
+    """
+
+    correspondent: Optional[int] = None
+    document_type: Optional[int] = None
+    tags: list[int] = field(default_factory=list)
+    storage_path: Optional[int] = None
+
+
+# The classifier loaded by this process, with the stat key of its model file
+_classifier_cache: Optional[tuple[tuple, "DocumentClassifier"]] = None
+_classifier_cache_lock = threading.Lock()
+_classifier_cache_stats: Counter = Counter(hits=0, misses=0, reloads=0)
+
+
+def get_classifier_cache_stats() -> dict[str, int]:
+    """
+    Returns how often load_classifier() used the cached classifier (hits),
+    loaded it for the first time (misses) or loaded it again because the
+    model file changed (reloads).
+    """
+    return dict(_classifier_cache_stats)
+
+
+CLASSIFIER_LABELS_VERSION_KEY = "classifier_labels_version"
+
+
+def _get_labels_version() -> Optional[str]:
+    """
+    Returns the version of the label assignments of all documents, which
+    changes whenever they change without a change of the documents, or None
+    if the cache is not available
+    """
+    try:
+        version = cache.get(CLASSIFIER_LABELS_VERSION_KEY)
+        if version is None:
+            # First use or evicted, either way a new version
+            cache.add(CLASSIFIER_LABELS_VERSION_KEY, uuid.uuid4().hex, None)
+            version = cache.get(CLASSIFIER_LABELS_VERSION_KEY)
+        return version
+    except Exception as e:
+        logger.debug(f"Could not read the version of the labels: {e}")
+        return None
+
+
+def classifier_labels_changed() -> None:
+    """
+    Tells the classifier that labels of documents changed, for changes which
+    do not update the modification time of the documents
+    """
+    try:
+        cache.set(CLASSIFIER_LABELS_VERSION_KEY, uuid.uuid4().hex, None)
+    except Exception as e:
+        logger.warning(f"Could not update the version of the labels: {e}")
+
+
+# Name of the pickled model file of earlier versions, next to MODEL_FILE
+LEGACY_MODEL_FILE_NAME = "classification_model.pickle"
+
+
+def remove_legacy_model_file() -> None:
+    """
+    Removes the pickled model file of earlier versions, which cannot be
+    loaded anymore. The classifier is trained again into MODEL_FILE.
+    """
+    legacy_file = Path(settings.MODEL_FILE).with_name(LEGACY_MODEL_FILE_NAME)
+    if legacy_file != Path(settings.MODEL_FILE) and legacy_file.is_file():
+        logger.info(f"Removing the model file of an earlier version {legacy_file}")
+        try:
+            legacy_file.unlink()
+        except OSError as e:
+            logger.warning(f"Could not remove {legacy_file}: {e}")
+
+
+def clear_classifier_cache() -> None:
+    global _classifier_cache
+    with _classifier_cache_lock:
+        _classifier_cache = None
+
+
+def _model_file_key() -> tuple:
+    # Saving the model renames a new file into place, which changes these
+    stat = os.stat(settings.MODEL_FILE)
+    return (str(settings.MODEL_FILE), stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def load_classifier(use_cache: bool = True) -> Optional["DocumentClassifier"]:
+    """
+    Loads the classifier from the model file. Unless use_cache is False, the
+    loaded classifier is kept for the lifetime of the process and only
+    loaded again when the model file changed.
+    """
+    global _classifier_cache
+
     if not os.path.isfile(settings.MODEL_FILE):
         logger.debug(
             "Document classification model does not exist (yet), not "
             "performing automatic matching.",
         )
+        clear_classifier_cache()
         return None
 
+    if not use_cache:
+        return _load_classifier()
+
+    with _classifier_cache_lock:
+        try:
+            key = _model_file_key()
+        except OSError:
+            logger.exception("IO error while loading document classification model")
+            return None
+
+        if _classifier_cache is not None and _classifier_cache[0] == key:
+            _classifier_cache_stats["hits"] += 1
+            return _classifier_cache[1]
+
+        if _classifier_cache is None:
+            _classifier_cache_stats["misses"] += 1
+        else:
+            _classifier_cache_stats["reloads"] += 1
+            stats = get_classifier_cache_stats()
+            logger.info(
+                f"Document classification model changed, reloading. Loaded "
+                f"from cache {stats['hits']} times, from the file "
+                f"{stats['misses'] + stats['reloads']} times",
+            )
+
+        classifier = _load_classifier()
+        _classifier_cache = (key, classifier) if classifier is not None else None
+        return classifier
+
+
+def _load_classifier() -> Optional["DocumentClassifier"]:
     classifier = DocumentClassifier()
     try:
         classifier.load()
@@ -59,17 +209,443 @@ def load_classifier() -> Optional["DocumentClassifier"]:
     return classifier
 
 
+# The model file starts with this, followed by the length of a JSON header
+# and the header itself. The header describes the arrays which follow, each
+# aligned so it can be memory mapped directly from the file.
+MODEL_FILE_MAGIC = b"PAPERLESS-CLASSIFIER\n"
+MODEL_FILE_ALIGNMENT = 64
+
+
+class _UnknownModelFileError(Exception):
+    pass
+
+
+def _align(offset: int) -> int:
+    return -(-offset // MODEL_FILE_ALIGNMENT) * MODEL_FILE_ALIGNMENT
+
+
+def _write_model_file(path: Path, header: dict, arrays: dict) -> None:
+    import numpy as np
+
+    offset = 0
+    layout = {}
+    for name, array in arrays.items():
+        layout[name] = {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset,
+        }
+        offset = _align(offset + array.nbytes)
+
+    header_bytes = json.dumps({**header, "arrays": layout}).encode()
+    data_start = _align(len(MODEL_FILE_MAGIC) + 8 + len(header_bytes))
+
+    with open(path, "wb") as f:
+        f.write(MODEL_FILE_MAGIC)
+        f.write(len(header_bytes).to_bytes(8, "little"))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(np.ascontiguousarray(array).tobytes())
+        # Pad the file, so the last array can be mapped in whole pages
+        f.truncate(data_start + offset)
+
+
+def _read_model_file(path: Path) -> tuple[dict, dict]:
+    """
+    Reads the header of the model file and maps its arrays into memory.
+    The arrays are mapped copy-on-write, so processes loading the same file
+    share their memory until they modify them.
+    """
+    import numpy as np
+
+    with open(path, "rb") as f:
+        if f.read(len(MODEL_FILE_MAGIC)) != MODEL_FILE_MAGIC:
+            raise _UnknownModelFileError
+        try:
+            header_length = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(header_length))
+        except ValueError as err:
+            raise ClassifierModelCorruptError from err
+    data_start = _align(len(MODEL_FILE_MAGIC) + 8 + header_length)
+
+    arrays = {}
+    try:
+        for name, layout in header["arrays"].items():
+            dtype = np.dtype(layout["dtype"])
+            shape = tuple(layout["shape"])
+            if not all(shape):
+                # Empty arrays cannot be mapped
+                arrays[name] = np.empty(shape, dtype=dtype)
+                continue
+            arrays[name] = np.memmap(
+                path,
+                dtype=dtype,
+                mode="c",
+                offset=data_start + layout["offset"],
+                shape=shape,
+            )
+    except (KeyError, TypeError, ValueError) as err:
+        raise ClassifierModelCorruptError from err
+    return header, arrays
+
+
+def _to_hex(value: Optional[bytes]) -> Optional[str]:
+    return value.hex() if value is not None else None
+
+
+def _from_hex(value: Optional[str]) -> Optional[bytes]:
+    return bytes.fromhex(value) if value is not None else None
+
+
+def _json_params(estimator) -> dict:
+    """
+    Returns the parameters of the estimator which can be stored as JSON
+    """
+    return {
+        name: list(value) if isinstance(value, tuple) else value
+        for name, value in estimator.get_params().items()
+        if isinstance(value, (str, int, float, bool, tuple, type(None)))
+    }
+
+
+def _set_json_params(estimator, params: dict) -> None:
+    # Parameters which the installed scikit-learn does not know are ignored
+    known = estimator.get_params()
+    estimator.set_params(
+        **{
+            name: tuple(value) if isinstance(value, list) else value
+            for name, value in params.items()
+            if name in known
+        },
+    )
+
+
+def _export_vectorizer(vectorizer, header: dict, arrays: dict) -> None:
+    import numpy as np
+
+    if vectorizer is None:
+        header["vectorizer"] = None
+        return
+    header["vectorizer"] = {"params": _json_params(vectorizer)}
+    # Terms never contain line breaks, see preprocess_content()
+    terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    arrays["vectorizer.terms"] = np.frombuffer(
+        "\n".join(terms).encode(),
+        dtype=np.uint8,
+    )
+
+
+def _restore_vectorizer(header: dict, arrays: dict):
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    if header["vectorizer"] is None:
+        return None
+    vectorizer = CountVectorizer()
+    _set_json_params(vectorizer, header["vectorizer"]["params"])
+    terms = bytes(arrays["vectorizer.terms"]).decode()
+    vectorizer.vocabulary_ = {
+        term: index for index, term in enumerate(terms.split("\n") if terms else [])
+    }
+    vectorizer.fixed_vocabulary_ = False
+    vectorizer.stop_words_ = None
+    return vectorizer
+
+
+def _export_binarizer(binarizer, header: dict, arrays: dict) -> None:
+    from sklearn.preprocessing import MultiLabelBinarizer
+
+    if binarizer is None:
+        header["binarizer"] = None
+        return
+    header["binarizer"] = {
+        "multilabel": isinstance(binarizer, MultiLabelBinarizer),
+    }
+    arrays["binarizer.classes"] = binarizer.classes_
+
+
+def _restore_binarizer(header: dict, arrays: dict):
+    from sklearn.preprocessing import LabelBinarizer
+    from sklearn.preprocessing import MultiLabelBinarizer
+
+    if header["binarizer"] is None:
+        return None
+    classes = arrays["binarizer.classes"]
+    if header["binarizer"]["multilabel"]:
+        return MultiLabelBinarizer().fit([classes.tolist()])
+    return LabelBinarizer().fit(classes)
+
+
+def _export_mlp(name: str, classifier, header: dict, arrays: dict) -> None:
+    if classifier is None:
+        header[name] = None
+        return
+    # Only the public fitted state, which is all predicting needs
+    header[name] = {
+        "params": _json_params(classifier),
+        "multilabel": (
+            classifier.out_activation_ == "logistic" and classifier.n_outputs_ > 1
+        ),
+        "n_features_in": classifier.n_features_in_,
+        "out_activation": classifier.out_activation_,
+        "n_layers": classifier.n_layers_,
+    }
+    arrays[f"{name}.classes"] = classifier.classes_
+    for i, (coefs, intercepts) in enumerate(
+        zip(classifier.coefs_, classifier.intercepts_),
+    ):
+        arrays[f"{name}.coefs.{i}"] = coefs
+        arrays[f"{name}.intercepts.{i}"] = intercepts
+
+
+def _restore_mlp(name: str, header: dict, arrays: dict):
+    """
+    Restores the classifier by setting its fitted state directly, with the
+    weights mapped from the model file. This includes private attributes
+    which partial_fit() needs, so the model file is only loaded by the
+    scikit-learn version which saved it, see DocumentClassifier.load(). A
+    stored state which does not fit the classifier of the installed
+    scikit-learn raises IncompatibleClassifierVersionError.
+    """
+    import numpy as np
+    from sklearn.neural_network import MLPClassifier
+    from sklearn.preprocessing import LabelBinarizer
+
+    state = header[name]
+    if state is None:
+        return None
+
+    classifier = MLPClassifier()
+    _set_json_params(classifier, state["params"])
+
+    classes = arrays[f"{name}.classes"]
+    label_binarizer = LabelBinarizer()
+    if state["multilabel"]:
+        # Fitted to the label indicator matrix, as MLPClassifier.fit() does
+        label_binarizer.fit(np.eye(len(classes), dtype=int))
+    else:
+        label_binarizer.fit(classes)
+
+    if label_binarizer.y_type_ == "multiclass":
+        out_activation, n_outputs = "softmax", len(classes)
+    elif label_binarizer.y_type_ == "multilabel-indicator":
+        out_activation, n_outputs = "logistic", len(classes)
+    else:
+        out_activation, n_outputs = "logistic", 1
+
+    coefs = [arrays[f"{name}.coefs.{i}"] for i in range(state["n_layers"] - 1)]
+    intercepts = [
+        arrays[f"{name}.intercepts.{i}"] for i in range(state["n_layers"] - 1)
+    ]
+    layer_units = [state["n_features_in"]] + [i.shape[0] for i in intercepts]
+    if (
+        state["out_activation"] != out_activation
+        or not np.array_equal(label_binarizer.classes_, classes)
+        or layer_units[-1] != n_outputs
+        or [c.shape for c in coefs] != list(zip(layer_units[:-1], layer_units[1:]))
+    ):
+        raise IncompatibleClassifierVersionError(
+            f"Cannot load classifier, stored {name} classifier does not fit.",
+        )
+
+    # The state MLPClassifier._initialize() sets up, with the stored weights
+    classifier._label_binarizer = label_binarizer
+    classifier.classes_ = label_binarizer.classes_
+    classifier.n_features_in_ = state["n_features_in"]
+    classifier.n_outputs_ = n_outputs
+    classifier.n_layers_ = state["n_layers"]
+    classifier.out_activation_ = out_activation
+    classifier.coefs_ = coefs
+    classifier.intercepts_ = intercepts
+    classifier.n_iter_ = 0
+    classifier.t_ = 0
+    classifier.loss_curve_ = []
+    classifier._no_improvement_count = 0
+    if classifier.early_stopping:
+        classifier.validation_scores_ = []
+        classifier.best_validation_score_ = -np.inf
+        classifier.best_loss_ = None
+    else:
+        classifier.validation_scores_ = None
+        classifier.best_validation_score_ = None
+        classifier.best_loss_ = np.inf
+
+    try:
+        classifier.predict(np.zeros((1, state["n_features_in"])))
+    except (AttributeError, TypeError, ValueError) as err:
+        raise IncompatibleClassifierVersionError(
+            f"Cannot load classifier, restored {name} classifier does not work.",
+        ) from err
+    return classifier
+
+
+class PreprocessedTextCache:
+    """
+    Stores the preprocessed content of documents in a SQLite database under
+    the data directory, keyed by document id and a checksum of the content.
+    Documents with unchanged content are then not preprocessed again, and
+    a changed content simply no longer matches its stored checksum.
+    """
+
+    # Maximum number of parameters in a single query
+    BATCH_SIZE = 500
+
+    def __init__(self, path: Path, version: str):
+        self.path = path
+        self.version = version
+        # Opened once and used by all threads of the process, one at a time
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def checksum(content: str) -> bytes:
+        return sha256(content.encode()).digest()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is not None:
+            return self._connection
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        connection.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS texts (
+                document_id INTEGER PRIMARY KEY,
+                checksum BLOB NOT NULL,
+                text TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS texts_checksum ON texts (checksum);
+            """,
+        )
+        # Texts preprocessed with other settings are of no use
+        row = connection.execute(
+            "SELECT value FROM meta WHERE key = 'version'",
+        ).fetchone()
+        if row is None or row[0] != self.version:
+            with connection:
+                connection.execute("DELETE FROM texts")
+                connection.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('version', ?)",
+                    (self.version,),
+                )
+        self._connection = connection
+        return connection
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def get_many(self, checksums: list[bytes]) -> dict[bytes, str]:
+        """
+        Returns the stored texts for the given content checksums
+        """
+        texts = {}
+        with self._lock:
+            connection = self._connect()
+            for i in range(0, len(checksums), self.BATCH_SIZE):
+                batch = checksums[i : i + self.BATCH_SIZE]
+                texts.update(
+                    connection.execute(
+                        "SELECT checksum, text FROM texts WHERE checksum IN "
+                        f"({', '.join('?' * len(batch))})",
+                        batch,
+                    ),
+                )
+        return texts
+
+    def set_many(self, rows: list[tuple[int, bytes, str]]) -> None:
+        """
+        Stores the (document id, checksum, text) rows, replacing any text
+        stored for the documents before
+        """
+        with self._lock, self._connect() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO texts VALUES (?, ?, ?)",
+                rows,
+            )
+
+    def prune(self, document_ids: Container[int]) -> int:
+        """
+        Removes the texts of all documents but the given ones, for example of
+        deleted documents. Returns the number of texts removed.
+        """
+        with self._lock, self._connect() as connection:
+            stale = [
+                (document_id,)
+                for (document_id,) in connection.execute(
+                    "SELECT document_id FROM texts",
+                )
+                if document_id not in document_ids
+            ]
+            connection.executemany("DELETE FROM texts WHERE document_id = ?", stale)
+        return len(stale)
+
+
+_preprocessed_text_cache: Optional[PreprocessedTextCache] = None
+_preprocessed_text_cache_pid: Optional[int] = None
+_preprocessed_text_cache_lock = threading.Lock()
+
+
+def get_preprocessed_text_cache() -> PreprocessedTextCache:
+    """
+    Returns the cache of this process, which keeps its database connection
+    open between uses
+    """
+    global _preprocessed_text_cache, _preprocessed_text_cache_pid
+    path = Path(settings.PREPROCESSED_TEXT_FILE)
+    # Preprocessing depends on these
+    version = (
+        f"{DocumentClassifier.FORMAT_VERSION}:{settings.NLTK_ENABLED}:"
+        f"{settings.NLTK_LANGUAGE}"
+    )
+    with _preprocessed_text_cache_lock:
+        cache = _preprocessed_text_cache
+        if _preprocessed_text_cache_pid != os.getpid():
+            # The connection of the parent process is not usable after forking
+            cache = None
+        elif cache is not None and (cache.path, cache.version) != (path, version):
+            cache.close()
+            cache = None
+        if cache is None:
+            cache = PreprocessedTextCache(path, version)
+            _preprocessed_text_cache = cache
+            _preprocessed_text_cache_pid = os.getpid()
+        return cache
+
+
 class DocumentClassifier:
     # v7 - Updated scikit-learn package version
     # v8 - Added storage path classifier
     # v9 - Changed from hashing to time/ids for re-train check
-    FORMAT_VERSION = 9
+    # v10 - Added document hashes for incremental training
+    # v11 - Added training data fingerprint for a cheap re-train check
+    # v12 - Replaced pickle with a memory mappable format
+    FORMAT_VERSION = 12
+
+    # Passes over the changed documents when training incrementally
+    INCREMENTAL_EPOCHS = 5
+
+    # Number of documents fetched from the database at once during training
+    TRAINING_CHUNK_SIZE = 2000
+
+    # Number of predictions of the last batch kept for the predict_ methods
+    PREDICTIONS_CACHE_SIZE = 1000
 
     def __init__(self):
         # last time a document changed and therefore training might be required
         self.last_doc_change_time: Optional[datetime] = None
         # Hash of primary keys of AUTO matching values last used in training
         self.last_auto_type_hash: Optional[bytes] = None
+        # Hash of content and labels of each document last used in training
+        self._document_hashes: Optional[dict[int, bytes]] = {}
+        self._document_hash_arrays = None
+        # Fingerprint of the training data, see _training_fingerprint()
+        self.training_fingerprint: Optional[bytes] = None
+        # Whether train() updated only the fingerprint, which is worth saving
+        # to skip checking the training data document by document next time
+        self.fingerprint_changed = False
 
         self.data_vectorizer = None
         self.tags_binarizer = None
@@ -81,64 +657,221 @@ class DocumentClassifier:
         self._stemmer = None
         self._stop_words = None
 
+        # Predictions of the last batch of each thread, by document id and
+        # checksum of the content, see predict_all()
+        self._local = threading.local()
+
+    @property
+    def document_hashes(self) -> dict[int, bytes]:
+        if self._document_hashes is None:
+            ids, hashes = self._document_hash_arrays
+            hashes = hashes.tobytes()
+            size = sha256().digest_size
+            self._document_hashes = {
+                document_id: hashes[i * size : (i + 1) * size]
+                for i, document_id in enumerate(ids.tolist())
+            }
+            self._document_hash_arrays = None
+        return self._document_hashes
+
+    @document_hashes.setter
+    def document_hashes(self, value: dict[int, bytes]) -> None:
+        self._document_hashes = value
+        self._document_hash_arrays = None
+
     def load(self) -> None:
-        # Catch warnings for processing
-        with warnings.catch_warnings(record=True) as w:
-            with open(settings.MODEL_FILE, "rb") as f:
-                schema_version = pickle.load(f)
-
-                if schema_version != self.FORMAT_VERSION:
-                    raise IncompatibleClassifierVersionError(
-                        "Cannot load classifier, incompatible versions.",
-                    )
-                else:
-                    try:
-                        self.last_doc_change_time = pickle.load(f)
-                        self.last_auto_type_hash = pickle.load(f)
-
-                        self.data_vectorizer = pickle.load(f)
-                        self.tags_binarizer = pickle.load(f)
-
-                        self.tags_classifier = pickle.load(f)
-                        self.correspondent_classifier = pickle.load(f)
-                        self.document_type_classifier = pickle.load(f)
-                        self.storage_path_classifier = pickle.load(f)
-                    except Exception as err:
-                        raise ClassifierModelCorruptError from err
-
-            # Check for the warning about unpickling from differing versions
-            # and consider it incompatible
-            sk_learn_warning_url = (
-                "https://scikit-learn.org/stable/"
-                "model_persistence.html"
-                "#security-maintainability-limitations"
+        try:
+            header, arrays = _read_model_file(settings.MODEL_FILE)
+        except _UnknownModelFileError as err:
+            raise IncompatibleClassifierVersionError(
+                "Cannot load classifier, unknown model file format.",
+            ) from err
+
+        from sklearn import __version__ as sklearn_version
+
+        if header.get("version") != self.FORMAT_VERSION:
+            raise IncompatibleClassifierVersionError(
+                "Cannot load classifier, incompatible versions.",
+            )
+        if header.get("sklearn_version") != sklearn_version:
+            raise IncompatibleClassifierVersionError(
+                "Cannot load classifier, saved by another scikit-learn version.",
+            )
+
+        try:
+            if header["last_doc_change_time"] is not None:
+                self.last_doc_change_time = datetime.fromisoformat(
+                    header["last_doc_change_time"],
+                )
+            self.last_auto_type_hash = _from_hex(header["last_auto_type_hash"])
+            self.training_fingerprint = _from_hex(header["training_fingerprint"])
+            # Only training needs these, so they are not unpacked right away
+            self._document_hashes = None
+            self._document_hash_arrays = (
+                arrays["document_hashes.ids"],
+                arrays["document_hashes.hashes"],
+            )
+
+            self.data_vectorizer = _restore_vectorizer(header, arrays)
+            self.tags_binarizer = _restore_binarizer(header, arrays)
+
+            self.tags_classifier = _restore_mlp("tags", header, arrays)
+            self.correspondent_classifier = _restore_mlp(
+                "correspondent",
+                header,
+                arrays,
+            )
+            self.document_type_classifier = _restore_mlp(
+                "document_type",
+                header,
+                arrays,
+            )
+            self.storage_path_classifier = _restore_mlp(
+                "storage_path",
+                header,
+                arrays,
             )
-            for warning in w:
-                if issubclass(warning.category, UserWarning):
-                    w_msg = str(warning.message)
-                    if sk_learn_warning_url in w_msg:
-                        raise IncompatibleClassifierVersionError
+        except IncompatibleClassifierVersionError:
+            raise
+        except Exception as err:
+            raise ClassifierModelCorruptError from err
+
+        self._local = threading.local()
 
     def save(self):
+        import numpy as np
+        from sklearn import __version__ as sklearn_version
+
+        header = {
+            "version": self.FORMAT_VERSION,
+            "sklearn_version": sklearn_version,
+            "last_doc_change_time": (
+                self.last_doc_change_time.isoformat()
+                if self.last_doc_change_time is not None
+                else None
+            ),
+            "last_auto_type_hash": _to_hex(self.last_auto_type_hash),
+            "training_fingerprint": _to_hex(self.training_fingerprint),
+        }
+        arrays = {
+            "document_hashes.ids": np.fromiter(
+                self.document_hashes.keys(),
+                dtype=np.int64,
+                count=len(self.document_hashes),
+            ),
+            "document_hashes.hashes": np.frombuffer(
+                b"".join(self.document_hashes.values()),
+                dtype=np.uint8,
+            ).reshape(len(self.document_hashes), sha256().digest_size),
+        }
+
+        _export_vectorizer(self.data_vectorizer, header, arrays)
+        _export_binarizer(self.tags_binarizer, header, arrays)
+
+        _export_mlp("tags", self.tags_classifier, header, arrays)
+        _export_mlp("correspondent", self.correspondent_classifier, header, arrays)
+        _export_mlp("document_type", self.document_type_classifier, header, arrays)
+        _export_mlp("storage_path", self.storage_path_classifier, header, arrays)
+
         target_file: Path = settings.MODEL_FILE
-        target_file_temp = target_file.with_suffix(".pickle.part")
+        target_file_temp = target_file.with_name(f"{target_file.name}.part")
 
-        with open(target_file_temp, "wb") as f:
-            pickle.dump(self.FORMAT_VERSION, f)
+        _write_model_file(target_file_temp, header, arrays)
 
-            pickle.dump(self.last_doc_change_time, f)
-            pickle.dump(self.last_auto_type_hash, f)
+        target_file_temp.rename(target_file)
 
-            pickle.dump(self.data_vectorizer, f)
+    def _training_rows(self, docs_queryset, *fields: str) -> Iterator[tuple]:
+        """
+        Streams the given fields of the training documents in a stable order,
+        fetching only a chunk of documents into memory at a time
+        """
+        return (
+            docs_queryset.order_by("pk")
+            .values_list(*fields)
+            .iterator(chunk_size=self.TRAINING_CHUNK_SIZE)
+        )
+
+    def _training_fingerprint(self, docs_queryset) -> tuple[int, Optional[bytes]]:
+        """
+        Summarizes the training data in the database without fetching any
+        rows: the number of documents, the time of the latest change, the
+        number of the documents of every AUTO label and a sum of hashes of
+        their (document id, label id) pairs, the AUTO matching models and the
+        version of the label assignments.
+        Labels can change without changing the modification time of a
+        document, for example by bulk edits, which change the version.
+
+        Returns the number of documents and the fingerprint, which is None if
+        the version of the label assignments is not available.
+        """
+        labels_version = _get_labels_version()
 
-            pickle.dump(self.tags_binarizer, f)
-            pickle.dump(self.tags_classifier, f)
+        documents = docs_queryset.aggregate(
+            num_documents=Count("pk"),
+            latest=Max("modified"),
+        )
+        num_documents = documents["num_documents"]
+        latest = documents["latest"]
+
+        if labels_version is None:
+            return num_documents, None
+
+        def pair_hash(document: str, label: str):
+            # Unlike a sum of the ids, a sum of these changes when labels are
+            # moved between documents. Both factors are below 2**20, so the
+            # sum does not overflow for less than 2**23 documents.
+            document = Cast(F(document), BigIntegerField())
+            label = Cast(F(label), BigIntegerField())
+            return Mod(document * 1000003 + label, 1048573) * Mod(
+                label * 1000033 + document * 7919,
+                1048571,
+            )
 
-            pickle.dump(self.correspondent_classifier, f)
-            pickle.dump(self.document_type_classifier, f)
-            pickle.dump(self.storage_path_classifier, f)
+        def label_stats(queryset, label: str, document: str) -> list[tuple]:
+            return list(
+                queryset.filter(
+                    **{f"{label}__matching_algorithm": MatchingModel.MATCH_AUTO},
+                )
+                .values(f"{label}_id")
+                .annotate(
+                    count=Count(document),
+                    hash=Sum(pair_hash(document, f"{label}_id")),
+                )
+                .order_by(f"{label}_id")
+                .values_list(f"{label}_id", "count", "hash"),
+            )
 
-        target_file_temp.rename(target_file)
+        labels = [
+            label_stats(docs_queryset, label, "pk")
+            for label in ("correspondent", "document_type", "storage_path")
+        ]
+        labels.append(
+            label_stats(Document.tags.through.objects.all(), "tag", "document_id"),
+        )
+
+        auto_models = sorted(
+            Correspondent.objects.filter(matching_algorithm=MatchingModel.MATCH_AUTO)
+            .annotate(model=Value("correspondent"))
+            .order_by()
+            .values_list("model", "pk")
+            .union(
+                *(
+                    model.objects.filter(
+                        matching_algorithm=MatchingModel.MATCH_AUTO,
+                    )
+                    .annotate(model=Value(model._meta.model_name))
+                    .order_by()
+                    .values_list("model", "pk")
+                    for model in (DocumentType, StoragePath, Tag)
+                ),
+                all=True,
+            ),
+        )
+
+        fingerprint = repr(
+            (labels_version, num_documents, latest, labels, auto_models),
+        )
+        return num_documents, sha256(fingerprint.encode()).digest()
 
     def train(self):
         # Get non-inbox documents
@@ -146,50 +879,115 @@ class DocumentClassifier:
             tags__is_inbox_tag=True,
         )
 
+        # Check cheaply if anything changed since the last training at all
+        num_documents, training_fingerprint = self._training_fingerprint(
+            docs_queryset,
+        )
+
         # No documents exit to train against
-        if docs_queryset.count() == 0:
+        if num_documents == 0:
             raise ValueError("No training data available.")
 
+        self.fingerprint_changed = False
+        if (
+            training_fingerprint is not None
+            and training_fingerprint == self.training_fingerprint
+        ):
+            return False
+
         labels_tags = []
         labels_correspondent = []
         labels_document_type = []
         labels_storage_path = []
 
+        # Hashes of content and labels of every document, to find the
+        # documents which changed since the last training
+        document_hashes: dict[int, bytes] = {}
+        # Only the position and id of changed documents, their content is
+        # read again when they are trained with
+        changed_documents: list[tuple[int, int]] = []
+
         # Step 1: Extract and preprocess training data from the database.
         logger.debug("Gathering data from database...")
+
+        # The AUTO tags of all documents, sorted by their id
+        auto_tags: defaultdict[int, list[int]] = defaultdict(list)
+        for document_id, tag_id in (
+            Document.tags.through.objects.filter(
+                tag__matching_algorithm=MatchingModel.MATCH_AUTO,
+            )
+            .order_by("tag_id")
+            .values_list("document_id", "tag_id")
+            .iterator(chunk_size=self.TRAINING_CHUNK_SIZE)
+        ):
+            auto_tags[document_id].append(tag_id)
+
+        def auto_label(pk: Optional[int], matching_algorithm: Optional[int]) -> int:
+            return pk if matching_algorithm == MatchingModel.MATCH_AUTO else -1
+
         hasher = sha256()
-        for doc in docs_queryset:
-            y = -1
-            dt = doc.document_type
-            if dt and dt.matching_algorithm == MatchingModel.MATCH_AUTO:
-                y = dt.pk
+        latest_doc_change: Optional[datetime] = None
+        for (
+            doc_pk,
+            content,
+            modified,
+            correspondent_id,
+            correspondent_algorithm,
+            document_type_id,
+            document_type_algorithm,
+            storage_path_id,
+            storage_path_algorithm,
+        ) in self._training_rows(
+            docs_queryset,
+            "pk",
+            "content",
+            "modified",
+            "correspondent_id",
+            "correspondent__matching_algorithm",
+            "document_type_id",
+            "document_type__matching_algorithm",
+            "storage_path_id",
+            "storage_path__matching_algorithm",
+        ):
+            doc_hasher = sha256(PreprocessedTextCache.checksum(content))
+            if latest_doc_change is None or modified > latest_doc_change:
+                latest_doc_change = modified
+
+            y = auto_label(document_type_id, document_type_algorithm)
             hasher.update(y.to_bytes(4, "little", signed=True))
+            doc_hasher.update(y.to_bytes(4, "little", signed=True))
             labels_document_type.append(y)
 
-            y = -1
-            cor = doc.correspondent
-            if cor and cor.matching_algorithm == MatchingModel.MATCH_AUTO:
-                y = cor.pk
+            y = auto_label(correspondent_id, correspondent_algorithm)
             hasher.update(y.to_bytes(4, "little", signed=True))
+            doc_hasher.update(y.to_bytes(4, "little", signed=True))
             labels_correspondent.append(y)
 
-            tags = sorted(
-                tag.pk
-                for tag in doc.tags.filter(
-                    matching_algorithm=MatchingModel.MATCH_AUTO,
-                )
-            )
+            tags = auto_tags.get(doc_pk, [])
             for tag in tags:
                 hasher.update(tag.to_bytes(4, "little", signed=True))
+                doc_hasher.update(tag.to_bytes(4, "little", signed=True))
             labels_tags.append(tags)
 
-            y = -1
-            sp = doc.storage_path
-            if sp and sp.matching_algorithm == MatchingModel.MATCH_AUTO:
-                y = sp.pk
+            y = auto_label(storage_path_id, storage_path_algorithm)
             hasher.update(y.to_bytes(4, "little", signed=True))
+            doc_hasher.update(y.to_bytes(4, "little", signed=True))
             labels_storage_path.append(y)
 
+            document_hashes[doc_pk] = doc_hasher.digest()
+            if self.document_hashes.get(doc_pk) != document_hashes[doc_pk]:
+                changed_documents.append((len(document_hashes) - 1, doc_pk))
+
+        # No documents exit to train against
+        if not document_hashes:
+            raise ValueError("No training data available.")
+
+        # Texts of documents which are deleted or in the inbox by now
+        try:
+            get_preprocessed_text_cache().prune(document_hashes.keys())
+        except sqlite3.Error as e:
+            logger.warning(f"Could not remove stale preprocessed texts: {e}")
+
         labels_tags_unique = {tag for tags in labels_tags for tag in tags}
 
         num_tags = len(labels_tags_unique)
@@ -197,11 +995,13 @@ class DocumentClassifier:
         # Check if retraining is actually required.
         # A document has been updated since the classifier was trained
         # New auto tags, types, correspondent, storage paths exist
-        latest_doc_change = docs_queryset.latest("modified").modified
         if (
             self.last_doc_change_time is not None
             and self.last_doc_change_time >= latest_doc_change
         ) and self.last_auto_type_hash == hasher.digest():
+            if training_fingerprint != self.training_fingerprint:
+                self.training_fingerprint = training_fingerprint
+                self.fingerprint_changed = True
             return False
 
         # substract 1 since -1 (null) is also part of the classes.
@@ -216,7 +1016,7 @@ class DocumentClassifier:
         logger.debug(
             "{} documents, {} tag(s), {} correspondent(s), "
             "{} document type(s). {} storage path(es)".format(
-                docs_queryset.count(),
+                len(document_hashes),
                 num_tags,
                 num_correspondents,
                 num_document_types,
@@ -224,6 +1024,203 @@ class DocumentClassifier:
             ),
         )
 
+        train_full = True
+        if self._labels_known(
+            labels_tags,
+            labels_correspondent,
+            labels_document_type,
+            labels_storage_path,
+        ):
+            drift = self._vocabulary_drift(
+                text
+                for _, text in self._changed_texts(docs_queryset, changed_documents)
+            )
+            if drift <= settings.CLASSIFIER_VOCABULARY_DRIFT:
+                train_full = False
+            else:
+                logger.debug(f"Vocabulary drifted by {drift:.1%}")
+
+        if train_full:
+            self._train_full(
+                docs_queryset,
+                labels_tags,
+                labels_correspondent,
+                labels_document_type,
+                labels_storage_path,
+                num_tags,
+                num_correspondents,
+                num_document_types,
+                num_storage_paths,
+            )
+        elif changed_documents:
+            logger.debug(
+                f"Training classifiers with {len(changed_documents)} changed "
+                f"document(s)...",
+            )
+            self._train_incrementally(
+                docs_queryset,
+                changed_documents,
+                labels_tags,
+                labels_correspondent,
+                labels_document_type,
+                labels_storage_path,
+            )
+
+        self.last_doc_change_time = latest_doc_change
+        self.last_auto_type_hash = hasher.digest()
+        self.document_hashes = document_hashes
+        self.training_fingerprint = training_fingerprint
+
+        self._local = threading.local()
+
+        return True
+
+    def _labels_known(
+        self,
+        labels_tags: list[list[int]],
+        labels_correspondent: list[int],
+        labels_document_type: list[int],
+        labels_storage_path: list[int],
+    ) -> bool:
+        """
+        Checks whether the existing classifiers know all labels and can be
+        updated with the changed documents only. Classifiers cannot learn new
+        classes, so those require a full training.
+        """
+        if self.data_vectorizer is None or not self.document_hashes:
+            return False
+
+        for classifier, labels in [
+            (self.correspondent_classifier, labels_correspondent),
+            (self.document_type_classifier, labels_document_type),
+            (self.storage_path_classifier, labels_storage_path),
+        ]:
+            if classifier is None:
+                if set(labels) - {-1}:
+                    return False
+            elif not set(labels) <= set(classifier.classes_):
+                return False
+
+        labels_tags_unique = {tag for tags in labels_tags for tag in tags}
+        if self.tags_classifier is None:
+            return not labels_tags_unique
+        return labels_tags_unique <= set(self.tags_binarizer.classes_)
+
+    def _changed_texts(
+        self,
+        docs_queryset,
+        changed_documents: list[tuple[int, int]],
+    ) -> Iterator[tuple[int, str]]:
+        """
+        Reads the content of the changed (position, document id) documents
+        from the database in batches and yields their positions with the
+        preprocessed texts. Documents deleted since are left out.
+        """
+        batch_size = PreprocessedTextCache.BATCH_SIZE
+        for i in range(0, len(changed_documents), batch_size):
+            batch = changed_documents[i : i + batch_size]
+            contents = dict(
+                docs_queryset.filter(pk__in=[pk for _, pk in batch]).values_list(
+                    "pk",
+                    "content",
+                ),
+            )
+            batch = [(index, pk) for index, pk in batch if pk in contents]
+            texts = self._preprocess_documents((pk, contents[pk]) for _, pk in batch)
+            for (index, _), text in zip(batch, texts):
+                yield index, text
+
+    def _vocabulary_drift(self, texts: Iterable[str]) -> float:
+        """
+        Returns the number of terms, relative to the size of the vocabulary,
+        which occur often enough in the given preprocessed texts alone to
+        become part of the vocabulary if it was built again.
+        """
+        analyzer = self.data_vectorizer.build_analyzer()
+        term_counts = Counter()
+        for text in texts:
+            term_counts.update(set(analyzer(text)))
+
+        vocabulary = self.data_vectorizer.vocabulary_
+        min_count = self.data_vectorizer.min_df * len(self.document_hashes)
+        new_terms = sum(
+            1
+            for term, count in term_counts.items()
+            if count >= min_count and term not in vocabulary
+        )
+        return new_terms / max(len(vocabulary), 1)
+
+    def _train_incrementally(
+        self,
+        docs_queryset,
+        changed_documents: list[tuple[int, int]],
+        labels_tags: list[list[int]],
+        labels_correspondent: list[int],
+        labels_document_type: list[int],
+        labels_storage_path: list[int],
+    ) -> None:
+        """
+        Updates the existing classifiers with the changed (position, document
+        id) documents, keeping the vocabulary as it is. The labels are those
+        of all training documents, by position.
+        """
+        from sklearn.preprocessing import LabelBinarizer
+
+        changed = []
+
+        def texts() -> Iterator[str]:
+            for index, text in self._changed_texts(docs_queryset, changed_documents):
+                changed.append(index)
+                yield text
+
+        # Only the vectorized texts are kept in memory
+        data_vectorized = self.data_vectorizer.transform(texts())
+        if not changed:
+            # Deleted since
+            return
+        labels_tags = [labels_tags[i] for i in changed]
+        labels_correspondent = [labels_correspondent[i] for i in changed]
+        labels_document_type = [labels_document_type[i] for i in changed]
+        labels_storage_path = [labels_storage_path[i] for i in changed]
+
+        if self.tags_classifier is not None:
+            if isinstance(self.tags_binarizer, LabelBinarizer):
+                # Binary classification for a single tag, see _train_full
+                labels_tags = [
+                    label[0] if len(label) == 1 else -1 for label in labels_tags
+                ]
+                labels_tags_vectorized = self.tags_binarizer.transform(
+                    labels_tags,
+                ).ravel()
+            else:
+                labels_tags_vectorized = self.tags_binarizer.transform(labels_tags)
+
+        for _ in range(self.INCREMENTAL_EPOCHS):
+            if self.tags_classifier is not None:
+                self.tags_classifier.partial_fit(
+                    data_vectorized,
+                    labels_tags_vectorized,
+                )
+            for classifier, labels in [
+                (self.correspondent_classifier, labels_correspondent),
+                (self.document_type_classifier, labels_document_type),
+                (self.storage_path_classifier, labels_storage_path),
+            ]:
+                if classifier is not None:
+                    classifier.partial_fit(data_vectorized, labels)
+
+    def _train_full(
+        self,
+        docs_queryset,
+        labels_tags: list[list[int]],
+        labels_correspondent: list[int],
+        labels_document_type: list[int],
+        labels_storage_path: list[int],
+        num_tags: int,
+        num_correspondents: int,
+        num_document_types: int,
+        num_storage_paths: int,
+    ) -> None:
         from sklearn.feature_extraction.text import CountVectorizer
         from sklearn.neural_network import MLPClassifier
         from sklearn.preprocessing import LabelBinarizer
@@ -236,8 +1233,9 @@ class DocumentClassifier:
             """
             Generates the content for documents, but once at a time
             """
-            for doc in docs_queryset:
-                yield self.preprocess_content(doc.content)
+            yield from self._preprocess_documents(
+                self._training_rows(docs_queryset, "pk", "content"),
+            )
 
         self.data_vectorizer = CountVectorizer(
             analyzer="word",
@@ -313,10 +1311,36 @@ class DocumentClassifier:
                 "There are no storage paths. Not training storage path classifier.",
             )
 
-        self.last_doc_change_time = latest_doc_change
-        self.last_auto_type_hash = hasher.digest()
-
-        return True
+    def _preprocess_documents(
+        self,
+        documents: Iterable[tuple[Optional[int], str]],
+    ) -> Iterator[str]:
+        """
+        Preprocesses the content of the given (document id, content) pairs,
+        reusing stored texts for content which was preprocessed before. The
+        texts of documents with an id are stored for later use.
+        """
+        cache = get_preprocessed_text_cache()
+        documents = iter(documents)
+        while batch := list(islice(documents, cache.BATCH_SIZE)):
+            checksums = [cache.checksum(content) for _, content in batch]
+            try:
+                texts = cache.get_many(checksums)
+            except sqlite3.Error as e:
+                logger.warning(f"Could not read preprocessed texts: {e}")
+                texts = {}
+            new_rows = []
+            for (document_id, content), checksum in zip(batch, checksums):
+                if checksum not in texts:
+                    texts[checksum] = self.preprocess_content(content)
+                    if document_id is not None:
+                        new_rows.append((document_id, checksum, texts[checksum]))
+                yield texts[checksum]
+            if new_rows:
+                try:
+                    cache.set_many(new_rows)
+                except sqlite3.Error as e:
+                    logger.warning(f"Could not store preprocessed texts: {e}")
 
     def preprocess_content(self, content: str) -> str:  # pragma: nocover
         """
@@ -381,56 +1405,120 @@ class DocumentClassifier:
 
         return content
 
-    def predict_correspondent(self, content: str) -> Optional[int]:
-        if self.correspondent_classifier:
-            X = self.data_vectorizer.transform([self.preprocess_content(content)])
-            correspondent_id = self.correspondent_classifier.predict(X)
-            if correspondent_id != -1:
-                return correspondent_id
-            else:
-                return None
-        else:
-            return None
-
-    def predict_document_type(self, content: str) -> Optional[int]:
-        if self.document_type_classifier:
-            X = self.data_vectorizer.transform([self.preprocess_content(content)])
-            document_type_id = self.document_type_classifier.predict(X)
-            if document_type_id != -1:
-                return document_type_id
-            else:
-                return None
-        else:
-            return None
+    def _predict_ids(self, classifier, X) -> list[Optional[int]]:
+        if not classifier:
+            return [None] * X.shape[0]
+        return [None if y == -1 else int(y) for y in classifier.predict(X)]
 
-    def predict_tags(self, content: str) -> list[int]:
+    def _predict_tags(self, X) -> list[list[int]]:
         from sklearn.utils.multiclass import type_of_target
 
-        if self.tags_classifier:
-            X = self.data_vectorizer.transform([self.preprocess_content(content)])
-            y = self.tags_classifier.predict(X)
-            tags_ids = self.tags_binarizer.inverse_transform(y)[0]
-            if type_of_target(y).startswith("multilabel"):
-                # the usual case when there are multiple tags.
-                return list(tags_ids)
-            elif type_of_target(y) == "binary" and tags_ids != -1:
-                # This is for when we have binary classification with only one
-                # tag and the result is to assign this tag.
-                return [tags_ids]
-            else:
-                # Usually binary as well with -1 as the result, but we're
-                # going to catch everything else here as well.
-                return []
+        if not self.tags_classifier:
+            return [[] for _ in range(X.shape[0])]
+
+        y = self.tags_classifier.predict(X)
+        tags_ids = self.tags_binarizer.inverse_transform(y)
+        if type_of_target(y).startswith("multilabel"):
+            # the usual case when there are multiple tags.
+            return [[int(tag_id) for tag_id in ids] for ids in tags_ids]
+        elif type_of_target(y) == "binary":
+            # This is for when we have binary classification with only one
+            # tag and the result is to assign this tag, -1 means no tag.
+            return [[] if ids == -1 else [int(ids)] for ids in tags_ids]
         else:
+            # Catch everything else here as well.
+            return [[] for _ in range(X.shape[0])]
+
+    @staticmethod
+    def _prediction_key(content: str, document_id: Optional[int]) -> tuple:
+        return document_id, PreprocessedTextCache.checksum(content)
+
+    def predict_all(
+        self,
+        contents: list[str],
+        document_ids: Optional[list[int]] = None,
+    ) -> list[ClassifierPrediction]:
+        """
+        Predicts correspondent, document type, tags and storage path of
+        many documents at once. Every content is preprocessed and vectorized
+        only once, and each classifier runs once on the whole batch.
+
+        The predictions are kept for the predict_ methods of the calling
+        thread, until its next batch, for the given document ids.
+        """
+        if not contents:
             return []
 
-    def predict_storage_path(self, content: str) -> Optional[int]:
-        if self.storage_path_classifier:
-            X = self.data_vectorizer.transform([self.preprocess_content(content)])
-            storage_path_id = self.storage_path_classifier.predict(X)
-            if storage_path_id != -1:
-                return storage_path_id
-            else:
-                return None
+        if not (
+            self.correspondent_classifier
+            or self.document_type_classifier
+            or self.tags_classifier
+            or self.storage_path_classifier
+        ):
+            predictions = [ClassifierPrediction() for _ in contents]
         else:
-            return None
+            X = self.data_vectorizer.transform(
+                list(
+                    self._preprocess_documents((None, content) for content in contents),
+                ),
+            )
+            predictions = [
+                ClassifierPrediction(*values)
+                for values in zip(
+                    self._predict_ids(self.correspondent_classifier, X),
+                    self._predict_ids(self.document_type_classifier, X),
+                    self._predict_tags(X),
+                    self._predict_ids(self.storage_path_classifier, X),
+                )
+            ]
+
+        if document_ids is None:
+            document_ids = [None] * len(contents)
+        # Remember the batch, so the predict_ methods can use it
+        self._local.predictions = {
+            self._prediction_key(content, document_id): prediction
+            for content, document_id, prediction in islice(
+                zip(contents, document_ids, predictions),
+                self.PREDICTIONS_CACHE_SIZE,
+            )
+        }
+        return predictions
+
+    def predict(
+        self,
+        content: str,
+        document_id: Optional[int] = None,
+    ) -> ClassifierPrediction:
+        predictions = getattr(self._local, "predictions", {})
+        prediction = predictions.get(self._prediction_key(content, document_id))
+        if prediction is None:
+            prediction = self.predict_all([content], [document_id])[0]
+        return prediction
+
+    def predict_correspondent(
+        self,
+        content: str,
+        document_id: Optional[int] = None,
+    ) -> Optional[int]:
+        return self.predict(content, document_id).correspondent
+
+    def predict_document_type(
+        self,
+        content: str,
+        document_id: Optional[int] = None,
+    ) -> Optional[int]:
+        return self.predict(content, document_id).document_type
+
+    def predict_tags(
+        self,
+        content: str,
+        document_id: Optional[int] = None,
+    ) -> list[int]:
+        return self.predict(content, document_id).tags
+
+    def predict_storage_path(
+        self,
+        content: str,
+        document_id: Optional[int] = None,
+    ) -> Optional[int]:
+        return self.predict(content, document_id).storage_path
@@ -1,5 +1,4 @@
 import datetime
-import hashlib
 import os
 import tempfile
 import uuid
@@ -9,7 +8,6 @@ from subprocess import CompletedProcess
 from subprocess import run
 from typing import Optional
 
-import magic
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 from django.conf import settings
@@ -44,7 +42,8 @@ from documents.permissions import set_permissions_for_object
 from documents.signals import document_consumption_finished
 from documents.signals import document_consumption_started
 from documents.utils import copy_basic_file_stats
-from documents.utils import copy_file_with_basic_stats
+from documents.utils import copy_with_checksum
+from documents.utils import stage_file
 
 
 class ConsumerError(Exception):
@@ -118,6 +117,7 @@ class Consumer(LoggingMixin):
         super().__init__()
         self.path: Optional[Path] = None
         self.original_path: Optional[Path] = None
+        self.original_checksum: Optional[str] = None
         self.filename = None
         self.override_title = None
         self.override_correspondent_id = None
@@ -127,9 +127,35 @@ class Consumer(LoggingMixin):
         self.task_id = None
         self.override_owner_id = None
         self.override_custom_field_ids = None
+        self.ocr_page_timings: dict[int, float] = {}
+        self.ocr_fallback_pages: list[int] = []
 
         self.channel_layer = get_channel_layer()
 
+    def get_ocr_summary(self) -> Optional[str]:
+        """
+        Returns how long OCR of the consumed document took, its slowest pages
+        and the pages which had to be OCRed again, if it was OCRed.
+        """
+        if not self.ocr_page_timings:
+            return None
+
+        slowest = sorted(
+            self.ocr_page_timings.items(),
+            key=lambda timing: timing[1],
+            reverse=True,
+        )[:3]
+        summary = (
+            f"OCR of {len(self.ocr_page_timings)} pages took "
+            f"{sum(self.ocr_page_timings.values()):.1f}s, slowest pages: "
+            + ", ".join(f"{page} ({seconds:.1f}s)" for page, seconds in slowest)
+        )
+        if self.ocr_fallback_pages:
+            summary += ", OCRed again: " + ", ".join(
+                str(page) for page in self.ocr_fallback_pages
+            )
+        return summary
+
     def pre_check_file_exists(self):
         """
         Confirm the input file still exists where it should
@@ -144,14 +170,13 @@ class Consumer(LoggingMixin):
         """
         Using the MD5 of the file, check this exact file doesn't already exist
         """
-        with open(self.path, "rb") as f:
-            checksum = hashlib.md5(f.read()).hexdigest()
+        checksum = self.original_checksum
         existing_doc = Document.objects.filter(
             Q(checksum=checksum) | Q(archive_checksum=checksum),
         )
         if existing_doc.exists():
             if settings.CONSUMER_DELETE_DUPLICATES:
-                os.unlink(self.path)
+                os.unlink(self.original_path)
             self._fail(
                 ConsumerStatusShortMessage.DOCUMENT_ALREADY_EXISTS,
                 f"Not consuming {self.filename}: It is a duplicate of"
@@ -370,23 +395,30 @@ class Consumer(LoggingMixin):
 
         self.pre_check_file_exists()
         self.pre_check_directories()
-        self.pre_check_duplicate()
-        self.pre_check_asn_value()
-
-        self.log.info(f"Consuming {self.filename}")
 
-        # For the actual work, copy the file into a tempdir
+        # For the actual work, copy the file into a tempdir. The file is only
+        # read once, for its checksum and mime type as well.
         self.original_path = self.path
         tempdir = tempfile.TemporaryDirectory(
             prefix="paperless-ngx",
             dir=settings.SCRATCH_DIR,
         )
         self.path = Path(tempdir.name) / Path(self.filename)
-        copy_file_with_basic_stats(self.original_path, self.path)
+        staged_file = stage_file(self.original_path, self.path)
+        self.original_checksum = staged_file.checksum
+
+        try:
+            self.pre_check_duplicate()
+            self.pre_check_asn_value()
+        except ConsumerError:
+            tempdir.cleanup()
+            raise
+
+        self.log.info(f"Consuming {self.filename}")
 
         # Determine the parser class.
 
-        mime_type = magic.from_file(self.path, mime=True)
+        mime_type = staged_file.mime_type
 
         self.log.debug(f"Detected mime type: {mime_type}")
 
@@ -470,6 +502,17 @@ class Consumer(LoggingMixin):
                 date = parse_date(self.filename, text)
             archive_path = document_parser.get_archive_path()
 
+            self.ocr_page_timings = document_parser.get_ocr_page_timings()
+            self.ocr_fallback_pages = document_parser.get_ocr_fallback_pages()
+            if self.ocr_page_timings:
+                self.log.debug(
+                    "OCR page timings: "
+                    + ", ".join(
+                        f"{page}: {seconds:.1f}s"
+                        for page, seconds in sorted(self.ocr_page_timings.items())
+                    ),
+                )
+
         except ParseError as e:
             self._fail(
                 str(e),
@@ -542,17 +585,12 @@ class Consumer(LoggingMixin):
                             archive_filename=True,
                         )
                         create_source_path_directory(document.archive_path)
-                        self._write(
+                        document.archive_checksum = self._write(
                             document.storage_type,
                             archive_path,
                             document.archive_path,
                         )
 
-                        with open(archive_path, "rb") as f:
-                            document.archive_checksum = hashlib.md5(
-                                f.read(),
-                            ).hexdigest()
-
                 # Don't save with the lock active. Saving will cause the file
                 # renaming logic to acquire the lock as well.
                 # This triggers things like file renaming
@@ -735,7 +773,7 @@ class Consumer(LoggingMixin):
             )[:127],
             content=text,
             mime_type=mime_type,
-            checksum=hashlib.md5(self.original_path.read_bytes()).hexdigest(),
+            checksum=self.original_checksum,
             created=create_date,
             modified=create_date,
             storage_type=storage_type,
@@ -802,9 +840,12 @@ class Consumer(LoggingMixin):
                     document=document,
                 )  # adds to document
 
-    def _write(self, storage_type, source, target):
+    def _write(self, storage_type, source, target) -> str:
+        """
+        Copies the file into place and returns the MD5 checksum of its content
+        """
         with open(source, "rb") as read_file, open(target, "wb") as write_file:
-            write_file.write(read_file.read())
+            checksum = copy_with_checksum(read_file, write_file)
 
         # Attempt to copy file's original stats, but it's ok if we can't
         try:
@@ -812,6 +853,8 @@ class Consumer(LoggingMixin):
         except Exception:  # pragma: no cover
             pass
 
+        return checksum
+
     def _log_script_outputs(self, completed_process: CompletedProcess):
         """
         Decodes a process stdout and stderr streams and logs them to the main log
@@ -1,14 +1,34 @@
 import logging
 import math
+import multiprocessing
 import os
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left
 from collections import Counter
+from collections import OrderedDict
+from collections import defaultdict
+from collections import deque
+from collections.abc import Iterator
 from contextlib import contextmanager
 from datetime import datetime
+from itertools import islice
+from itertools import repeat
 from typing import Optional
 
+import tqdm
 from dateutil.parser import isoparse
 from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connections
+from django.db import transaction
+from django.db.models import Prefetch
 from django.utils import timezone
+from guardian.models import GroupObjectPermission
+from guardian.models import UserObjectPermission
 from guardian.shortcuts import get_users_with_perms
 from whoosh import classify
 from whoosh import highlight
@@ -17,10 +37,14 @@ from whoosh.fields import BOOLEAN
 from whoosh.fields import DATETIME
 from whoosh.fields import KEYWORD
 from whoosh.fields import NUMERIC
+from whoosh.fields import STORED
 from whoosh.fields import TEXT
 from whoosh.fields import Schema
+from whoosh.filedb.filestore import FileStorage
 from whoosh.highlight import HtmlFormatter
+from whoosh.idsets import BitSet
 from whoosh.index import FileIndex
+from whoosh.index import LockError
 from whoosh.index import create_in
 from whoosh.index import exists_in
 from whoosh.index import open_dir
@@ -29,7 +53,12 @@ from whoosh.qparser import QueryParser
 from whoosh.qparser.dateparse import DateParserPlugin
 from whoosh.qparser.dateparse import English
 from whoosh.qparser.plugins import FieldsPlugin
+from whoosh.reading import IndexReader
+from whoosh.reading import MultiReader
+from whoosh.reading import SegmentReader
+from whoosh.scoring import BM25F
 from whoosh.scoring import TF_IDF
+from whoosh.searching import Results
 from whoosh.searching import ResultsPage
 from whoosh.searching import Searcher
 from whoosh.util.times import timespan
@@ -38,7 +67,7 @@ from whoosh.writing import AsyncWriter
 # from documents.models import CustomMetadata
 from documents.models import CustomFieldInstance
 from documents.models import Document
-from documents.models import Note
+from documents.models import IndexUpdate
 from documents.models import User
 
 logger = logging.getLogger("paperless.index")
@@ -75,6 +104,7 @@ def get_schema():
         viewer_id=KEYWORD(commas=True),
         checksum=TEXT(),
         original_filename=TEXT(sortable=True),
+        key_terms=STORED(),
     )
 
 
@@ -90,6 +120,99 @@ def open_index(recreate=False) -> FileIndex:
     return create_in(settings.INDEX_DIR, get_schema())
 
 
+class SearcherPool:
+    """
+    Keeps readers of the index open between searches in this process, since
+    opening all segments of a large index takes much longer than most
+    queries. A reader is opened again only when the index changed, reusing
+    the segments which did not change and closing the others.
+    """
+
+    # Number of unused readers kept open
+    MAX_IDLE = 4
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._folder: Optional[str] = None
+        self._index: Optional[FileIndex] = None
+        # Unused readers, with the version of the index they read
+        self._idle: list[tuple[tuple, IndexReader]] = []
+
+    def get_index(self) -> FileIndex:
+        """
+        Returns the index, opened only once unless the index directory changed
+        """
+        with self._lock:
+            if self._index is None or self._folder != str(settings.INDEX_DIR):
+                self._close_idle()
+                self._index = open_index()
+                self._folder = str(settings.INDEX_DIR)
+            return self._index
+
+    def clear(self) -> None:
+        with self._lock:
+            self._close_idle()
+            self._index = None
+            self._folder = None
+
+    @staticmethod
+    def _version(ix: FileIndex) -> tuple:
+        # A recreated index starts over with the same generations
+        return ix.latest_generation(), ix.last_modified()
+
+    def _close_idle(self) -> None:
+        for _, reader in self._idle:
+            reader.close()
+        self._idle = []
+
+    @contextmanager
+    def searcher(self, ix: FileIndex, weighting=BM25F) -> Iterator[Searcher]:
+        folder = str(ix.storage.folder)
+        with self._lock:
+            if self._folder != folder:
+                self._close_idle()
+                self._folder = folder
+                self._index = ix
+            idle = self._idle.pop() if self._idle else None
+
+        try:
+            version = self._version(ix)
+            if idle is None:
+                reader = ix.reader()
+            elif idle[0] != version:
+                reader = ix.reader(reuse=idle[1])
+            else:
+                reader = idle[1]
+        except Exception:
+            # The index might be gone, open it again next time
+            self.clear()
+            raise
+
+        try:
+            yield Searcher(reader, weighting=weighting, closereader=False, fromindex=ix)
+        except Exception:
+            # The reader might be broken, don't keep it
+            reader.close()
+            raise
+        else:
+            with self._lock:
+                if self._folder == folder and len(self._idle) < self.MAX_IDLE:
+                    self._idle.append((version, reader))
+                    reader = None
+            if reader is not None:
+                reader.close()
+
+
+_searcher_pool = SearcherPool()
+
+
+def get_index() -> FileIndex:
+    """
+    Returns the index for searching, which is only opened once per process
+    """
+    return _searcher_pool.get_index()
+
+
 @contextmanager
 def open_index_writer(optimize=False) -> AsyncWriter:
     writer = AsyncWriter(open_index())
@@ -104,22 +227,28 @@ def open_index_writer(optimize=False) -> AsyncWriter:
 
 
 @contextmanager
-def open_index_searcher() -> Searcher:
-    searcher = open_index().searcher()
-
-    try:
+def open_index_searcher(weighting=BM25F) -> Searcher:
+    with _searcher_pool.searcher(get_index(), weighting) as searcher:
         yield searcher
-    finally:
-        searcher.close()
 
 
-def update_document(writer: AsyncWriter, doc: Document):
-    tags = ",".join([t.name for t in doc.tags.all()])
-    tags_ids = ",".join([str(t.id) for t in doc.tags.all()])
-    notes = ",".join([str(c.note) for c in Note.objects.filter(document=doc)])
-    custom_fields = ",".join(
-        [str(c) for c in CustomFieldInstance.objects.filter(document=doc)],
-    )
+def get_document_fields(
+    doc: Document,
+    viewer_ids: Optional[list[int]] = None,
+    reader: Optional[IndexReader] = None,
+) -> dict:
+    """
+    Returns the fields of the document in the index. Related objects are
+    taken from the prefetched relations of the document, if any. The ids of
+    the users allowed to view the document are looked up unless given. The
+    key terms of the content are weighted by the given reader of the index.
+    """
+    tags = doc.tags.all()
+    tag_names = ",".join([t.name for t in tags])
+    tags_ids = ",".join([str(t.id) for t in tags])
+    notes = ",".join([str(c.note) for c in doc.notes.all()])
+    custom_field_instances = doc.custom_fields.all()
+    custom_fields = ",".join([str(c) for c in custom_field_instances])
     asn = doc.archive_serial_number
     if asn is not None and (
         asn < Document.ARCHIVE_SERIAL_NUMBER_MIN
@@ -132,21 +261,23 @@ def update_document(writer: AsyncWriter, doc: Document):
             f"{Document.ARCHIVE_SERIAL_NUMBER_MAX:,}.",
         )
         asn = 0
-    users_with_perms = get_users_with_perms(
-        doc,
-        only_with_perms_in=["view_document"],
-    )
-    viewer_ids = ",".join([str(u.id) for u in users_with_perms])
-    writer.update_document(
+    if viewer_ids is None:
+        users_with_perms = get_users_with_perms(
+            doc,
+            only_with_perms_in=["view_document"],
+        )
+        viewer_ids = [u.id for u in users_with_perms]
+    viewer_ids = ",".join([str(viewer_id) for viewer_id in viewer_ids])
+    return dict(
         id=doc.pk,
         title=doc.title,
         content=doc.content,
         correspondent=doc.correspondent.name if doc.correspondent else None,
         correspondent_id=doc.correspondent.id if doc.correspondent else None,
         has_correspondent=doc.correspondent is not None,
-        tag=tags if tags else None,
+        tag=tag_names if tag_names else None,
         tag_id=tags_ids if tags_ids else None,
-        has_tag=len(tags) > 0,
+        has_tag=len(tag_names) > 0,
         type=doc.document_type.name if doc.document_type else None,
         type_id=doc.document_type.id if doc.document_type else None,
         has_type=doc.document_type is not None,
@@ -160,14 +291,512 @@ def update_document(writer: AsyncWriter, doc: Document):
         notes=notes,
         num_notes=len(notes),
         custom_fields=custom_fields,
-        custom_field_count=len(doc.custom_fields.all()),
+        custom_field_count=len(custom_field_instances),
         owner=doc.owner.username if doc.owner else None,
         owner_id=doc.owner.id if doc.owner else None,
         has_owner=doc.owner is not None,
         viewer_id=viewer_ids if viewer_ids else None,
         checksum=doc.checksum,
         original_filename=doc.original_filename,
+        key_terms=get_key_terms(reader, doc.content) if reader is not None else None,
+    )
+
+
+def update_document(
+    writer: AsyncWriter,
+    doc: Document,
+    reader: Optional[IndexReader] = None,
+):
+    """
+    Writes the document to the index. Callers writing several documents should
+    pass one reader for all of them, otherwise a searcher is opened to weight
+    the key terms of the document.
+    """
+    if reader is None:
+        with open_index_searcher() as searcher:
+            fields = get_document_fields(doc, reader=searcher.reader())
+    else:
+        fields = get_document_fields(doc, reader=reader)
+    writer.update_document(**fields)
+
+
+# Number of key terms of a document searched for similar documents
+MORE_LIKE_THIS_TERMS = 20
+
+
+def get_key_terms(
+    reader: IndexReader,
+    content: str,
+    numterms: int = MORE_LIKE_THIS_TERMS,
+) -> Optional[list[tuple[str, float]]]:
+    """
+    Returns the terms of the content most specific to it, weighted like
+    Searcher.key_terms_from_text with the Bo1 model and without normalizing,
+    as if the content was a document of the index of the reader. Returns
+    None if the index is empty, since it gives no weights then.
+    """
+    if reader.doc_count() == 0:
+        return None
+
+    field = reader.schema["content"]
+    weights = defaultdict(float)
+    for text, _, weight, _ in field.index(content):
+        weights[text] += weight
+    if not weights:
+        return []
+
+    total = sum(weights.values())
+    model = classify.Bo1Model(
+        reader.doc_count_all() + 1,
+        reader.field_length("content") + total,
+    )
+    scores = [
+        (
+            model.score(weight, reader.frequency("content", text) + weight, total),
+            field.from_bytes(text),
+        )
+        for text, weight in weights.items()
+    ]
+    scores.sort(key=lambda x: (0 - x[0], x[1]))
+    maxweight = scores[0][0]
+    return [(term, score / maxweight) for score, term in scores[:numterms]]
+
+
+def get_viewer_ids(document_ids: list[int]) -> dict[int, set[int]]:
+    """
+    Returns the ids of the users with the view permission on each of the
+    documents, either directly or through one of their groups, with a
+    fixed number of queries
+    """
+    content_type = ContentType.objects.get_for_model(Document)
+    object_pks = [str(document_id) for document_id in document_ids]
+    permission_filter = {
+        "content_type": content_type,
+        "permission__content_type": content_type,
+        "permission__codename": "view_document",
+        "object_pk__in": object_pks,
+    }
+
+    viewer_ids = defaultdict(set)
+    for object_pk, user_id in UserObjectPermission.objects.filter(
+        **permission_filter,
+    ).values_list("object_pk", "user_id"):
+        viewer_ids[int(object_pk)].add(user_id)
+
+    group_ids = defaultdict(set)
+    for object_pk, group_id in GroupObjectPermission.objects.filter(
+        **permission_filter,
+    ).values_list("object_pk", "group_id"):
+        group_ids[group_id].add(int(object_pk))
+    if group_ids:
+        for group_id, user_id in User.groups.through.objects.filter(
+            group_id__in=group_ids.keys(),
+        ).values_list("group_id", "user_id"):
+            for document_id in group_ids[group_id]:
+                viewer_ids[document_id].add(user_id)
+
+    return viewer_ids
+
+
+def _close_db_connections() -> None:
+    # Forked processes would share the connections of this process, which
+    # opens new ones on its next query. Connections in a transaction are left
+    # open, closing them would roll it back.
+    for conn in connections.all(initialized_only=True):
+        if not conn.in_atomic_block:
+            conn.close()
+
+
+def iter_document_fields(
+    documents,
+    chunk_size: int = 1000,
+    reader: Optional[IndexReader] = None,
+    close_connections: bool = False,
+) -> Iterator[dict]:
+    """
+    Yields the index fields of the given documents, fetching the documents
+    and everything related to them in chunks with a fixed number of queries
+    per chunk. The key terms are weighted by the given reader of the index.
+    If close_connections is set, the database connections are closed after
+    fetching each chunk, so processes forked by the consumer don't share them.
+    """
+    documents = (
+        documents.select_related(
+            "correspondent",
+            "document_type",
+            "storage_path",
+            "owner",
+        )
+        .prefetch_related(
+            "tags",
+            "notes",
+            Prefetch(
+                "custom_fields",
+                queryset=CustomFieldInstance.objects.select_related("field"),
+            ),
+        )
+        .order_by("pk")
     )
+    # Chunks are fetched by their ids, no cursor stays open in between
+    chunk = list(documents[:chunk_size])
+    while chunk:
+        viewer_ids = get_viewer_ids([doc.pk for doc in chunk])
+        if close_connections:
+            _close_db_connections()
+        for doc in chunk:
+            yield get_document_fields(
+                doc,
+                sorted(viewer_ids.get(doc.pk, ())),
+                reader=reader,
+            )
+        if len(chunk) < chunk_size:
+            break
+        chunk = list(documents.filter(pk__gt=chunk[-1].pk)[:chunk_size])
+
+
+# Number of documents of which each process computes the key terms at once
+KEY_TERMS_CHUNK_SIZE = 100
+
+# The reader of the index of a process computing key terms
+_key_terms_reader: Optional[IndexReader] = None
+
+
+def _init_key_terms_process(segments: list, generation: int) -> None:
+    global _key_terms_reader
+    # Opens the segments of the reader of the parent, its files cannot be
+    # shared between processes. The index might have been recreated since,
+    # so the segments are opened directly instead of the latest generation.
+    storage = FileStorage(settings.INDEX_DIR)
+    schema = get_schema()
+    readers = [SegmentReader(storage, schema, segment) for segment in segments]
+    if len(readers) == 1:
+        _key_terms_reader = readers[0]
+    else:
+        _key_terms_reader = MultiReader(readers, generation=generation)
+
+
+def _get_key_terms_of_chunk(
+    contents: list[str],
+) -> list[Optional[list[tuple[str, float]]]]:
+    return [get_key_terms(_key_terms_reader, content) for content in contents]
+
+
+def iter_document_fields_parallel(
+    documents,
+    reader: IndexReader,
+    processes: int,
+) -> Iterator[dict]:
+    """
+    Yields the index fields of the given documents like iter_document_fields,
+    computing the key terms, which takes most of the time, in the given number
+    of processes. The documents are fetched by this process.
+    """
+    segments = [leaf.segment() for leaf, _ in reader.leaf_readers()]
+    fields = iter_document_fields(documents, close_connections=True)
+    pending: deque = deque()
+    _close_db_connections()
+    with multiprocessing.Pool(
+        processes,
+        initializer=_init_key_terms_process,
+        initargs=(segments, reader.generation()),
+    ) as pool:
+        while True:
+            # Keep every process busy, without fetching all documents at once
+            while len(pending) < processes * 2 and (
+                chunk := list(islice(fields, KEY_TERMS_CHUNK_SIZE))
+            ):
+                pending.append(
+                    (
+                        chunk,
+                        pool.apply_async(
+                            _get_key_terms_of_chunk,
+                            ([doc_fields["content"] for doc_fields in chunk],),
+                        ),
+                    ),
+                )
+            if not pending:
+                break
+            chunk, result = pending.popleft()
+            for doc_fields, key_terms in zip(chunk, result.get()):
+                doc_fields["key_terms"] = key_terms
+                yield doc_fields
+
+
+def bulk_index_documents(
+    ix: FileIndex,
+    documents,
+    progress_bar_disable=True,
+    reader: Optional[IndexReader] = None,
+) -> int:
+    """
+    Adds the given documents to the index in one large transaction, using
+    multiple processes to index them and to compute their key terms if
+    configured, and merges the index into a single segment afterwards. The
+    key terms of the documents are weighted by the given reader, if any.
+
+    Returns the number of documents indexed.
+    """
+    if settings.INDEX_REINDEX_PROCS > 1:
+        # Each process writes its own segment, merged once all are written
+        writer = ix.writer(
+            procs=settings.INDEX_REINDEX_PROCS,
+            limitmb=settings.INDEX_REINDEX_MEMORY,
+            subargs={"limitmb": settings.INDEX_REINDEX_MEMORY},
+            multisegment=True,
+        )
+    else:
+        writer = ix.writer(limitmb=settings.INDEX_REINDEX_MEMORY)
+
+    if (
+        settings.INDEX_REINDEX_PROCS > 1
+        and reader is not None
+        and reader.doc_count() > 0
+    ):
+        all_fields = iter_document_fields_parallel(
+            documents,
+            reader,
+            settings.INDEX_REINDEX_PROCS,
+        )
+    else:
+        # The writer forks its processes while the documents are fetched
+        all_fields = iter_document_fields(
+            documents,
+            reader=reader,
+            close_connections=settings.INDEX_REINDEX_PROCS > 1,
+        )
+
+    count = 0
+    try:
+        for fields in tqdm.tqdm(
+            all_fields,
+            total=documents.count(),
+            disable=progress_bar_disable,
+        ):
+            writer.update_document(**fields)
+            count += 1
+    except Exception:
+        writer.cancel()
+        raise
+    writer.commit()
+    if settings.INDEX_REINDEX_PROCS > 1:
+        # One segment per process would slow down every search
+        ix.optimize()
+    return count
+
+
+def iter_indexed_versions(reader: IndexReader) -> Iterator[tuple[int, Optional[int]]]:
+    """
+    Yields the id of each document in the index with the time it was last
+    modified, as stored in the column of the modified field, in the order of
+    the ids. The time is None if the document is in the index more than once.
+    """
+    if not reader.doc_count_all():
+        # An empty index has no columns
+        return
+    id_field = reader.schema["id"]
+    modified = reader.column_reader("modified", translate=False)
+    for text in id_field.sortable_terms(reader, "id"):
+        docnums = list(reader.postings("id", text).all_ids())
+        if docnums:
+            yield (
+                id_field.from_bytes(text),
+                modified[docnums[0]] if len(docnums) == 1 else None,
+            )
+
+
+def sync_index(
+    ix: FileIndex,
+    reader: IndexReader,
+    progress_bar_disable=True,
+) -> tuple[int, int]:
+    """
+    Brings the index up to date with the database, instead of recreating it.
+    The documents and the index read by the given reader are both read in the
+    order of their ids. Documents which are not in the index or were modified
+    since they were indexed are indexed again, documents which no longer exist
+    are removed. Changes which do not change the modification time of a
+    document, like changed permissions, are not detected.
+
+    Returns the number of documents indexed and removed.
+    """
+    modified_field = reader.schema["modified"]
+    indexed = iter_indexed_versions(reader)
+    stale_ids: list[int] = []
+    orphan_ids: list[int] = []
+
+    indexed_id, indexed_modified = next(indexed, (None, None))
+    for doc_id, modified in (
+        Document.objects.order_by("pk")
+        .values_list("pk", "modified")
+        .iterator(chunk_size=2000)
+    ):
+        while indexed_id is not None and indexed_id < doc_id:
+            orphan_ids.append(indexed_id)
+            indexed_id, indexed_modified = next(indexed, (None, None))
+        if indexed_id != doc_id or indexed_modified != (
+            modified_field.to_column_value(modified)
+        ):
+            stale_ids.append(doc_id)
+        if indexed_id == doc_id:
+            indexed_id, indexed_modified = next(indexed, (None, None))
+    while indexed_id is not None:
+        orphan_ids.append(indexed_id)
+        indexed_id, indexed_modified = next(indexed, (None, None))
+
+    if not stale_ids and not orphan_ids:
+        return 0, 0
+
+    writer = ix.writer(limitmb=settings.INDEX_REINDEX_MEMORY)
+    try:
+        for doc_id in orphan_ids:
+            remove_document_by_id(writer, doc_id)
+        with tqdm.tqdm(total=len(stale_ids), disable=progress_bar_disable) as progress:
+            for i in range(0, len(stale_ids), 1000):
+                chunk = stale_ids[i : i + 1000]
+                for fields in iter_document_fields(
+                    Document.objects.filter(pk__in=chunk),
+                    reader=reader,
+                ):
+                    writer.update_document(**fields)
+                progress.update(len(chunk))
+    except Exception:
+        writer.cancel()
+        raise
+    writer.commit()
+    return len(stale_ids), len(orphan_ids)
+
+
+# Segments of about the same size are merged once there are this many
+MERGE_FACTOR = 10
+# Segments with this share of deleted documents are rewritten without them
+MERGE_DELETED_RATIO = 0.3
+# Documents merged per second assumed until a merge was timed
+MERGE_DOCUMENTS_PER_SECOND = 5000
+
+
+def _segment_size(ix: FileIndex, segment) -> int:
+    return sum(ix.storage.file_length(name) for name in segment.list_files(ix.storage))
+
+
+def get_segments(ix: FileIndex) -> list:
+    """
+    Returns the segments of the latest generation of the index
+    """
+    with ix.reader() as reader:
+        # An empty index has no segments
+        return [
+            leaf.segment()
+            for leaf, _ in reader.leaf_readers()
+            if leaf.segment() is not None
+        ]
+
+
+def get_index_stats(ix: FileIndex) -> dict:
+    """
+    Returns the number of segments of the index, the documents and deleted
+    documents in them and their size in bytes, in total and for each segment
+    """
+    segments = [
+        {
+            "documents": segment.doc_count(),
+            "deleted_documents": segment.deleted_count(),
+            "size_bytes": _segment_size(ix, segment),
+        }
+        for segment in get_segments(ix)
+    ]
+    return {
+        "segment_count": len(segments),
+        "documents": sum(segment["documents"] for segment in segments),
+        "deleted_documents": sum(segment["deleted_documents"] for segment in segments),
+        "size_bytes": sum(segment["size_bytes"] for segment in segments),
+        "segments": segments,
+    }
+
+
+def select_merge(segments: list, max_documents: Optional[float] = None) -> list:
+    """
+    Returns the segments which should be merged next, or none if the index is
+    merged well enough. Segments are grouped into tiers by the magnitude of
+    their number of documents, and the smallest tier with MERGE_FACTOR
+    segments is merged into one segment of the next tier. Otherwise the
+    smallest segment with many deleted documents is rewritten without them.
+    Merges of more than max_documents documents are left out.
+    """
+
+    def fits(selected: list) -> bool:
+        return max_documents is None or (
+            sum(segment.doc_count_all() for segment in selected) <= max_documents
+        )
+
+    tiers = defaultdict(list)
+    for segment in segments:
+        tier = int(math.log(max(segment.doc_count(), 1), MERGE_FACTOR))
+        tiers[tier].append(segment)
+    for tier in sorted(tiers):
+        if len(tiers[tier]) >= MERGE_FACTOR:
+            if fits(tiers[tier]):
+                return tiers[tier]
+            # The tiers above are larger still
+            break
+
+    deleted = [
+        segment
+        for segment in segments
+        if segment.deleted_count()
+        >= MERGE_DELETED_RATIO * max(segment.doc_count_all(), 1)
+        and fits([segment])
+    ]
+    if deleted:
+        return [min(deleted, key=lambda segment: segment.doc_count_all())]
+    return []
+
+
+def merge_segments(ix: FileIndex, time_limit: float) -> int:
+    """
+    Merges the segments of the index step by step as chosen by select_merge,
+    until the index is merged well enough or time_limit seconds passed. Each
+    step only holds the lock of the index while merging a few segments, so
+    other changes to the index are not blocked for long. Merges which would
+    not finish in the remaining time, estimated from the speed of the
+    merges before, are left out. Stops if the index is locked.
+
+    Returns the number of merges.
+    """
+    documents_per_second = MERGE_DOCUMENTS_PER_SECOND
+    max_documents = 0.0
+    merged_documents = 0
+
+    def merge_selected(writer, segments):
+        nonlocal merged_documents
+        selected = {
+            segment.segment_id() for segment in select_merge(segments, max_documents)
+        }
+        for segment in segments:
+            if segment.segment_id() in selected:
+                merged_documents += segment.doc_count_all()
+                reader = SegmentReader(writer.storage, writer.schema, segment)
+                writer.add_reader(reader)
+                reader.close()
+        return [segment for segment in segments if segment.segment_id() not in selected]
+
+    deadline = time.monotonic() + time_limit
+    merges = 0
+    while (now := time.monotonic()) < deadline:
+        max_documents = (deadline - now) * documents_per_second
+        if not select_merge(get_segments(ix), max_documents):
+            break
+        try:
+            writer = ix.writer()
+        except LockError:
+            logger.info("The index is locked, not merging segments")
+            break
+        merged_documents = 0
+        writer.commit(mergetype=merge_selected)
+        elapsed = time.monotonic() - now
+        if merged_documents and elapsed > 0:
+            documents_per_second = merged_documents / elapsed
+        merges += 1
+    return merges
 
 
 def remove_document(writer: AsyncWriter, doc: Document):
@@ -178,14 +807,283 @@ def remove_document_by_id(writer: AsyncWriter, doc_id):
     writer.delete_by_term("id", doc_id)
 
 
+# Seconds a flush waits for another process writing the index
+INDEX_WRITER_TIMEOUT = 60.0
+
+# Number of queued documents written to the index in one transaction
+INDEX_QUEUE_CHUNK_SIZE = 1000
+
+# Set while an update_index task scheduled by any process has not started yet
+INDEX_UPDATE_SCHEDULED_KEY = "index_update_scheduled"
+# Number of documents all processes queued since the task was last scheduled
+INDEX_UPDATES_QUEUED_KEY = "index_updates_queued"
+
+
+def _queue_index_update(document_id: int, remove: bool = False) -> None:
+    """
+    Queues the document in the database, in the transaction changing it,
+    and schedules the update_index task to write the queue to the index once
+    the change is committed. This way, many saves in a short time do not each
+    wait for the index lock and write a tiny segment, and no change is lost
+    if a process dies before it is written.
+    """
+    IndexUpdate.objects.create(document_id=document_id, remove=remove)
+    transaction.on_commit(_schedule_index_update)
+
+
+def _schedule_index_update() -> None:
+    """
+    Schedules the update_index task after INDEX_UPDATE_DELAY seconds, unless
+    any process scheduled it already and it has not started yet, or right
+    away once all processes queued INDEX_UPDATE_BATCH_SIZE documents. The
+    processes share this through the cache, without it every change
+    schedules the task.
+    """
+    from documents.tasks import update_index
+
+    countdown = settings.INDEX_UPDATE_DELAY
+    try:
+        cache.add(INDEX_UPDATES_QUEUED_KEY, 0, None)
+        if cache.incr(INDEX_UPDATES_QUEUED_KEY) >= settings.INDEX_UPDATE_BATCH_SIZE:
+            countdown = 0
+        # The task clears this when it starts, the timeout only guards against
+        # tasks that never run. Some caches only take whole seconds.
+        elif not cache.add(INDEX_UPDATE_SCHEDULED_KEY, True, math.ceil(countdown)):
+            # The task scheduled before writes this too
+            return
+    except Exception as e:
+        logger.debug(f"Could not share scheduled index updates: {e}")
+
+    try:
+        update_index.apply_async(countdown=countdown)
+    except Exception as e:
+        # The change is committed, the documents stay queued until the next
+        # scheduled index optimization writes them
+        logger.warning(f"Could not schedule writing queued index updates: {e}")
+        # The next change schedules the task again
+        clear_index_update_schedule()
+        return
+    try:
+        cache.delete(INDEX_UPDATES_QUEUED_KEY)
+    except Exception as e:
+        logger.debug(f"Could not share scheduled index updates: {e}")
+
+
+def clear_index_update_schedule() -> None:
+    """
+    Lets the next change schedule the update_index task again. Called by the
+    task before it reads the queue, so no change committed after is missed.
+    """
+    try:
+        cache.delete(INDEX_UPDATE_SCHEDULED_KEY)
+    except Exception as e:
+        logger.debug(f"Could not share scheduled index updates: {e}")
+
+
+def get_index_queue_depth() -> int:
+    """
+    Returns the number of documents waiting to be written to the index
+    """
+    return IndexUpdate.objects.values("document_id").distinct().count()
+
+
+def flush_index_queue(timeout: float = INDEX_WRITER_TIMEOUT) -> int:
+    """
+    Writes all queued documents to the index, waiting up to timeout seconds
+    for another process writing the index. Documents stay queued until they
+    are written, so that the next flush writes them if this one fails.
+
+    Returns the number of documents written.
+    """
+    written = 0
+    while True:
+        queued = list(
+            IndexUpdate.objects.order_by("pk").values_list(
+                "pk",
+                "document_id",
+                "remove",
+            )[:INDEX_QUEUE_CHUNK_SIZE],
+        )
+        if not queued:
+            return written
+
+        # The latest change of each document wins
+        pending = {document_id: remove for _, document_id, remove in queued}
+        logger.debug(f"Writing {len(pending)} queued document(s) to the index")
+        written += len(pending)
+        _write_queued(pending, timeout)
+        IndexUpdate.objects.filter(pk__in=[pk for pk, _, _ in queued]).delete()
+
+
+def _write_queued(pending: dict[int, bool], timeout: float) -> None:
+    writer = open_index().writer(timeout=timeout)
+    try:
+        with open_index_searcher() as searcher:
+            update_ids = [doc_id for doc_id, remove in pending.items() if not remove]
+            for fields in iter_document_fields(
+                Document.objects.filter(id__in=update_ids),
+                reader=searcher.reader(),
+            ):
+                writer.update_document(**fields)
+                pending.pop(fields["id"])
+            # Removed documents and those which do not exist anymore
+            for doc_id in pending:
+                remove_document_by_id(writer, doc_id)
+    except Exception:
+        writer.cancel()
+        raise
+    writer.commit()
+
+
 def add_or_update_document(document: Document):
-    with open_index_writer() as writer:
-        update_document(writer, document)
+    if settings.INDEX_UPDATE_DELAY > 0:
+        _queue_index_update(document.pk)
+    else:
+        with open_index_writer() as writer:
+            update_document(writer, document)
 
 
 def remove_document_from_index(document: Document):
-    with open_index_writer() as writer:
-        remove_document(writer, document)
+    if settings.INDEX_UPDATE_DELAY > 0:
+        _queue_index_update(document.pk, remove=True)
+    else:
+        with open_index_writer() as writer:
+            remove_document(writer, document)
+
+
+def _segment_ids(reader: IndexReader) -> tuple[str, ...]:
+    # An empty index has no segments
+    return tuple(
+        r.segment().segment_id()
+        for r, _ in reader.leaf_readers()
+        if r.segment() is not None
+    )
+
+
+def _reader_version(reader: IndexReader) -> tuple:
+    """
+    Identifies the version of the index the reader reads, document numbers
+    refer to the same documents in readers of the same version
+    """
+    return reader.generation(), _segment_ids(reader)
+
+
+class SearchRanking:
+    """
+    The ranking of the first documents matching a search, with the scores of
+    the documents unless the search was sorted by a field, and the number of
+    all documents matching it
+    """
+
+    def __init__(
+        self,
+        q: query.Query,
+        mask,
+        top_n: list[tuple],
+        scored: bool,
+        total: int,
+    ):
+        self.query = q
+        self.mask = mask
+        self.docnums = array("q", (docnum for _, docnum in top_n))
+        self.scores = array("d", (score for score, _ in top_n)) if scored else None
+        self.total = total
+        self.created = time.monotonic()
+        # All matching documents in the order of the index, unless all of
+        # them are ranked, see DelayedQuery.get_result_ids()
+        self.matched: Optional[array] = None
+        self._ids: Optional[list[int]] = None
+
+    def __len__(self):
+        return self.total
+
+    @property
+    def complete(self) -> bool:
+        return len(self.docnums) >= self.total
+
+    def covers(self, end: Optional[int]) -> bool:
+        """
+        Returns whether the first end documents are ranked, or all if None
+        """
+        return self.complete or (end is not None and end <= len(self.docnums))
+
+    def top_n(self, end: int) -> list[tuple]:
+        scores = self.scores[:end] if self.scores is not None else repeat(None)
+        return list(zip(scores, self.docnums[:end]))
+
+    def ids(self, searcher: Searcher) -> list[int]:
+        if self._ids is None:
+            docnums = self.docnums if self.complete else self.matched
+            document_ids = get_document_ids(
+                searcher,
+                # Reading all documents is about twice as fast per document
+                build=len(docnums) * 2 >= searcher.doc_count_all(),
+            )
+            if document_ids is not None:
+                self._ids = [document_ids[docnum] for docnum in docnums]
+            else:
+                self._ids = [searcher.stored_fields(docnum)["id"] for docnum in docnums]
+        return self._ids
+
+
+class RankedResults(Results):
+    """
+    Results for the first hits of a ranking, which know the total number of
+    hits without a collector
+    """
+
+    def __init__(self, searcher: Searcher, ranking: SearchRanking, end: int):
+        super().__init__(searcher, ranking.query, ranking.top_n(end))
+        self.ranking = ranking
+
+    def __len__(self):
+        return len(self.ranking)
+
+    def docs(self):
+        # Only the ranked documents
+        if self.docset is None:
+            self.docset = set(self.ranking.docnums)
+        return self.docset
+
+
+# Document ids by document number, by the version of the index
+_document_ids: OrderedDict[tuple, array] = OrderedDict()
+_document_ids_lock = threading.Lock()
+DOCUMENT_IDS_MAX = 4
+
+
+def get_document_ids(searcher: Searcher, build: bool = True) -> Optional[array]:
+    """
+    Returns the id of each document number of the searcher, or 0 for deleted
+    documents. These are read from the stored fields of all documents once
+    for each version of the index, unless build is False.
+    """
+    key = _reader_version(searcher.reader())
+    with _document_ids_lock:
+        if key in _document_ids:
+            _document_ids.move_to_end(key)
+            return _document_ids[key]
+    if not build:
+        return None
+
+    document_ids = array("q", bytes(8 * searcher.doc_count_all()))
+    for docnum, fields in searcher.reader().iter_docs():
+        document_ids[docnum] = fields["id"]
+    with _document_ids_lock:
+        _document_ids[key] = document_ids
+        while len(_document_ids) > DOCUMENT_IDS_MAX:
+            _document_ids.popitem(last=False)
+    return document_ids
+
+
+# Rankings of recent searches, by the search, the user and the index version
+_search_rankings: OrderedDict[tuple, SearchRanking] = OrderedDict()
+_search_rankings_lock = threading.Lock()
+SEARCH_RANKINGS_MAX = 32
+# Number of pages ranked ahead of the requested page
+SEARCH_RANKING_PAGES = 5
+# Relative dates in queries, like "added:today", change over time
+SEARCH_RANKINGS_MAX_AGE = 300
 
 
 class DelayedQuery:
@@ -205,7 +1103,7 @@ class DelayedQuery:
     def _get_query(self):
         raise NotImplementedError
 
-    def _get_query_filter(self):
+    def _get_criterias(self) -> list[query.Query]:
         criterias = []
         for key, value in self.query_params.items():
             # is_tagged is a special case
@@ -270,6 +1168,10 @@ class DelayedQuery:
                     query.Prefix(field, value),
                 )
 
+        return criterias
+
+    def _get_query_filter(self):
+        criterias = self._get_criterias()
         user_criterias = get_permissions_criterias(
             user=self.user,
         )
@@ -280,6 +1182,111 @@ class DelayedQuery:
         else:
             return query.Or(user_criterias) if len(user_criterias) > 0 else None
 
+    def _get_search_filter(self):
+        """
+        Returns the same filter as _get_query_filter(), but with the
+        permissions as the cached set of documents the user may view
+        """
+        criterias = self._get_criterias()
+        permission_filter = get_permission_filter(self.searcher, self.user)
+        if len(criterias) > 0:
+            if permission_filter is not None:
+                # Intersecting two bitsets only combines their bytes
+                return permission_filter.intersection(
+                    BitSet(
+                        self.searcher.docs_for_query(query.And(criterias)),
+                        size=self.searcher.doc_count_all(),
+                    ),
+                )
+            return query.And(criterias)
+        else:
+            return permission_filter
+
+    def _get_cache_key(self) -> tuple:
+        """
+        Returns the query parameters which change the ranking, normalized
+        """
+        params = []
+        for key, value in self.query_params.items():
+            if key in {"query", "more_like_id", "ordering", "is_tagged"}:
+                params.append((key, " ".join(value.split())))
+            elif "__" in key and key.split("__", 1)[0] in self.param_map:
+                params.append((key, value))
+        return (
+            type(self).__name__,
+            tuple(sorted(params)),
+            getattr(self.user, "id", None),
+            getattr(self.user, "is_superuser", False),
+            _reader_version(self.searcher.reader()),
+        )
+
+    def _get_ranking(self, end: int) -> SearchRanking:
+        """
+        Returns a ranking of at least the first end documents matching the
+        query, from recent searches with the same parameters in the same index
+        if possible. A few pages more are ranked, and twice as many as before
+        when a ranking does not reach far enough, instead of ranking all
+        documents for the first page.
+        """
+        key = self._get_cache_key()
+        with _search_rankings_lock:
+            ranking = _search_rankings.get(key)
+            if (
+                ranking is not None
+                and time.monotonic() - ranking.created >= SEARCH_RANKINGS_MAX_AGE
+            ):
+                del _search_rankings[key]
+                ranking = None
+            if ranking is not None and ranking.covers(end):
+                _search_rankings.move_to_end(key)
+                return ranking
+
+        limit = max(end, SEARCH_RANKING_PAGES * self.page_size, 1)
+        if ranking is not None:
+            limit = max(limit, 2 * len(ranking.docnums))
+
+        q, mask = self._get_query()
+        sortedby, reverse = self._get_query_sortedby()
+        results = self.searcher.search(
+            q,
+            mask=mask,
+            filter=self._get_search_filter(),
+            limit=limit,
+            sortedby=sortedby,
+            reverse=reverse,
+        )
+        ranking = SearchRanking(
+            q,
+            mask,
+            results.top_n,
+            scored=sortedby is None,
+            total=len(results),
+        )
+
+        with _search_rankings_lock:
+            _search_rankings[key] = ranking
+            while len(_search_rankings) > SEARCH_RANKINGS_MAX:
+                _search_rankings.popitem(last=False)
+        return ranking
+
+    def get_result_ids(self) -> list[int]:
+        """
+        Returns the ids of all documents matching the query, in ranked order
+        if all of them are ranked already, otherwise in the order of the index
+        """
+        ranking = self._get_ranking(self.page_size)
+        if not ranking.complete and ranking.matched is None:
+            # Collecting the documents without scoring or sorting them
+            results = self.searcher.search(
+                ranking.query,
+                mask=ranking.mask,
+                filter=self._get_search_filter(),
+                limit=None,
+                scored=False,
+            )
+            ranking.matched = array("q", (docnum for _, docnum in results.top_n))
+        return ranking.ids(self.searcher)
+
     def evalBoolean(self, val):
         return val.lower() in {"true", "1"}
 
@@ -328,23 +1335,19 @@ class DelayedQuery:
         if item.start in self.saved_results:
             return self.saved_results[item.start]
 
-        q, mask = self._get_query()
-        sortedby, reverse = self._get_query_sortedby()
+        pagenum = math.floor(item.start / self.page_size) + 1
+        ranking = self._get_ranking(pagenum * self.page_size)
 
-        page: ResultsPage = self.searcher.search_page(
-            q,
-            mask=mask,
-            filter=self._get_query_filter(),
-            pagenum=math.floor(item.start / self.page_size) + 1,
-            pagelen=self.page_size,
-            sortedby=sortedby,
-            reverse=reverse,
+        page = ResultsPage(
+            RankedResults(self.searcher, ranking, pagenum * self.page_size),
+            pagenum,
+            self.page_size,
         )
         page.results.fragmenter = highlight.ContextFragmenter(surround=50)
         page.results.formatter = HtmlFormatter(tagname="span", between=" ... ")
 
-        if not self.first_score and len(page.results) > 0 and sortedby is None:
-            self.first_score = page.results[0].score
+        if not self.first_score and len(ranking) > 0 and ranking.scores is not None:
+            self.first_score = ranking.scores[0]
 
         page.results.top_n = list(
             map(
@@ -410,16 +1413,21 @@ class DelayedFullTextQuery(DelayedQuery):
 class DelayedMoreLikeThisQuery(DelayedQuery):
     def _get_query(self):
         more_like_doc_id = int(self.query_params["more_like_id"])
-        content = Document.objects.get(id=more_like_doc_id).content
 
         docnum = self.searcher.document_number(id=more_like_doc_id)
-        kts = self.searcher.key_terms_from_text(
-            "content",
-            content,
-            numterms=20,
-            model=classify.Bo1Model,
-            normalize=False,
-        )
+        kts = None
+        if docnum is not None:
+            kts = self.searcher.stored_fields(docnum).get("key_terms")
+        if kts is None:
+            # Indexed without key terms
+            content = Document.objects.get(id=more_like_doc_id).content
+            kts = self.searcher.key_terms_from_text(
+                "content",
+                content,
+                numterms=MORE_LIKE_THIS_TERMS,
+                model=classify.Bo1Model,
+                normalize=False,
+            )
         q = query.Or(
             [query.Term("content", word, boost=weight) for word, weight in kts],
         )
@@ -428,11 +1436,349 @@ class DelayedMoreLikeThisQuery(DelayedQuery):
         return q, mask
 
 
+class _AutocompleteBlock:
+    """
+    The terms in the content of the documents in one segment of the index
+    which start with the same character, sorted for looking up prefixes,
+    with the number of documents containing each term in each group of
+    documents, see AutocompleteTerms.
+    """
+
+    def __init__(self, reader: IndexReader, first: bytes, document_groups):
+        import numpy as np
+
+        # Documents deleted later are subtracted when completing, see complete
+        self.deleted = frozenset(reader.segment().deleted_docs())
+
+        # For term i, the groups containing it are groups[starts[i]:starts[i + 1]]
+        # with the number of documents and the first document of each
+        self.terms: list[bytes] = []
+        starts = [0]
+        groups = []
+        counts = []
+        firsts = []
+        for text in reader.expand_prefix("content", first):
+            docnums = np.fromiter(
+                reader.postings("content", text).all_ids(),
+                dtype=np.int64,
+            )
+            if len(docnums) == 0:
+                # Only in deleted documents
+                continue
+            term_groups, first_indexes, term_counts = np.unique(
+                document_groups[docnums],
+                return_index=True,
+                return_counts=True,
+            )
+            self.terms.append(text)
+            starts.append(starts[-1] + len(term_groups))
+            groups.append(term_groups)
+            counts.append(term_counts)
+            firsts.append(docnums[first_indexes])
+
+        self.starts = np.array(starts, dtype=np.int64)
+        self.groups = np.concatenate(groups or [np.zeros(0, dtype=np.int32)])
+        self.counts = np.concatenate(counts or [np.zeros(0, dtype=np.int64)])
+        self.firsts = np.concatenate(firsts or [np.zeros(0, dtype=np.int64)])
+        # Documents deleted since, and by term the number of them in each group
+        self._corrections: tuple[frozenset[int], dict[int, object]] = (
+            frozenset(),
+            {},
+        )
+        self._lock = threading.Lock()
+
+    def _deleted_counts(
+        self,
+        reader: IndexReader,
+        index: int,
+        corrections: dict[int, object],
+        document_groups,
+    ):
+        """
+        Returns how many of the documents deleted since the terms were read
+        contained the term with the given index, for each group of the term
+        """
+        import numpy as np
+
+        with self._lock:
+            correction = corrections.get(index)
+        if correction is None:
+            start, end = self.starts[index], self.starts[index + 1]
+            groups = self.groups[start:end]
+            # The postings leave out the deleted documents, the difference to
+            # the numbers read before is the number of deleted ones
+            docnums = np.fromiter(
+                reader.postings("content", self.terms[index]).all_ids(),
+                dtype=np.int64,
+            )
+            current = np.zeros(end - start, dtype=np.int64)
+            np.add.at(
+                current,
+                np.searchsorted(groups, document_groups[docnums]),
+                1,
+            )
+            correction = self.counts[start:end] - current
+            with self._lock:
+                corrections[index] = correction
+        return correction
+
+    def counts_of(self, start: int, end: int, reader: IndexReader, document_groups):
+        """
+        Returns the number of documents in each group of the terms from start
+        to end, leaving out documents deleted from the segment since the
+        terms were read. Only the postings of these terms are looked at.
+        """
+        import numpy as np
+
+        counts = self.counts[self.starts[start] : self.starts[end]]
+        deleted = frozenset(reader.segment().deleted_docs()) - self.deleted
+        with self._lock:
+            corrected_for, corrections = self._corrections
+            if deleted != corrected_for:
+                corrections = {}
+                self._corrections = (deleted, corrections)
+        if deleted:
+            # The first document is left as is, it only breaks ties
+            counts = counts - np.concatenate(
+                [
+                    self._deleted_counts(
+                        reader,
+                        index,
+                        corrections,
+                        document_groups,
+                    )
+                    for index in range(start, end)
+                ],
+            )
+        return counts
+
+
+class AutocompleteTerms:
+    """
+    The terms in the content of the documents in one segment of the index,
+    with the number of documents containing each term. Documents are grouped
+    by their owner and viewers, and the numbers are kept for each group, so
+    that they can be counted for any user without looking at the documents
+    again. The terms are read only once a prefix starting with their first
+    character is completed, see _AutocompleteBlock.
+    """
+
+    def __init__(self, reader: IndexReader):
+        import numpy as np
+
+        # Documents deleted before the segment was read
+        self.deleted = frozenset(reader.segment().deleted_docs())
+
+        # Documents without an owner are visible to everyone, group None
+        owners: dict[int, int] = {}
+        owner_field = reader.schema["owner_id"]
+        for text in owner_field.sortable_terms(reader, "owner_id"):
+            owner_id = owner_field.from_bytes(text)
+            for docnum in reader.postings("owner_id", text).all_ids():
+                owners[docnum] = owner_id
+        viewers: dict[int, list[int]] = defaultdict(list)
+        for text in reader.lexicon("viewer_id"):
+            for docnum in reader.postings("viewer_id", text).all_ids():
+                viewers[docnum].append(int(text))
+
+        self.groups: list[Optional[tuple[int, frozenset[int]]]] = [None]
+        group_numbers = {None: 0}
+        document_groups = np.zeros(reader.doc_count_all(), dtype=np.int32)
+        for docnum, owner_id in owners.items():
+            group = (owner_id, frozenset(viewers[docnum]))
+            if group not in group_numbers:
+                group_numbers[group] = len(self.groups)
+                self.groups.append(group)
+            document_groups[docnum] = group_numbers[group]
+
+        self._document_groups = document_groups
+        # Filled by the threads completing terms, like the other caches of
+        # this module only under the lock
+        self._blocks: dict[bytes, _AutocompleteBlock] = {}
+        self._visible: dict[Optional[int], object] = {}
+        self._lock = threading.Lock()
+
+    def _visible_groups(self, user: Optional[User]):
+        """
+        Returns which groups of documents the user may view, the same way as
+        get_permissions_criterias
+        """
+        import numpy as np
+
+        user_id = user.id if user is not None else None
+        with self._lock:
+            visible = self._visible.get(user_id)
+        if visible is None:
+            visible = np.array(
+                [
+                    group is None
+                    or (
+                        user_id is not None
+                        and (group[0] == user_id or user_id in group[1])
+                    )
+                    for group in self.groups
+                ],
+            )
+            with self._lock:
+                visible = self._visible.setdefault(user_id, visible)
+        return visible
+
+    def _block(self, reader: IndexReader, prefix: bytes) -> _AutocompleteBlock:
+        first = prefix.decode("utf-8")[0].encode("utf-8")
+        with self._lock:
+            block = self._blocks.get(first)
+        if block is None:
+            # Read without the lock, a block read twice at the same time is
+            # only kept once
+            block = _AutocompleteBlock(reader, first, self._document_groups)
+            with self._lock:
+                block = self._blocks.setdefault(first, block)
+        return block
+
+    def complete(
+        self,
+        prefix: bytes,
+        reader: IndexReader,
+        user: Optional[User] = None,
+    ):
+        """
+        Returns the terms starting with the prefix in documents visible to the
+        user, the number of these documents containing them, and the first one.
+        The reader of the segment is used to read the terms starting with the
+        same character as the prefix, if not read before, and to leave out
+        documents deleted since they were read.
+        """
+        import numpy as np
+
+        block = self._block(reader, prefix)
+        start = bisect_left(block.terms, prefix)
+        # 0xff never occurs in UTF-8
+        end = bisect_left(block.terms, prefix + b"\xff", start)
+        if start == end:
+            return [], np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        offsets = block.starts[start : end + 1]
+        entries = slice(offsets[0], offsets[-1])
+        counts = block.counts_of(start, end, reader, self._document_groups)
+        firsts = block.firsts[entries]
+        if user is None or not user.is_superuser:
+            visible = self._visible_groups(user)[block.groups[entries]]
+            counts = np.where(visible, counts, 0)
+            firsts = np.where(visible, firsts, np.iinfo(np.int64).max)
+        indexes = offsets[:-1] - offsets[0]
+        counts = np.add.reduceat(counts, indexes)
+        firsts = np.minimum.reduceat(firsts, indexes)
+        visible = np.flatnonzero(counts)
+        return (
+            [block.terms[start + i] for i in visible.tolist()],
+            counts[visible],
+            firsts[visible],
+        )
+
+
+class AutocompleteTermsCache:
+    """
+    Keeps the autocomplete terms of each segment of the index. Segments do
+    not change once written except for deleting documents, which are left
+    out when completing. A segment is only read again once many of its
+    documents were deleted since, so that leaving them out stays cheap.
+    """
+
+    # Share of the documents of a segment deleted before it is read again
+    REBUILD_DELETED_SHARE = 0.1
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._segments: dict[str, AutocompleteTerms] = {}
+
+    def get(self, reader: IndexReader) -> list[tuple[AutocompleteTerms, int, object]]:
+        """
+        Returns the terms of each segment of the reader, the number of the
+        first document of the segment in the reader and the segment reader
+        """
+        result = []
+        with self._lock:
+            segments = {}
+            for segment_reader, offset in reader.leaf_readers():
+                segment = segment_reader.segment()
+                if segment is None:
+                    continue
+                key = segment.segment_id()
+                terms = self._segments.get(key)
+                if terms is None or (
+                    segment.deleted_count() - len(terms.deleted)
+                    > segment.doc_count_all() * self.REBUILD_DELETED_SHARE
+                ):
+                    terms = AutocompleteTerms(segment_reader)
+                segments[key] = terms
+                result.append((terms, offset, segment_reader))
+            self._segments = segments
+        return result
+
+
+_autocomplete_terms = AutocompleteTermsCache()
+
+# A term as split from the content by the analyzer of the content field
+_AUTOCOMPLETE_TERM_RE = re.compile(r"\w+(?:\.\w+)*")
+
+
 def autocomplete(
     ix: FileIndex,
     term: str,
     limit: int = 10,
     user: Optional[User] = None,
+):
+    """
+    Returns the terms starting with term, which are contained in the most
+    documents visible to the user
+    """
+    term = term.lower()
+    if not _AUTOCOMPLETE_TERM_RE.fullmatch(term):
+        return _search_autocomplete(ix, term, limit, user)
+
+    import numpy as np
+
+    prefix = term.encode("utf-8")
+    terms: list[bytes] = []
+    counts = []
+    firsts = []
+    with _searcher_pool.searcher(ix) as s:
+        segments = _autocomplete_terms.get(s.reader())
+        for segment_terms, offset, segment_reader in segments:
+            texts, segment_counts, segment_firsts = segment_terms.complete(
+                prefix,
+                segment_reader,
+                user,
+            )
+            terms.extend(texts)
+            counts.append(segment_counts)
+            firsts.append(segment_firsts + offset)
+    if not terms:
+        return []
+    counts = np.concatenate(counts)
+    firsts = np.concatenate(firsts)
+
+    if len(segments) > 1:
+        # The same term may be in several segments
+        totals = Counter()
+        first = {}
+        for text, count, docnum in zip(terms, counts.tolist(), firsts.tolist()):
+            totals[text] += count
+            first[text] = min(first.get(text, docnum), docnum)
+        terms = sorted(totals)
+        counts = np.array([totals[text] for text in terms], dtype=np.int64)
+        firsts = np.array([first[text] for text in terms], dtype=np.int64)
+
+    # Most documents first, then the term found first, then in order
+    order = np.lexsort((firsts, -counts))
+    return [terms[i] for i in order[:limit].tolist()]
+
+
+def _search_autocomplete(
+    ix: FileIndex,
+    term: str,
+    limit: int = 10,
+    user: Optional[User] = None,
 ):
     """
     Mimics whoosh.reading.IndexReader.most_distinctive_terms with permissions
@@ -440,18 +1786,17 @@ def autocomplete(
     """
     terms = []
 
-    with ix.searcher(weighting=TF_IDF()) as s:
+    with _searcher_pool.searcher(ix, weighting=TF_IDF()) as s:
         qp = QueryParser("content", schema=ix.schema)
         # Don't let searches with a query that happen to match a field override the
         # content field query instead and return bogus, not text data
         qp.remove_plugin_class(FieldsPlugin)
         q = qp.parse(f"{term.lower()}*")
-        user_criterias = get_permissions_criterias(user)
 
         results = s.search(
             q,
             terms=True,
-            filter=query.Or(user_criterias) if user_criterias is not None else None,
+            filter=get_permission_filter(s, user),
         )
 
         termCounts = Counter()
@@ -464,6 +1809,46 @@ def autocomplete(
     return terms
 
 
+# Documents each user may view, by the version of the index they were read from
+_permission_filters: OrderedDict[tuple, BitSet] = OrderedDict()
+_permission_filters_lock = threading.Lock()
+PERMISSION_FILTERS_MAX = 128
+
+
+def get_permission_filter(
+    searcher: Searcher,
+    user: Optional[User] = None,
+) -> Optional[BitSet]:
+    """
+    Returns the numbers of the documents in the searcher the user may view,
+    or None if the user may view all documents. These only change with the
+    index, since the permissions are stored in it, so they are cached for
+    each version of the index the searcher reads.
+    """
+    user_criterias = get_permissions_criterias(user)
+    if not user_criterias:
+        return None
+
+    key = (
+        _reader_version(searcher.reader()),
+        user.id if user is not None else None,
+    )
+    with _permission_filters_lock:
+        if key in _permission_filters:
+            _permission_filters.move_to_end(key)
+            return _permission_filters[key]
+
+    permission_filter = BitSet(
+        searcher.docs_for_query(query.Or(user_criterias)),
+        size=searcher.doc_count_all(),
+    )
+    with _permission_filters_lock:
+        _permission_filters[key] = permission_filter
+        while len(_permission_filters) > PERMISSION_FILTERS_MAX:
+            _permission_filters.popitem(last=False)
+    return permission_filter
+
+
 def get_permissions_criterias(user: Optional[User] = None):
     user_criterias = [query.Term("has_owner", False)]
     if user is not None:
@@ -10,6 +10,7 @@ from django.contrib.auth.models import Permission
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import FieldDoesNotExist
+from django.core.exceptions import ImproperlyConfigured
 from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.core.management.base import CommandError
@@ -182,11 +183,16 @@ class Command(BaseCommand):
             self._import_files_from_manifest(options["no_progress_bar"])
 
         self.stdout.write("Updating search index...")
-        call_command(
-            "document_index",
-            "reindex",
-            no_progress_bar=options["no_progress_bar"],
-        )
+        try:
+            call_command(
+                "document_index",
+                "sync",
+                no_progress_bar=options["no_progress_bar"],
+            )
+        except ImproperlyConfigured as e:
+            self.stdout.write(
+                self.style.WARNING(f"Not updating the search index: {e}"),
+            )
 
     @staticmethod
     def _check_manifest_exists(path: Path):
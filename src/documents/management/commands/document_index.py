@@ -1,22 +1,67 @@
+import time
+
+from django.conf import settings
 from django.core.management import BaseCommand
-from django.db import transaction
+from django.core.management.base import CommandError
 
 from documents.management.commands.mixins import ProgressBarMixin
+from documents.search import drop_database_index
 from documents.tasks import index_optimize
 from documents.tasks import index_reindex
+from documents.tasks import index_sync
 
 
 class Command(ProgressBarMixin, BaseCommand):
     help = "Manages the document index."
 
     def add_arguments(self, parser):
-        parser.add_argument("command", choices=["reindex", "optimize"])
+        parser.add_argument("command", choices=["reindex", "sync", "optimize"])
+        parser.add_argument(
+            "--drop-database-index",
+            default=False,
+            action="store_true",
+            help="Remove the full text index of the database first, which only "
+            "the SQLite search backend uses, but the database keeps "
+            "updating until it is removed",
+        )
         self.add_argument_progress_bar_mixin(parser)
 
     def handle(self, *args, **options):
         self.handle_progress_bar_mixin(**options)
-        with transaction.atomic():
-            if options["command"] == "reindex":
-                index_reindex(progress_bar_disable=self.no_progress_bar)
-            elif options["command"] == "optimize":
-                index_optimize()
+        if options["drop_database_index"]:
+            if settings.SEARCH_BACKEND == "sqlite":
+                raise CommandError(
+                    "The full text index of the database is used by the "
+                    "SQLite search backend",
+                )
+            drop_database_index()
+            self.stdout.write("Removed the full text index of the database")
+        if options["command"] == "reindex":
+            start = time.perf_counter()
+            count = index_reindex(progress_bar_disable=self.no_progress_bar)
+            duration = time.perf_counter() - start
+            self.stdout.write(
+                f"Indexed {count} documents in {duration:.1f} seconds "
+                f"({count / max(duration, 0.001):.1f} documents/s)",
+            )
+        elif options["command"] == "sync":
+            updated, removed = index_sync(
+                progress_bar_disable=self.no_progress_bar,
+            )
+            self.stdout.write(
+                f"Updated {updated} documents, removed {removed} documents",
+            )
+        elif options["command"] == "optimize":
+            stats = index_optimize()
+            if "segment_count" in stats:
+                self.stdout.write(
+                    f"The index has {stats['segment_count']} segments "
+                    f"with {stats['documents']} documents "
+                    f"({stats['deleted_documents']} deleted), "
+                    f"{stats['size_bytes'] / 1024**2:.1f} MiB",
+                )
+            if "queued_documents" in stats:
+                self.stdout.write(
+                    f"{stats['queued_documents']} changed documents are "
+                    f"queued for the index",
+                )
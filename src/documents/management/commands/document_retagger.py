@@ -1,4 +1,5 @@
 import logging
+from itertools import islice
 
 import tqdm
 from django.core.management.base import BaseCommand
@@ -15,6 +16,9 @@ logger = logging.getLogger("paperless.management.retagger")
 
 
 class Command(ProgressBarMixin, BaseCommand):
+    # Number of documents the classifier predicts at once
+    BATCH_SIZE = 1000
+
     help = (
         "Using the current classification model, assigns correspondents, tags "
         "and document types to all documents, effectively allowing you to "
@@ -86,49 +90,59 @@ class Command(ProgressBarMixin, BaseCommand):
 
         classifier = load_classifier()
 
-        for document in tqdm.tqdm(documents, disable=self.no_progress_bar):
-            if options["correspondent"]:
-                set_correspondent(
-                    sender=None,
-                    document=document,
-                    classifier=classifier,
-                    replace=options["overwrite"],
-                    use_first=options["use_first"],
-                    suggest=options["suggest"],
-                    base_url=options["base_url"],
-                    color=color,
+        iterator = iter(tqdm.tqdm(documents, disable=self.no_progress_bar))
+        while batch := list(islice(iterator, self.BATCH_SIZE)):
+            if classifier:
+                # Vectorize and classify the whole batch at once, the handlers
+                # below then use these predictions
+                classifier.predict_all(
+                    [document.content for document in batch],
+                    [document.pk for document in batch],
                 )
 
-            if options["document_type"]:
-                set_document_type(
-                    sender=None,
-                    document=document,
-                    classifier=classifier,
-                    replace=options["overwrite"],
-                    use_first=options["use_first"],
-                    suggest=options["suggest"],
-                    base_url=options["base_url"],
-                    color=color,
-                )
+            for document in batch:
+                if options["correspondent"]:
+                    set_correspondent(
+                        sender=None,
+                        document=document,
+                        classifier=classifier,
+                        replace=options["overwrite"],
+                        use_first=options["use_first"],
+                        suggest=options["suggest"],
+                        base_url=options["base_url"],
+                        color=color,
+                    )
 
-            if options["tags"]:
-                set_tags(
-                    sender=None,
-                    document=document,
-                    classifier=classifier,
-                    replace=options["overwrite"],
-                    suggest=options["suggest"],
-                    base_url=options["base_url"],
-                    color=color,
-                )
-            if options["storage_path"]:
-                set_storage_path(
-                    sender=None,
-                    document=document,
-                    classifier=classifier,
-                    replace=options["overwrite"],
-                    use_first=options["use_first"],
-                    suggest=options["suggest"],
-                    base_url=options["base_url"],
-                    color=color,
-                )
+                if options["document_type"]:
+                    set_document_type(
+                        sender=None,
+                        document=document,
+                        classifier=classifier,
+                        replace=options["overwrite"],
+                        use_first=options["use_first"],
+                        suggest=options["suggest"],
+                        base_url=options["base_url"],
+                        color=color,
+                    )
+
+                if options["tags"]:
+                    set_tags(
+                        sender=None,
+                        document=document,
+                        classifier=classifier,
+                        replace=options["overwrite"],
+                        suggest=options["suggest"],
+                        base_url=options["base_url"],
+                        color=color,
+                    )
+                if options["storage_path"]:
+                    set_storage_path(
+                        sender=None,
+                        document=document,
+                        classifier=classifier,
+                        replace=options["overwrite"],
+                        use_first=options["use_first"],
+                        suggest=options["suggest"],
+                        base_url=options["base_url"],
+                        color=color,
+                    )
@@ -0,0 +1,568 @@
+import json
+import math
+import platform
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+from pathlib import Path
+from typing import Callable
+from typing import Optional
+
+import tqdm
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.contrib.auth.models import Permission
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import BaseCommand
+from django.core.management import CommandError
+from django.db import transaction
+from django.utils import timezone
+from guardian.models import GroupObjectPermission
+from guardian.models import UserObjectPermission
+
+from documents.management.commands.mixins import ProgressBarMixin
+from documents.models import Correspondent
+from documents.models import CustomField
+from documents.models import CustomFieldInstance
+from documents.models import Document
+from documents.models import DocumentType
+from documents.models import Note
+from documents.models import Tag
+from documents.permissions import get_objects_for_user_owner_aware
+from documents.search import SEARCH_BACKENDS
+from documents.search import SearchBackend
+from documents.search import WhooshSearchBackend
+from documents.search import get_search_backend
+from paperless.version import __full_version_str__
+
+
+class CorpusGenerator:
+    """
+    Generates documents with random metadata, notes, custom fields and
+    permissions. Their content is made of made up words, which are used as
+    often as words in natural language, the most common ones being the
+    shortest.
+    """
+
+    VOCABULARY_SIZE = 50000
+    BATCH_SIZE = 1000
+
+    CONSONANTS = "bcdfghjklmnprstvwz"
+    VOWELS = "aeiou"
+
+    def __init__(self, seed: int, users: list[User], groups: list[Group]):
+        self.rng = random.Random(seed)
+        self.users = users
+        self.groups = groups
+        self.document_ids: list[int] = []
+
+        words = set()
+        while len(words) < self.VOCABULARY_SIZE:
+            words.add(
+                "".join(
+                    self.rng.choice(self.CONSONANTS) + self.rng.choice(self.VOWELS)
+                    for _ in range(self.rng.randint(1, 5))
+                ),
+            )
+        self.vocabulary = sorted(words, key=lambda word: (len(word), word))
+        # Zipf's law, the word of rank r is used 1 / r as often as the first
+        self.cum_weights = list(
+            accumulate(1 / rank for rank in range(1, self.VOCABULARY_SIZE + 1)),
+        )
+
+        Correspondent.objects.bulk_create(
+            Correspondent(name=f"Correspondent {i}") for i in range(1, 101)
+        )
+        DocumentType.objects.bulk_create(
+            DocumentType(name=f"Document type {i}") for i in range(1, 21)
+        )
+        Tag.objects.bulk_create(Tag(name=f"Tag {i}") for i in range(1, 51))
+        CustomField.objects.bulk_create(
+            CustomField(name=f"Custom field {data_type}", data_type=data_type)
+            for data_type in (
+                CustomField.FieldDataType.STRING,
+                CustomField.FieldDataType.INT,
+                CustomField.FieldDataType.DATE,
+                CustomField.FieldDataType.MONETARY,
+            )
+        )
+        # Fetched again, since not all databases return the ids of bulk inserts
+        self.correspondents = list(Correspondent.objects.all())
+        self.document_types = list(DocumentType.objects.all())
+        self.tags = list(Tag.objects.all())
+        self.custom_fields = list(CustomField.objects.all())
+
+        self.view_permission = Permission.objects.get(codename="view_document")
+        self.content_type = ContentType.objects.get_for_model(Document)
+
+    def words(self, count: int) -> list[str]:
+        return self.rng.choices(self.vocabulary, cum_weights=self.cum_weights, k=count)
+
+    def text(self, count: int) -> str:
+        return " ".join(self.words(count))
+
+    def generate(self, count: int, progress_bar_disable=False) -> None:
+        """
+        Adds count documents to the database, in batches
+        """
+        with tqdm.tqdm(total=count, disable=progress_bar_disable) as progress:
+            while count > 0:
+                batch_size = min(count, self.BATCH_SIZE)
+                self._generate_batch(batch_size)
+                count -= batch_size
+                progress.update(batch_size)
+
+    def _generate_batch(self, count: int) -> None:
+        rng = self.rng
+        now = timezone.now()
+        first = len(self.document_ids)
+
+        documents = []
+        for i in range(first, first + count):
+            documents.append(
+                Document(
+                    title=self.text(rng.randint(2, 6)).title(),
+                    # Most documents are one or two pages, a few are long
+                    content=self.text(min(int(rng.lognormvariate(5.5, 0.8)), 20000)),
+                    checksum=f"benchmark-{i}",
+                    mime_type="application/pdf",
+                    created=now - timedelta(days=rng.randint(0, 20 * 365)),
+                    correspondent=(
+                        rng.choice(self.correspondents) if rng.random() < 0.8 else None
+                    ),
+                    document_type=(
+                        rng.choice(self.document_types) if rng.random() < 0.8 else None
+                    ),
+                    owner=rng.choice(self.users) if rng.random() < 0.8 else None,
+                ),
+            )
+        Document.objects.bulk_create(documents)
+        documents = list(
+            Document.objects.filter(
+                checksum__in=[document.checksum for document in documents],
+            ).order_by("pk"),
+        )
+        self.document_ids.extend(document.pk for document in documents)
+
+        tags = []
+        notes = []
+        custom_fields = []
+        user_permissions = []
+        group_permissions = []
+        for document in documents:
+            for tag in rng.sample(self.tags, rng.randint(0, 4)):
+                tags.append(Document.tags.through(document=document, tag=tag))
+            if rng.random() < 0.1:
+                for _ in range(rng.randint(1, 3)):
+                    notes.append(
+                        Note(
+                            document=document,
+                            note=self.text(rng.randint(5, 40)),
+                            user=rng.choice(self.users),
+                        ),
+                    )
+            if rng.random() < 0.3:
+                for field in rng.sample(self.custom_fields, rng.randint(1, 2)):
+                    custom_fields.append(self._custom_field_instance(document, field))
+            if rng.random() < 0.3:
+                for user in rng.sample(self.users, min(len(self.users), 2)):
+                    user_permissions.append(
+                        UserObjectPermission(
+                            permission=self.view_permission,
+                            user=user,
+                            content_type=self.content_type,
+                            object_pk=str(document.pk),
+                        ),
+                    )
+            if self.groups and rng.random() < 0.1:
+                group_permissions.append(
+                    GroupObjectPermission(
+                        permission=self.view_permission,
+                        group=rng.choice(self.groups),
+                        content_type=self.content_type,
+                        object_pk=str(document.pk),
+                    ),
+                )
+        Document.tags.through.objects.bulk_create(tags)
+        Note.objects.bulk_create(notes)
+        CustomFieldInstance.objects.bulk_create(custom_fields)
+        UserObjectPermission.objects.bulk_create(user_permissions)
+        GroupObjectPermission.objects.bulk_create(group_permissions)
+
+    def _custom_field_instance(
+        self,
+        document: Document,
+        field: CustomField,
+    ) -> CustomFieldInstance:
+        instance = CustomFieldInstance(document=document, field=field)
+        if field.data_type == CustomField.FieldDataType.STRING:
+            instance.value_text = self.text(self.rng.randint(1, 4))[:128]
+        elif field.data_type == CustomField.FieldDataType.INT:
+            instance.value_int = self.rng.randint(0, 100000)
+        elif field.data_type == CustomField.FieldDataType.DATE:
+            instance.value_date = date(2000, 1, 1) + timedelta(
+                days=self.rng.randint(0, 10000),
+            )
+        elif field.data_type == CustomField.FieldDataType.MONETARY:
+            instance.value_monetary = Decimal(self.rng.randint(0, 1000000)) / 100
+        return instance
+
+
+def summarize(timings: list[float]) -> dict:
+    """
+    Returns the number, mean and percentiles of the given durations in
+    seconds, in milliseconds
+    """
+    timings = sorted(timings)
+
+    def percentile(p: int) -> float:
+        return timings[max(0, math.ceil(p / 100 * len(timings)) - 1)] * 1000
+
+    return {
+        "count": len(timings),
+        "mean_ms": sum(timings) / len(timings) * 1000,
+        "p50_ms": percentile(50),
+        "p90_ms": percentile(90),
+        "p99_ms": percentile(99),
+        "max_ms": timings[-1] * 1000,
+    }
+
+
+@contextmanager
+def replaced_settings(**values):
+    """
+    Replaces the given settings of this process until the block is left
+    """
+    missing = object()
+    previous = {name: getattr(settings, name, missing) for name in values}
+    for name, value in values.items():
+        setattr(settings, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is missing:
+                delattr(settings, name)
+            else:
+                setattr(settings, name, value)
+
+
+def measure(function: Callable, arguments: list) -> dict:
+    timings = []
+    for argument in arguments:
+        start = time.perf_counter()
+        function(argument)
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+
+class Command(ProgressBarMixin, BaseCommand):
+    help = (
+        "Measures indexing and searching with a generated archive of documents "
+        "of increasing size. Requires an empty database, everything is rolled "
+        "back when done."
+    )
+
+    PAGE_SIZE = 25
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--documents",
+            nargs="+",
+            type=int,
+            default=[10000],
+            help="Sizes of the archive to measure, e.g. 10000 100000 1000000",
+        )
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=10,
+            help="Number of users owning and sharing the documents",
+        )
+        parser.add_argument(
+            "--queries",
+            type=int,
+            default=100,
+            help="Number of queries of each kind measured for each size",
+        )
+        parser.add_argument(
+            "--backend",
+            choices=list(SEARCH_BACKENDS),
+            default=None,
+            help="Search backend to measure, defaults to the configured one",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Seed of the generated documents and queries",
+        )
+        parser.add_argument(
+            "--output",
+            type=Path,
+            default=None,
+            help="File to write the results to, as JSON",
+        )
+        parser.add_argument(
+            "--compare",
+            type=Path,
+            default=None,
+            help="Results of an earlier run to compare the results to",
+        )
+        self.add_argument_progress_bar_mixin(parser)
+
+    def handle(self, *args, **options):
+        self.handle_progress_bar_mixin(**options)
+
+        sizes = sorted(set(options["documents"]))
+        if sizes[0] < 1:
+            raise CommandError("The number of documents must be at least 1")
+        if options["users"] < 1:
+            raise CommandError("There must be at least 1 user")
+        if options["queries"] < 1:
+            raise CommandError("There must be at least 1 query")
+        if Document.objects.exists():
+            raise CommandError(
+                "The benchmark requires an empty database, configure a new one "
+                "e.g. with PAPERLESS_DATA_DIR or PAPERLESS_DBNAME",
+            )
+        baseline = None
+        if options["compare"] is not None:
+            baseline = json.loads(options["compare"].read_text())
+
+        results = {
+            "version": __full_version_str__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "started": timezone.now().isoformat(),
+            "backend": None,
+            "users": options["users"],
+            "queries": options["queries"],
+            "seed": options["seed"],
+            "runs": [],
+        }
+
+        backend_setting = {}
+        if options["backend"] is not None:
+            backend_setting["SEARCH_BACKEND"] = options["backend"]
+
+        # The index of the archive is not touched
+        with tempfile.TemporaryDirectory() as index_dir, replaced_settings(
+            INDEX_DIR=Path(index_dir),
+            **backend_setting,
+        ), transaction.atomic():
+            backend = get_search_backend()
+            results["backend"] = settings.SEARCH_BACKEND
+
+            self.users = [
+                User.objects.create_user(f"benchmark-user-{i}")
+                for i in range(1, options["users"] + 1)
+            ]
+            view_permission = Permission.objects.get(codename="view_document")
+            groups = []
+            for i, user in enumerate(self.users):
+                user.user_permissions.add(view_permission)
+                if i % 5 == 0:
+                    groups.append(Group.objects.create(name=f"benchmark-group-{i}"))
+                user.groups.add(groups[-1])
+
+            generator = CorpusGenerator(options["seed"], self.users, groups)
+            try:
+                for size in sizes:
+                    self.stdout.write(f"Generating {size} documents")
+                    generator.generate(
+                        size - len(generator.document_ids),
+                        progress_bar_disable=self.no_progress_bar,
+                    )
+                    run = self.run(backend, generator, options["queries"])
+                    results["runs"].append(run)
+                    self.write_run(run, baseline)
+            finally:
+                backend.flush()
+                # Nothing generated is kept
+                transaction.set_rollback(True)
+
+        if options["output"] is not None:
+            options["output"].write_text(json.dumps(results, indent=2))
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def run(self, backend: SearchBackend, generator: CorpusGenerator, queries: int):
+        rng = generator.rng
+        run = {
+            "documents": len(generator.document_ids),
+            "notes": Note.objects.count(),
+            "custom_fields": CustomFieldInstance.objects.count(),
+        }
+
+        self.stdout.write("Indexing")
+        start = time.perf_counter()
+        count = backend.reindex(progress_bar_disable=self.no_progress_bar)
+        duration = time.perf_counter() - start
+        run["index"] = {
+            "seconds": duration,
+            "documents_per_second": count / max(duration, 0.001),
+            "size_bytes": backend.index_size(),
+        }
+
+        self.stdout.write("Searching")
+        if isinstance(backend, WhooshSearchBackend):
+            # Once for each user, since they are cached for each index version
+            run["permissions"] = measure(self.get_permission_filter, self.users)
+
+        # Words as common in the queries as in the documents
+        query_strings = dict.fromkeys(
+            " ".join(generator.words(rng.randint(1, 2))) for _ in range(queries * 2)
+        )
+        searches = [
+            ({"query": query_string}, rng.choice(self.users))
+            for query_string in list(query_strings)[:queries]
+        ]
+        # Each query again by the same user, with the ranking cached
+        run["query"] = measure(self.search(backend), searches)
+        run["query_repeated"] = measure(self.search(backend), searches)
+
+        searches = [
+            ({"more_like_id": str(document_id)}, rng.choice(self.users))
+            for document_id in rng.sample(
+                generator.document_ids,
+                min(queries, len(generator.document_ids)),
+            )
+        ]
+        run["more_like"] = measure(self.search(backend), searches)
+
+        prefixes = [word[: rng.randint(1, 3)] for word in generator.words(queries)]
+        run["autocomplete"] = measure(
+            lambda prefix: backend.autocomplete(prefix, 10, rng.choice(self.users)),
+            prefixes,
+        )
+
+        self.stdout.write("Updating")
+        documents = list(
+            Document.objects.filter(
+                pk__in=rng.sample(
+                    generator.document_ids,
+                    min(queries, len(generator.document_ids)),
+                ),
+            ),
+        )
+
+        def update(document: Document):
+            document.content += " " + generator.text(10)
+            document.save()
+            backend.add_or_update_document(document)
+            backend.flush()
+
+        run["update"] = measure(update, documents)
+        return run
+
+    def search(self, backend: SearchBackend) -> Callable:
+        """
+        Returns a function which searches like a request of the given user
+        for the first page of results
+        """
+
+        def search(arguments: tuple[dict, User]):
+            query_params, user = arguments
+            queryset = get_objects_for_user_owner_aware(
+                user,
+                "documents.view_document",
+                Document,
+            )
+            with backend.searcher() as searcher:
+                results = backend.query(
+                    searcher,
+                    query_params,
+                    self.PAGE_SIZE,
+                    user,
+                    queryset,
+                )
+                len(results)
+                list(results[0 : self.PAGE_SIZE])
+
+        return search
+
+    def get_permission_filter(self, user: User):
+        from documents import index
+
+        with index.open_index_searcher() as searcher:
+            index.get_permission_filter(searcher, user)
+
+    def write_run(self, run: dict, baseline: Optional[dict]) -> None:
+        """
+        Writes the results of a run, compared to the run with the same number
+        of documents of the baseline, if any
+        """
+        previous = None
+        if baseline is not None:
+            previous = next(
+                (
+                    baseline_run
+                    for baseline_run in baseline["runs"]
+                    if baseline_run["documents"] == run["documents"]
+                ),
+                None,
+            )
+        if previous is not None:
+            previous = {
+                f"{name}_{key}": value
+                for name, values in previous.items()
+                if isinstance(values, dict)
+                for key, value in values.items()
+            }
+
+        def compare(key: str, value: Optional[float], unit: str) -> str:
+            if value is None:
+                return "unknown"
+            text = f"{value:.1f} {unit}"
+            if previous is None or key not in previous:
+                return text
+            before = previous[key]
+            if not before:
+                return text
+            return f"{text} ({(value - before) / before:+.0%})"
+
+        self.stdout.write(self.style.SUCCESS(f"{run['documents']} documents"))
+        index = run["index"]
+        self.stdout.write(
+            f"  index: {index['seconds']:.1f} s, "
+            + compare(
+                "index_documents_per_second",
+                index["documents_per_second"],
+                "documents/s",
+            )
+            + ", "
+            + (
+                f"{index['size_bytes'] / 1024**2:.1f} MiB"
+                if index["size_bytes"] is not None
+                else "size unknown"
+            ),
+        )
+        for name in (
+            "permissions",
+            "query",
+            "query_repeated",
+            "more_like",
+            "autocomplete",
+            "update",
+        ):
+            if name not in run:
+                continue
+            timings = run[name]
+            self.stdout.write(
+                f"  {name}: "
+                + ", ".join(
+                    f"{percentile} "
+                    + compare(
+                        f"{name}_{percentile}_ms",
+                        timings[f"{percentile}_ms"],
+                        "ms",
+                    )
+                    for percentile in ("p50", "p90", "p99")
+                ),
+            )
@@ -0,0 +1,147 @@
+import json
+import os
+import platform
+import tempfile
+import time
+from pathlib import Path
+
+import tqdm
+from django.core.management import BaseCommand
+from django.core.management import CommandError
+from django.utils import timezone
+
+from documents.management.commands.document_search_benchmark import summarize
+from documents.management.commands.mixins import ProgressBarMixin
+from documents.models import Document
+from documents.parsers import make_thumbnail_from_pdf_convert
+from documents.parsers import make_thumbnail_from_pdf_pdfium
+from documents.parsers import pypdfium2
+from paperless.version import __full_version_str__
+
+THUMBNAIL_ENGINES = {
+    "pdfium": make_thumbnail_from_pdf_pdfium,
+    "convert": make_thumbnail_from_pdf_convert,
+}
+
+
+class Command(ProgressBarMixin, BaseCommand):
+    help = (
+        "Measures how long making the thumbnails of PDF documents takes with "
+        "each thumbnail engine, and how large the thumbnails are."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "files",
+            nargs="*",
+            type=Path,
+            help="PDF files to make thumbnails of, defaults to PDF documents "
+            "of the archive",
+        )
+        parser.add_argument(
+            "--documents",
+            type=int,
+            default=20,
+            help="Number of PDF documents of the archive to use, if no files "
+            "are given",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Number of thumbnails made of each file with each engine",
+        )
+        parser.add_argument(
+            "--engines",
+            nargs="+",
+            choices=list(THUMBNAIL_ENGINES),
+            default=list(THUMBNAIL_ENGINES),
+            help="Thumbnail engines to measure",
+        )
+        parser.add_argument(
+            "--output",
+            type=Path,
+            default=None,
+            help="File to write the results to, as JSON",
+        )
+        self.add_argument_progress_bar_mixin(parser)
+
+    def handle(self, *args, **options):
+        self.handle_progress_bar_mixin(**options)
+
+        if options["repeat"] < 1:
+            raise CommandError("The number of repetitions must be at least 1")
+
+        files = options["files"]
+        if not files:
+            files = [
+                document.source_path
+                for document in Document.objects.filter(
+                    mime_type="application/pdf",
+                    storage_type=Document.STORAGE_TYPE_UNENCRYPTED,
+                ).order_by("pk")[: options["documents"]]
+            ]
+        for file in files:
+            if not os.path.isfile(file):
+                raise CommandError(f"{file} does not exist")
+        if not files:
+            raise CommandError("There are no PDF documents to make thumbnails of")
+
+        results = {
+            "version": __full_version_str__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "started": timezone.now().isoformat(),
+            "files": len(files),
+            "repeat": options["repeat"],
+            "engines": {},
+        }
+
+        for engine in options["engines"]:
+            if engine == "pdfium" and pypdfium2 is None:
+                result = {"error": "pypdfium2 is not installed"}
+            else:
+                result = self.run(THUMBNAIL_ENGINES[engine], files, options["repeat"])
+            results["engines"][engine] = result
+            self.write_result(engine, result)
+
+        if options["output"] is not None:
+            options["output"].write_text(json.dumps(results, indent=2))
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def run(self, make_thumbnail, files: list, repeat: int) -> dict:
+        timings = []
+        sizes = []
+        errors = []
+        for file in tqdm.tqdm(files * repeat, disable=self.no_progress_bar):
+            with tempfile.TemporaryDirectory() as temp_dir:
+                start = time.perf_counter()
+                try:
+                    thumb = make_thumbnail(file, temp_dir)
+                except Exception as e:
+                    errors.append(f"{file}: {e}")
+                    continue
+                timings.append(time.perf_counter() - start)
+                sizes.append(os.path.getsize(thumb))
+
+        if not timings:
+            return {"error": errors[0], "errors": len(errors)}
+        return {
+            **summarize(timings),
+            "mean_size_bytes": sum(sizes) / len(sizes),
+            "errors": len(errors),
+        }
+
+    def write_result(self, engine: str, result: dict) -> None:
+        if "error" in result:
+            self.stdout.write(self.style.ERROR(f"{engine}: failed, {result['error']}"))
+            return
+        self.stdout.write(
+            self.style.SUCCESS(f"{engine}: ")
+            + ", ".join(
+                f"{percentile} {result[f'{percentile}_ms']:.1f} ms"
+                for percentile in ("p50", "p90", "p99")
+            )
+            + f", mean size {result['mean_size_bytes'] / 1024:.1f} KiB"
+            + (f", {result['errors']} failed" if result["errors"] else ""),
+        )
@@ -1,6 +1,15 @@
 import logging
 import re
+import uuid
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass
 from fnmatch import fnmatch
+from typing import Optional
+
+from django.core.cache import cache
+from django.db.models import CharField
+from django.db.models import Value
 
 from documents.classifier import DocumentClassifier
 from documents.data_models import ConsumableDocument
@@ -17,16 +26,44 @@ from documents.permissions import get_objects_for_user_owner_aware
 logger = logging.getLogger("paperless.matching")
 
 
-def log_reason(matching_model: MatchingModel, document: Document, reason: str):
-    class_name = type(matching_model).__name__
+@dataclass(frozen=True)
+class MatchingRule:
+    """
+    The parts of a MatchingModel needed to match it against a document
+    """
+
+    model: type[MatchingModel]
+    pk: int
+    name: str
+    match: str
+    matching_algorithm: int
+    is_insensitive: bool
+
+    @classmethod
+    def from_model(cls, matching_model: MatchingModel) -> "MatchingRule":
+        return cls(
+            type(matching_model),
+            matching_model.pk,
+            matching_model.name,
+            matching_model.match,
+            matching_model.matching_algorithm,
+            matching_model.is_insensitive,
+        )
+
+
+def log_reason(rule: MatchingRule, document: Document, reason: str):
     logger.debug(
-        f"{class_name} {matching_model.name} matched on document "
+        f"{rule.model.__name__} {rule.name} matched on document "
         f"{document} because {reason}",
     )
 
 
 def match_correspondents(document: Document, classifier: DocumentClassifier, user=None):
-    pred_id = classifier.predict_correspondent(document.content) if classifier else None
+    pred_id = (
+        classifier.predict_correspondent(document.content, document.pk)
+        if classifier
+        else None
+    )
 
     if user is None and document.owner is not None:
         user = document.owner
@@ -40,9 +77,11 @@ def match_correspondents(document: Document, classifier: DocumentClassifier, use
     else:
         correspondents = Correspondent.objects.all()
 
+    matched_ids = get_matcher().match(document)[Correspondent]
+
     return list(
         filter(
-            lambda o: matches(o, document)
+            lambda o: o.pk in matched_ids
             or (o.pk == pred_id and o.matching_algorithm == MatchingModel.MATCH_AUTO),
             correspondents,
         ),
@@ -50,7 +89,11 @@ def match_correspondents(document: Document, classifier: DocumentClassifier, use
 
 
 def match_document_types(document: Document, classifier: DocumentClassifier, user=None):
-    pred_id = classifier.predict_document_type(document.content) if classifier else None
+    pred_id = (
+        classifier.predict_document_type(document.content, document.pk)
+        if classifier
+        else None
+    )
 
     if user is None and document.owner is not None:
         user = document.owner
@@ -64,9 +107,11 @@ def match_document_types(document: Document, classifier: DocumentClassifier, use
     else:
         document_types = DocumentType.objects.all()
 
+    matched_ids = get_matcher().match(document)[DocumentType]
+
     return list(
         filter(
-            lambda o: matches(o, document)
+            lambda o: o.pk in matched_ids
             or (o.pk == pred_id and o.matching_algorithm == MatchingModel.MATCH_AUTO),
             document_types,
         ),
@@ -74,7 +119,9 @@ def match_document_types(document: Document, classifier: DocumentClassifier, use
 
 
 def match_tags(document: Document, classifier: DocumentClassifier, user=None):
-    predicted_tag_ids = classifier.predict_tags(document.content) if classifier else []
+    predicted_tag_ids = (
+        classifier.predict_tags(document.content, document.pk) if classifier else []
+    )
 
     if user is None and document.owner is not None:
         user = document.owner
@@ -84,9 +131,11 @@ def match_tags(document: Document, classifier: DocumentClassifier, user=None):
     else:
         tags = Tag.objects.all()
 
+    matched_ids = get_matcher().match(document)[Tag]
+
     return list(
         filter(
-            lambda o: matches(o, document)
+            lambda o: o.pk in matched_ids
             or (
                 o.matching_algorithm == MatchingModel.MATCH_AUTO
                 and o.pk in predicted_tag_ids
@@ -97,7 +146,11 @@ def match_tags(document: Document, classifier: DocumentClassifier, user=None):
 
 
 def match_storage_paths(document: Document, classifier: DocumentClassifier, user=None):
-    pred_id = classifier.predict_storage_path(document.content) if classifier else None
+    pred_id = (
+        classifier.predict_storage_path(document.content, document.pk)
+        if classifier
+        else None
+    )
 
     if user is None and document.owner is not None:
         user = document.owner
@@ -111,9 +164,11 @@ def match_storage_paths(document: Document, classifier: DocumentClassifier, user
     else:
         storage_paths = StoragePath.objects.all()
 
+    matched_ids = get_matcher().match(document)[StoragePath]
+
     return list(
         filter(
-            lambda o: matches(o, document)
+            lambda o: o.pk in matched_ids
             or (o.pk == pred_id and o.matching_algorithm == MatchingModel.MATCH_AUTO),
             storage_paths,
         ),
@@ -121,120 +176,357 @@ def match_storage_paths(document: Document, classifier: DocumentClassifier, user
 
 
 def matches(matching_model: MatchingModel, document: Document):
-    search_kwargs = {}
+    rule = MatchingRule.from_model(matching_model)
+    if rule.matching_algorithm not in CompiledMatcher.SUPPORTED_ALGORITHMS:
+        raise NotImplementedError("Unsupported matching algorithm")
+    return rule.pk in CompiledMatcher([rule]).match(document)[rule.model]
 
-    document_content = document.content
 
-    # Check that match is not empty
-    if not matching_model.match.strip():
-        return False
+def _split_words(match: str) -> list[str]:
+    """
+    Splits the match to individual keywords, getting rid of unnecessary
+    spaces and grouping quoted words together.
 
-    if matching_model.is_insensitive:
-        search_kwargs = {"flags": re.IGNORECASE}
+    Example:
+      '  some random  words "with   quotes  " and   spaces'
+        ==>
+      ["some", "random", "words", "with quotes", "and", "spaces"]
+    """
+    findterms = re.compile(r'"([^"]+)"|(\S+)').findall
+    normspace = re.compile(r"\s+").sub
+    return [normspace(" ", (t[0] or t[1]).strip()) for t in findterms(match)]
 
-    if matching_model.matching_algorithm == MatchingModel.MATCH_NONE:
-        return False
 
-    elif matching_model.matching_algorithm == MatchingModel.MATCH_ALL:
-        for word in _split_match(matching_model):
-            search_result = re.search(rf"\b{word}\b", document_content, **search_kwargs)
-            if not search_result:
-                return False
-        log_reason(
-            matching_model,
-            document,
-            f"it contains all of these words: {matching_model.match}",
+@dataclass(frozen=True)
+class _Word:
+    """
+    A single word or literal string searched for by ANY, ALL and LITERAL
+    rules. Quoted words allow any whitespace between their parts, literals
+    are matched exactly.
+    """
+
+    text: str
+    is_literal: bool
+    is_insensitive: bool
+
+    @property
+    def units(self) -> list[str]:
+        # The regular expression for each character of the word
+        if self.is_literal:
+            return [re.escape(c) for c in self.text]
+        return [r"\s+" if c == " " else re.escape(c) for c in self.text]
+
+    def compile(self) -> re.Pattern:
+        return re.compile(
+            rf"\b{''.join(self.units)}\b",
+            flags=re.IGNORECASE if self.is_insensitive else 0,
         )
-        return True
 
-    elif matching_model.matching_algorithm == MatchingModel.MATCH_ANY:
-        for word in _split_match(matching_model):
-            if re.search(rf"\b{word}\b", document_content, **search_kwargs):
-                log_reason(matching_model, document, f"it contains this word: {word}")
-                return True
-        return False
 
-    elif matching_model.matching_algorithm == MatchingModel.MATCH_LITERAL:
-        result = bool(
-            re.search(
-                rf"\b{re.escape(matching_model.match)}\b",
-                document_content,
-                **search_kwargs,
-            ),
-        )
-        if result:
-            log_reason(
-                matching_model,
-                document,
-                f'it contains this string: "{matching_model.match}"',
-            )
-        return result
-
-    elif matching_model.matching_algorithm == MatchingModel.MATCH_REGEX:
-        try:
-            match = re.search(
-                re.compile(matching_model.match, **search_kwargs),
-                document_content,
-            )
-        except re.error:
-            logger.error(
-                f"Error while processing regular expression {matching_model.match}",
-            )
-            return False
-        if match:
-            log_reason(
-                matching_model,
-                document,
-                f"the string {match.group()} matches the regular expression "
-                f"{matching_model.match}",
-            )
-        return bool(match)
-
-    elif matching_model.matching_algorithm == MatchingModel.MATCH_FUZZY:
-        from rapidfuzz import fuzz
-
-        match = re.sub(r"[^\w\s]", "", matching_model.match)
-        text = re.sub(r"[^\w\s]", "", document_content)
-        if matching_model.is_insensitive:
-            match = match.lower()
-            text = text.lower()
-        if fuzz.partial_ratio(match, text, score_cutoff=90):
-            # TODO: make this better
-            log_reason(
-                matching_model,
-                document,
-                f"parts of the document content somehow match the string "
-                f"{matching_model.match}",
-            )
-            return True
-        else:
-            return False
-
-    elif matching_model.matching_algorithm == MatchingModel.MATCH_AUTO:
-        # this is done elsewhere.
-        return False
+def _trie_pattern(trie: dict) -> str:
+    """
+    Turns a trie of regular expression units into a single expression which
+    shares common prefixes, so it does not need to try every word on its own.
+    """
+    alternatives = [
+        unit + _trie_pattern(child) for unit, child in trie.items() if unit is not None
+    ]
+    if not alternatives:
+        return ""
+    # None marks the end of a word
+    if len(alternatives) == 1 and None not in trie:
+        return alternatives[0]
+    pattern = "(?:" + "|".join(alternatives) + ")"
+    return pattern + "?" if None in trie else pattern
 
-    else:
-        raise NotImplementedError("Unsupported matching algorithm")
 
+class CompiledMatcher:
+    """
+    Matches many matching rules against a document at once.
 
-def _split_match(matching_model):
+    All words of the ANY, ALL and LITERAL rules are combined into one
+    expression, so the content is scanned once regardless of the number of
+    rules. Regular expressions are compiled only once, fuzzy rules still
+    have to look at the content one by one. The result for the last document
+    is kept, since the labels of each model are matched one after another.
     """
-    Splits the match to individual keywords, getting rid of unnecessary
-    spaces and grouping quoted words together.
 
-    Example:
-      '  some random  words "with   quotes  " and   spaces'
-        ==>
-      ["some", "random", "words", "with+quotes", "and", "spaces"]
+    SUPPORTED_ALGORITHMS = {
+        MatchingModel.MATCH_NONE,
+        MatchingModel.MATCH_ANY,
+        MatchingModel.MATCH_ALL,
+        MatchingModel.MATCH_LITERAL,
+        MatchingModel.MATCH_REGEX,
+        MatchingModel.MATCH_FUZZY,
+        MatchingModel.MATCH_AUTO,
+    }
+
+    def __init__(self, rules: Iterable[MatchingRule]):
+        self._rule_words: dict[MatchingRule, list[_Word]] = {}
+        self._regexes: dict[MatchingRule, re.Pattern] = {}
+        self._fuzzy_rules: list[MatchingRule] = []
+        # The primary key and content of the last document and its result
+        self._last_match: Optional[
+            tuple[tuple[Optional[int], str], dict[type[MatchingModel], set[int]]]
+        ] = None
+
+        for rule in rules:
+            # Check that match is not empty
+            if not rule.match.strip():
+                continue
+            if rule.matching_algorithm in (
+                MatchingModel.MATCH_ANY,
+                MatchingModel.MATCH_ALL,
+            ):
+                self._rule_words[rule] = [
+                    _Word(word, False, rule.is_insensitive)
+                    for word in _split_words(rule.match)
+                ]
+            elif rule.matching_algorithm == MatchingModel.MATCH_LITERAL:
+                self._rule_words[rule] = [
+                    _Word(rule.match, True, rule.is_insensitive),
+                ]
+            elif rule.matching_algorithm == MatchingModel.MATCH_REGEX:
+                try:
+                    self._regexes[rule] = re.compile(
+                        rule.match,
+                        flags=re.IGNORECASE if rule.is_insensitive else 0,
+                    )
+                except re.error:
+                    logger.error(
+                        f"Error while processing regular expression {rule.match}",
+                    )
+            elif rule.matching_algorithm == MatchingModel.MATCH_FUZZY:
+                self._fuzzy_rules.append(rule)
+
+        self._words: dict[_Word, re.Pattern] = {
+            word: word.compile()
+            for words in self._rule_words.values()
+            for word in words
+        }
+        # One trie of regular expression units per case sensitivity
+        self._tries: dict[bool, dict] = {True: {}, False: {}}
+        self._units: dict[tuple[str, bool], re.Pattern] = {}
+        for word in self._words:
+            node = self._tries[word.is_insensitive]
+            for unit in word.units:
+                self._units[(unit, word.is_insensitive)] = re.compile(
+                    unit,
+                    flags=re.IGNORECASE if word.is_insensitive else 0,
+                )
+                node = node.setdefault(unit, {})
+            node.setdefault(None, []).append(word)
+
+        alternatives = []
+        if self._tries[True]:
+            alternatives.append(f"(?i:{_trie_pattern(self._tries[True])})")
+        if self._tries[False]:
+            alternatives.append(_trie_pattern(self._tries[False]))
+        # The lookahead reports every position at which any word starts,
+        # even if the words overlap.
+        self._words_pattern = (
+            re.compile(rf"(?=\b(?:{'|'.join(alternatives)})\b)")
+            if alternatives
+            else None
+        )
+
+    def _words_at(self, content: str, start: int) -> Iterable[_Word]:
+        """
+        Yields all words matching the content at the given position. The
+        combined expression only tells that some word starts there, so this
+        follows every branch of the tries which matches the content.
+        """
+        for is_insensitive, trie in self._tries.items():
+            stack = [(trie, start)]
+            while stack:
+                node, pos = stack.pop()
+                for unit, child in node.items():
+                    if unit is None:
+                        yield from (
+                            word
+                            for word in child
+                            if self._words[word].match(content, start)
+                        )
+                        continue
+                    match = self._units[(unit, is_insensitive)].match(content, pos)
+                    if match:
+                        stack.append((child, match.end()))
+
+    def _find_words(self, content: str) -> set[_Word]:
+        found: set[_Word] = set()
+        if self._words_pattern is None:
+            return found
+        for match in self._words_pattern.finditer(content):
+            found.update(self._words_at(content, match.start()))
+            if len(found) == len(self._words):
+                break
+        return found
+
+    def match(self, document: Document) -> dict[type[MatchingModel], set[int]]:
+        """
+        Returns the primary keys of all rules matching the document, grouped
+        by the model of the rule.
+        """
+        content = document.content
+        key = (document.pk, content)
+        last_match = self._last_match
+        if last_match is not None and last_match[0] == key:
+            return last_match[1]
+        matched: dict[type[MatchingModel], set[int]] = defaultdict(set)
+
+        found = self._find_words(content)
+        for rule, words in self._rule_words.items():
+            if rule.matching_algorithm == MatchingModel.MATCH_ALL:
+                if all(word in found for word in words):
+                    log_reason(
+                        rule,
+                        document,
+                        f"it contains all of these words: {rule.match}",
+                    )
+                    matched[rule.model].add(rule.pk)
+            elif rule.matching_algorithm == MatchingModel.MATCH_ANY:
+                word = next((word for word in words if word in found), None)
+                if word is not None:
+                    log_reason(rule, document, f"it contains this word: {word.text}")
+                    matched[rule.model].add(rule.pk)
+            elif words[0] in found:
+                log_reason(rule, document, f'it contains this string: "{rule.match}"')
+                matched[rule.model].add(rule.pk)
+
+        for rule, regex in self._regexes.items():
+            match = regex.search(content)
+            if match:
+                log_reason(
+                    rule,
+                    document,
+                    f"the string {match.group()} matches the regular expression "
+                    f"{rule.match}",
+                )
+                matched[rule.model].add(rule.pk)
+
+        if self._fuzzy_rules:
+            from rapidfuzz import fuzz
+
+            text = re.sub(r"[^\w\s]", "", content)
+            lower_text = text.lower()
+            for rule in self._fuzzy_rules:
+                match = re.sub(r"[^\w\s]", "", rule.match)
+                if rule.is_insensitive:
+                    match = match.lower()
+                if fuzz.partial_ratio(
+                    match,
+                    lower_text if rule.is_insensitive else text,
+                    score_cutoff=90,
+                ):
+                    log_reason(
+                        rule,
+                        document,
+                        f"parts of the document content somehow match the string "
+                        f"{rule.match}",
+                    )
+                    matched[rule.model].add(rule.pk)
+
+        self._last_match = (key, matched)
+        return matched
+
+
+MATCHING_MODELS: tuple[type[MatchingModel], ...] = (
+    Correspondent,
+    DocumentType,
+    StoragePath,
+    Tag,
+)
+
+# Cache key of a token which changes whenever any matching rule changes
+MATCHING_RULES_VERSION_KEY = "matching_rules_version"
+
+_matcher_cache: Optional[tuple[frozenset[MatchingRule], CompiledMatcher]] = None
+_matcher_version: Optional[str] = None
+
+
+def _load_matching_rules() -> frozenset[MatchingRule]:
     """
-    findterms = re.compile(r'"([^"]+)"|(\S+)').findall
-    normspace = re.compile(r"\s+").sub
-    return [
-        # normspace(" ", (t[0] or t[1]).strip()).replace(" ", r"\s+")
-        re.escape(normspace(" ", (t[0] or t[1]).strip())).replace(r"\ ", r"\s+")
-        for t in findterms(matching_model.match)
+    Fetches the rules of all matching models with a single query
+    """
+    models_by_name = {model._meta.model_name: model for model in MATCHING_MODELS}
+    querysets = [
+        model.objects.annotate(
+            model_name=Value(model._meta.model_name, output_field=CharField()),
+        )
+        .order_by()
+        .values_list(
+            "model_name",
+            "pk",
+            "name",
+            "match",
+            "matching_algorithm",
+            "is_insensitive",
+        )
+        for model in MATCHING_MODELS
     ]
+    return frozenset(
+        MatchingRule(models_by_name[model_name], *values)
+        for model_name, *values in querysets[0].union(*querysets[1:], all=True)
+    )
+
+
+def _get_rules_version() -> Optional[str]:
+    """
+    Returns the token of the current matching rules shared by all processes,
+    or None if the cache is not available
+    """
+    try:
+        version = cache.get(MATCHING_RULES_VERSION_KEY)
+        if version is None:
+            # Evicted or never set, rules compiled before are not trusted
+            cache.add(MATCHING_RULES_VERSION_KEY, uuid.uuid4().hex, None)
+            version = cache.get(MATCHING_RULES_VERSION_KEY)
+        return version
+    except Exception as e:
+        logger.debug(f"Could not read the version of the matching rules: {e}")
+        return None
+
+
+def get_matcher() -> CompiledMatcher:
+    """
+    Returns a matcher for all correspondents, document types, storage paths
+    and tags. The rules are only loaded again when their version changed,
+    by a change in this process or in any other process, and the matcher is
+    only compiled again when the rules changed.
+    """
+    global _matcher_cache, _matcher_version
+
+    version = _get_rules_version()
+    if (
+        _matcher_cache is not None
+        and version is not None
+        and version == _matcher_version
+    ):
+        return _matcher_cache[1]
+
+    rules = _load_matching_rules()
+    if _matcher_cache is None or _matcher_cache[0] != rules:
+        logger.debug(f"Compiling matcher for {len(rules)} matching rules")
+        _matcher_cache = (rules, CompiledMatcher(rules))
+    _matcher_version = version
+    return _matcher_cache[1]
+
+
+def clear_matcher_cache():
+    global _matcher_cache, _matcher_version
+    _matcher_cache = None
+    _matcher_version = None
+
+
+def matching_rules_changed():
+    """
+    Makes all processes load the matching rules again before matching
+    """
+    clear_matcher_cache()
+    try:
+        cache.set(MATCHING_RULES_VERSION_KEY, uuid.uuid4().hex, None)
+    except Exception as e:
+        logger.warning(f"Could not update the version of the matching rules: {e}")
 
 
 def document_matches_template(
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-18 07:23
+
+import django.utils.timezone
+from django.db import migrations
+from django.db import models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("documents", "1042_consumptiontemplate_assign_custom_fields_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IndexUpdate",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "document_id",
+                    models.IntegerField(
+                        help_text="Not a foreign key, removed documents are queued too",
+                        verbose_name="document ID",
+                    ),
+                ),
+                ("remove", models.BooleanField(default=False, verbose_name="remove")),
+                (
+                    "added",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        verbose_name="added",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "index update",
+                "verbose_name_plural": "index updates",
+            },
+        ),
+    ]
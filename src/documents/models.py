@@ -16,6 +16,7 @@ from django.contrib.auth.models import User
 from django.core.validators import MaxValueValidator
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db import transaction
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from multiselectfield import MultiSelectField
@@ -40,6 +41,38 @@ class ModelWithOwner(models.Model):
         abstract = True
 
 
+class MatchingModelQuerySet(models.QuerySet):
+    """
+    Tells the matcher about changes in bulk, which do not send the signals it
+    otherwise relies on
+    """
+
+    def _rules_changed(self):
+        # The matching module imports the models
+        from documents import matching
+
+        matching.clear_matcher_cache()
+        transaction.on_commit(matching.matching_rules_changed)
+
+    def update(self, **kwargs):
+        rows = super().update(**kwargs)
+        if rows:
+            self._rules_changed()
+        return rows
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        rows = super().bulk_update(objs, fields, *args, **kwargs)
+        if rows:
+            self._rules_changed()
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if objs:
+            self._rules_changed()
+        return objs
+
+
 class MatchingModel(ModelWithOwner):
     MATCH_NONE = 0
     MATCH_ANY = 1
@@ -71,6 +104,8 @@ class MatchingModel(ModelWithOwner):
 
     is_insensitive = models.BooleanField(_("is insensitive"), default=True)
 
+    objects = MatchingModelQuerySet.as_manager()
+
     class Meta:
         abstract = True
         ordering = ("name",)
@@ -643,6 +678,37 @@ class PaperlessTask(models.Model):
         return f"Task {self.task_id}"
 
 
+class IndexUpdate(models.Model):
+    """
+    A document waiting to be updated in or removed from the search index.
+    Queued in the same transaction as the change of the document, so that
+    no change is lost before it is written to the index.
+    """
+
+    document_id = models.IntegerField(
+        verbose_name=_("document ID"),
+        help_text=_("Not a foreign key, removed documents are queued too"),
+    )
+
+    remove = models.BooleanField(
+        default=False,
+        verbose_name=_("remove"),
+    )
+
+    added = models.DateTimeField(
+        default=timezone.now,
+        verbose_name=_("added"),
+    )
+
+    class Meta:
+        verbose_name = _("index update")
+        verbose_name_plural = _("index updates")
+
+    def __str__(self) -> str:
+        action = "Remove" if self.remove else "Update"
+        return f"{action} document {self.document_id} in the index"
+
+
 class Note(models.Model):
     note = models.TextField(
         _("content"),
@@ -19,6 +19,11 @@ from documents.loggers import LoggingMixin
 from documents.signals import document_consumer_declaration
 from documents.utils import copy_file_with_basic_stats
 
+try:
+    import pypdfium2
+except ImportError:  # pragma: no cover
+    pypdfium2 = None
+
 # This regular expression will try to find dates in the document at
 # hand and will match the following formats:
 # - XX.YY.ZZZZ with XX + YY being 1 or 2 and ZZZZ being 2 or 4 digits
@@ -214,25 +219,66 @@ def make_thumbnail_from_pdf_gs_fallback(in_path, temp_dir, logging_group=None) -
         return default_thumbnail_path
 
 
+def make_thumbnail_from_pdf_pdfium(in_path, temp_dir) -> str:
+    """
+    Renders the first page of the PDF in process with pdfium, at the size
+    convert would produce, without starting any subprocess.
+    """
+    out_path = os.path.join(temp_dir, "pdfium.webp")
+
+    try:
+        pdf = pypdfium2.PdfDocument(in_path)
+        try:
+            page = pdf[0]
+            width, height = page.get_size()
+            # Same as -density 300 -scale "500x5000>": render at 300 DPI,
+            # but never wider than 500px or higher than 5000px
+            scale = min(300 / 72, 500 / width, 5000 / height)
+            page.render(scale=scale).to_pil().save(out_path, format="WEBP")
+        finally:
+            pdf.close()
+    except Exception as e:
+        raise ParseError(f"Thumbnail (pdfium) failed for {in_path}: {e}") from e
+
+    return out_path
+
+
+def make_thumbnail_from_pdf_convert(in_path, temp_dir, logging_group=None) -> str:
+    out_path = os.path.join(temp_dir, "convert.webp")
+
+    run_convert(
+        density=300,
+        scale="500x5000>",
+        alpha="remove",
+        strip=True,
+        trim=False,
+        auto_orient=True,
+        input_file=f"{in_path}[0]",
+        output_file=out_path,
+        logging_group=logging_group,
+    )
+
+    return out_path
+
+
 def make_thumbnail_from_pdf(in_path, temp_dir, logging_group=None) -> str:
     """
     The thumbnail of a PDF is just a 500px wide image of the first page.
     """
-    out_path = os.path.join(temp_dir, "convert.webp")
+    # Render it in process if pdfium is available, it's a lot cheaper than
+    # starting convert and Ghostscript
+    if pypdfium2 is not None:
+        try:
+            return make_thumbnail_from_pdf_pdfium(in_path, temp_dir)
+        except ParseError as e:
+            logger.warning(
+                f"Unable to make thumbnail with pdfium, falling back to convert: {e}",
+                extra={"group": logging_group},
+            )
 
     # Run convert to get a decent thumbnail
     try:
-        run_convert(
-            density=300,
-            scale="500x5000>",
-            alpha="remove",
-            strip=True,
-            trim=False,
-            auto_orient=True,
-            input_file=f"{in_path}[0]",
-            output_file=out_path,
-            logging_group=logging_group,
-        )
+        out_path = make_thumbnail_from_pdf_convert(in_path, temp_dir, logging_group)
     except ParseError as e:
         logger.error(f"Unable to make thumbnail with convert: {e}")
         out_path = make_thumbnail_from_pdf_gs_fallback(in_path, temp_dir, logging_group)
@@ -324,6 +370,8 @@ class DocumentParser(LoggingMixin):
         self.archive_path = None
         self.text = None
         self.date: Optional[datetime.datetime] = None
+        self.ocr_page_timings: dict[int, float] = {}
+        self.ocr_fallback_pages: list[int] = []
         self.progress_callback = progress_callback
 
     def progress(self, current_progress, max_progress):
@@ -363,6 +411,19 @@ class DocumentParser(LoggingMixin):
     def get_date(self) -> Optional[datetime.datetime]:
         return self.date
 
+    def get_ocr_page_timings(self) -> dict[int, float]:
+        """
+        Returns the seconds spent on OCR of every page, by page number.
+        """
+        return self.ocr_page_timings
+
+    def get_ocr_fallback_pages(self) -> list[int]:
+        """
+        Returns the numbers of the pages which had to be OCRed again with
+        safe settings.
+        """
+        return self.ocr_fallback_pages
+
     def cleanup(self):
         self.log.debug(f"Deleting directory {self.tempdir}")
         shutil.rmtree(self.tempdir)
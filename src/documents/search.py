@@ -0,0 +1,815 @@
+import math
+import re
+import unicodedata
+from abc import ABC
+from abc import abstractmethod
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Optional
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError
+from django.db import connection
+from django.db.models import QuerySet
+from django.db.models.expressions import RawSQL
+from whoosh.analysis import STOP_WORDS
+
+from documents.models import Document
+from documents.permissions import get_objects_for_user_owner_aware
+
+
+class SearchBackend(ABC):
+    """
+    Keeps the documents searchable and searches them. Configured with
+    PAPERLESS_SEARCH_BACKEND.
+    """
+
+    @abstractmethod
+    def add_or_update_document(self, document: Document) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def remove_document(self, document: Document) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def remove_documents(self, document_ids: list[int]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_documents(self, documents: QuerySet) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def reindex(self, progress_bar_disable=False) -> int:
+        """
+        Makes all documents searchable from scratch, returns their number
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def sync(self, progress_bar_disable=False) -> tuple[int, int]:
+        """
+        Updates the documents which changed since they were made searchable,
+        returns the number of documents updated and removed
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def optimize(self) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        """
+        Makes pending changes searchable right away
+        """
+
+    def searcher(self):
+        """
+        Returns a context manager for the searcher used by queries of a request
+        """
+        return nullcontext()
+
+    @abstractmethod
+    def query(self, searcher, query_params, page_size: int, user, queryset: QuerySet):
+        """
+        Returns the results of a full text or more like this search, which
+        can be paginated. The queryset is filtered by the other query
+        parameters and the permissions of the user.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def autocomplete(self, term: str, limit: int = 10, user=None) -> list[bytes]:
+        raise NotImplementedError
+
+    def index_size(self) -> Optional[int]:
+        """
+        Returns the size of the index in bytes, if known
+        """
+        return None
+
+    def index_stats(self) -> dict:
+        """
+        Returns metrics of the index, like its size in bytes
+        """
+        return {"size_bytes": self.index_size()}
+
+
+class WhooshSearchBackend(SearchBackend):
+    """
+    Searches a Whoosh index in the data directory
+    """
+
+    def add_or_update_document(self, document: Document) -> None:
+        from documents import index
+
+        index.add_or_update_document(document)
+
+    def remove_document(self, document: Document) -> None:
+        from documents import index
+
+        index.remove_document_from_index(document)
+
+    def remove_documents(self, document_ids: list[int]) -> None:
+        from documents import index
+
+        with index.open_index_writer() as writer:
+            for document_id in document_ids:
+                index.remove_document_by_id(writer, document_id)
+
+    def update_documents(self, documents: QuerySet) -> None:
+        from whoosh.writing import AsyncWriter
+
+        from documents import index
+
+        ix = index.open_index()
+        with AsyncWriter(ix) as writer, index.open_index_searcher() as searcher:
+            for fields in index.iter_document_fields(
+                documents,
+                reader=searcher.reader(),
+            ):
+                writer.update_document(**fields)
+
+    def reindex(self, progress_bar_disable=False) -> int:
+        from documents import index
+
+        documents = Document.objects.all()
+
+        # The previous index weights the key terms of the documents, its files
+        # stay readable until the new index is committed
+        with index.open_index_searcher() as searcher:
+            ix = index.open_index(recreate=True)
+
+            return index.bulk_index_documents(
+                ix,
+                documents,
+                progress_bar_disable=progress_bar_disable,
+                reader=searcher.reader(),
+            )
+
+    def sync(self, progress_bar_disable=False) -> tuple[int, int]:
+        from documents import index
+
+        with index.open_index_searcher() as searcher:
+            return index.sync_index(
+                index.open_index(),
+                searcher.reader(),
+                progress_bar_disable=progress_bar_disable,
+            )
+
+    def optimize(self) -> None:
+        from documents import index
+
+        # Documents left queued by failed index updates
+        index.flush_index_queue()
+        index.merge_segments(
+            index.open_index(),
+            time_limit=settings.INDEX_MERGE_TIME_LIMIT,
+        )
+
+    def flush(self) -> None:
+        from documents import index
+
+        index.flush_index_queue()
+
+    def searcher(self):
+        from documents import index
+
+        return index.open_index_searcher()
+
+    def query(self, searcher, query_params, page_size: int, user, queryset: QuerySet):
+        from documents import index
+
+        if "query" in query_params:
+            query_class = index.DelayedFullTextQuery
+        elif "more_like_id" in query_params:
+            query_class = index.DelayedMoreLikeThisQuery
+        else:
+            raise ValueError
+
+        return query_class(searcher, query_params, page_size, user)
+
+    def autocomplete(self, term: str, limit: int = 10, user=None) -> list[bytes]:
+        from documents import index
+
+        return index.autocomplete(index.get_index(), term, limit, user)
+
+    def index_size(self) -> Optional[int]:
+        return sum(
+            path.stat().st_size
+            for path in Path(settings.INDEX_DIR).iterdir()
+            if path.is_file()
+        )
+
+    def index_stats(self) -> dict:
+        from documents import index
+
+        return {
+            **index.get_index_stats(index.open_index()),
+            "queued_documents": index.get_index_queue_depth(),
+        }
+
+
+# Full text index of the title and content of the documents, kept up to date
+# by triggers on the document table. Only created when the SQLite backend
+# is used, see create_database_index.
+FTS_TABLE = "documents_document_fts"
+# The position of each term in the documents
+FTS_INSTANCES_TABLE = "documents_document_fts_instances"
+# The number of documents containing each term
+FTS_TERMS_TABLE = "documents_document_fts_terms"
+# The key terms of documents searched for similar documents, stored when
+# they are first needed and removed by triggers when the content changes
+KEY_TERMS_TABLE = "documents_document_key_terms"
+
+CREATE_FTS = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title,
+        content,
+        content='documents_document',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_INSTANCES_TABLE}
+    USING fts5vocab({FTS_TABLE}, 'instance')
+    """,
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TERMS_TABLE}
+    USING fts5vocab({FTS_TABLE}, 'row')
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert
+    AFTER INSERT ON documents_document BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, content)
+        VALUES (new.id, new.title, new.content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete
+    AFTER DELETE ON documents_document BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update
+    AFTER UPDATE OF title, content ON documents_document BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO {FTS_TABLE}(rowid, title, content)
+        VALUES (new.id, new.title, new.content);
+    END
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS {KEY_TERMS_TABLE} (
+        document_id INTEGER PRIMARY KEY,
+        terms TEXT NOT NULL
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {KEY_TERMS_TABLE}_delete
+    AFTER DELETE ON documents_document BEGIN
+        DELETE FROM {KEY_TERMS_TABLE} WHERE document_id = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {KEY_TERMS_TABLE}_update
+    AFTER UPDATE OF content ON documents_document BEGIN
+        DELETE FROM {KEY_TERMS_TABLE} WHERE document_id = old.id;
+    END
+    """,
+]
+
+DROP_FTS = [
+    f"DROP TRIGGER IF EXISTS {KEY_TERMS_TABLE}_update",
+    f"DROP TRIGGER IF EXISTS {KEY_TERMS_TABLE}_delete",
+    f"DROP TABLE IF EXISTS {KEY_TERMS_TABLE}",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_update",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_delete",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_insert",
+    f"DROP TABLE IF EXISTS {FTS_TERMS_TABLE}",
+    f"DROP TABLE IF EXISTS {FTS_INSTANCES_TABLE}",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def database_index_exists() -> bool:
+    if connection.vendor != "sqlite":
+        return False
+    with connection.cursor() as cursor:
+        # Indexes created by earlier versions lack the key terms
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master "
+            "WHERE type = 'table' AND name IN (%s, %s)",
+            [FTS_TABLE, KEY_TERMS_TABLE],
+        )
+        return cursor.fetchone()[0] == 2
+
+
+def create_database_index() -> None:
+    """
+    Creates the full text index of the database and the triggers keeping it
+    up to date, and fills it with all documents
+    """
+    if connection.vendor != "sqlite":
+        raise ImproperlyConfigured(
+            "The SQLite search backend requires an SQLite database",
+        )
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        if not cursor.fetchone()[0]:
+            raise ImproperlyConfigured(
+                "The SQLite search backend requires SQLite built with FTS5",
+            )
+        for statement in CREATE_FTS:
+            cursor.execute(statement)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        # Weighted by the documents indexed before
+        cursor.execute(f"DELETE FROM {KEY_TERMS_TABLE}")
+
+
+def drop_database_index() -> None:
+    """
+    Removes the full text index of the database and its triggers, so that
+    changing documents doesn't update it anymore
+    """
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for statement in DROP_FTS:
+            cursor.execute(statement)
+
+
+# Column weights for ranking, like the fields of the Whoosh index
+FTS_RANK = f"bm25({FTS_TABLE}, 1.0, 1.0)"
+FTS_HIGHLIGHT = (
+    f"snippet({FTS_TABLE}, 1, '<span class=\"match\">', '</span>', ' ... ', 16)"
+)
+
+# Tokens as split by the unicode61 tokenizer
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _tokens(text: str) -> list[str]:
+    """
+    Returns the terms of the text, lower case and without diacritics like
+    the unicode61 tokenizer of the full text index
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _TOKEN_RE.findall(text)
+
+
+class UnsupportedQueryError(ValueError):
+    """
+    The query uses search syntax the search backend does not support
+    """
+
+
+# Parts of a query: phrases, parentheses and anything else up to a space
+_QUERY_PART_RE = re.compile(r'"[^"]*"?|[()]|[^\s()"]+')
+# Fields of the full text index of the database
+_FTS_COLUMNS = ("title", "content")
+
+
+def _phrase(terms: list[str], prefix: bool = False) -> str:
+    return f'"{" ".join(terms)}"' + ("*" if prefix else "")
+
+
+def _translate_query(query: str) -> Optional[str]:
+    """
+    Translates the search syntax of the Whoosh index into a full text query
+    of the database, or returns None if the query contains no words. Words,
+    "phrases", AND, OR, NOT, parentheses, trailing * wildcards and the title
+    and content fields are supported. Raises UnsupportedQueryError for any
+    other syntax.
+    """
+    parts = _QUERY_PART_RE.findall(query)
+    expression: list[str] = []
+    # Whether an operand, rather than an operator or "(", was added last
+    after_operand = False
+    depth = 0
+    column = None
+    for part in parts:
+        if column is not None and part in ("AND", "OR", "NOT", "(", ")"):
+            raise UnsupportedQueryError(
+                f"The {column} field must be followed by a word or a phrase",
+            )
+        if part == "NOT" and expression and expression[-1] == "AND":
+            # Whoosh's AND NOT is NOT of the database
+            expression.pop()
+            after_operand = True
+        if part in ("AND", "OR", "NOT"):
+            if not after_operand:
+                raise UnsupportedQueryError(
+                    f"{part} must follow a word, a phrase or a group",
+                )
+            expression.append(part)
+            after_operand = False
+            continue
+        if part == "(":
+            if after_operand:
+                expression.append("AND")
+            expression.append(part)
+            depth += 1
+            after_operand = False
+            continue
+        if part == ")":
+            if depth == 0 or not after_operand:
+                raise UnsupportedQueryError("Unbalanced parentheses")
+            expression.append(part)
+            depth -= 1
+            continue
+
+        if not part.startswith('"') and ":" in part:
+            field, _, part = part.partition(":")
+            if field not in _FTS_COLUMNS:
+                raise UnsupportedQueryError(
+                    f"Searching the {field} field is not supported, only "
+                    f"{' and '.join(_FTS_COLUMNS)}",
+                )
+            column = field
+            if not part:
+                # The value is a phrase
+                continue
+
+        if part.startswith('"'):
+            terms = _tokens(part.strip('"'))
+            operand = _phrase(terms) if terms else None
+        else:
+            prefix = part.endswith("*")
+            word = part[:-1] if prefix else part
+            if any(c in word for c in "*?~^[]{}"):
+                raise UnsupportedQueryError(
+                    f"{part} uses search syntax which is not supported",
+                )
+            terms = _tokens(word)
+            operand = _phrase(terms, prefix) if terms else None
+        if operand is None:
+            # Nothing but punctuation
+            column = None
+            continue
+        if column is not None:
+            operand = f"{column} : {operand}"
+            column = None
+        if after_operand:
+            expression.append("AND")
+        expression.append(operand)
+        after_operand = True
+
+    if depth or column is not None or (expression and not after_operand):
+        raise UnsupportedQueryError("The query is incomplete")
+    return " ".join(expression) if expression else None
+
+
+def _match_any(terms: list[str], column: str) -> str:
+    return f"{column} : ({' OR '.join(f'{chr(34)}{term}{chr(34)}' for term in terms)})"
+
+
+class DatabaseHit:
+    """
+    A document in the results of a database search, like a Whoosh hit
+    """
+
+    def __init__(self, document_id: int, score, rank: int, highlight: str):
+        self.document_id = document_id
+        self.score = score
+        self.rank = rank
+        self.highlight = highlight
+
+    def __getitem__(self, key):
+        if key == "id":
+            return self.document_id
+        raise KeyError(key)
+
+    def highlights(self, fieldname: str, text: Optional[str] = None) -> str:
+        # Only the content is highlighted by the index
+        return self.highlight if fieldname == "content" else ""
+
+
+class SqliteQuery:
+    """
+    Full text or more like this search in the full text index of the
+    database, within a queryset of documents. Results are ranked unless the
+    query parameters order them. The database ranks and counts the matches,
+    and only returns the requested page.
+    """
+
+    # Number of key terms of a document searched for similar documents
+    MORE_LIKE_THIS_TERMS = 20
+
+    def __init__(self, queryset: QuerySet, query_params, page_size: int):
+        self.queryset = queryset
+        self.query_params = query_params
+        self.page_size = page_size
+        self._match: Optional[str] = None
+        self._match_translated = False
+        self._count: Optional[int] = None
+        self._top_score: Optional[float] = None
+
+    def _get_match(self) -> Optional[str]:
+        if "query" in self.query_params:
+            return _translate_query(self.query_params["query"])
+        terms = self._get_key_terms(int(self.query_params["more_like_id"]))
+        return _match_any(terms, "content") if terms else None
+
+    def _get_key_terms(self, document_id: int) -> list[str]:
+        """
+        Returns the terms of the content of the document which are the most
+        specific to it, by their tf-idf weight. Stop words are left out like
+        in the Whoosh index. The terms are computed once per content, like
+        the key terms stored in the Whoosh index.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT terms FROM {KEY_TERMS_TABLE} WHERE document_id = %s",
+                [document_id],
+            )
+            row = cursor.fetchone()
+        if row is not None:
+            return row[0].split()
+
+        content = Document.objects.get(id=document_id).content
+        key_terms = self._compute_key_terms(content)
+        with connection.cursor() as cursor:
+            # Unless the content changed in the meantime, the triggers would
+            # not remove the terms then
+            cursor.execute(
+                f"INSERT OR REPLACE INTO {KEY_TERMS_TABLE}(document_id, terms) "
+                "SELECT id, %s FROM documents_document WHERE id = %s "
+                "AND content = %s",
+                [" ".join(key_terms), document_id, content],
+            )
+        return key_terms
+
+    def _compute_key_terms(self, content: str) -> list[str]:
+        frequencies: dict[str, int] = {}
+        for term in _tokens(content):
+            if len(term) > 1 and term not in STOP_WORDS:
+                frequencies[term] = frequencies.get(term, 0) + 1
+        if not frequencies:
+            return []
+
+        document_count = Document.objects.count()
+        weights = {}
+        terms = list(frequencies)
+        with connection.cursor() as cursor:
+            for i in range(0, len(terms), 500):
+                chunk = terms[i : i + 500]
+                cursor.execute(
+                    f"SELECT term, doc FROM {FTS_TERMS_TABLE} "
+                    f"WHERE term IN ({', '.join(['%s'] * len(chunk))})",
+                    chunk,
+                )
+                for term, documents in cursor.fetchall():
+                    weights[term] = frequencies[term] * math.log(
+                        document_count / documents,
+                    )
+        key_terms = sorted(weights, key=lambda term: (-weights[term], term))
+        return key_terms[: self.MORE_LIKE_THIS_TERMS]
+
+    def _get_documents(self) -> Optional[QuerySet]:
+        """
+        Returns the documents of the queryset the search may find, or None if
+        the query matches nothing
+        """
+        if not self._match_translated:
+            self._match = self._get_match()
+            self._match_translated = True
+        if self._match is None:
+            return None
+        documents = self.queryset
+        if "more_like_id" in self.query_params:
+            documents = documents.exclude(id=int(self.query_params["more_like_id"]))
+        return documents
+
+    def _get_matches(self, documents: QuerySet) -> QuerySet:
+        # Ranking functions of the index can't be used in the queries of the
+        # queryset, so only the ids of the matches are taken from the index
+        matches = RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+            [self._match],
+        )
+        return documents.filter(id__in=matches)
+
+    def _query_index(
+        self,
+        columns: str,
+        documents: QuerySet,
+        suffix: str = "",
+        params: tuple = (),
+    ) -> list[tuple]:
+        """
+        Selects the columns of the matches of the full text index which are
+        among the documents, followed by the suffix of the query
+        """
+        documents_sql, documents_params = (
+            documents.order_by().values("id").query.sql_with_params()
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT {columns} FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s AND rowid IN ({documents_sql}) "
+                f"{suffix}",
+                [self._match, *documents_params, *params],
+            )
+            return cursor.fetchall()
+
+    def _get_page(
+        self,
+        start: int,
+        stop: Optional[int],
+    ) -> list[tuple[int, Optional[float]]]:
+        """
+        Returns the ids of the matching documents from start to stop, in ranked
+        order with their scores unless the query parameters order them
+        """
+        documents = self._get_documents()
+        if documents is None:
+            return []
+        if "ordering" in self.query_params:
+            document_ids = self._get_matches(documents).values_list("id", flat=True)
+            return [(document_id, None) for document_id in document_ids[start:stop]]
+        return self._query_index(
+            f"rowid, {FTS_RANK}",
+            documents,
+            "ORDER BY 2, 1 LIMIT %s OFFSET %s",
+            # A negative limit is no limit
+            (-1 if stop is None else max(stop - start, 0), start),
+        )
+
+    def _get_top_score(self) -> Optional[float]:
+        if self._top_score is None:
+            page = self._get_page(0, 1)
+            self._top_score = page[0][1] if page else None
+        return self._top_score
+
+    def _get_highlights(self, document_ids: list[int]) -> dict[int, str]:
+        if not document_ids:
+            return {}
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, {FTS_HIGHLIGHT} FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s "
+                f"AND rowid IN ({', '.join(['%s'] * len(document_ids))})",
+                [self._match, *document_ids],
+            )
+            return dict(cursor.fetchall())
+
+    def __len__(self):
+        if self._count is None:
+            documents = self._get_documents()
+            if documents is None:
+                self._count = 0
+            else:
+                self._count = self._query_index("count(*)", documents)[0][0]
+        return self._count
+
+    def __getitem__(self, item: slice) -> list[DatabaseHit]:
+        start = item.start or 0
+        page = self._get_page(start, item.stop)
+        if start == 0 and page:
+            # The first page starts with the best score
+            self._top_score = page[0][1]
+        highlights = self._get_highlights([document_id for document_id, _ in page])
+        # Scores are negative, the lowest is the best
+        top_score = self._get_top_score() if page and page[0][1] is not None else None
+        return [
+            DatabaseHit(
+                document_id,
+                score / top_score if score is not None and top_score else None,
+                rank,
+                highlights.get(document_id, ""),
+            )
+            for rank, (document_id, score) in enumerate(page, start=start)
+        ]
+
+    def get_result_ids(self) -> list[int]:
+        return [document_id for document_id, _ in self._get_page(0, None)]
+
+
+class SqliteSearchBackend(SearchBackend):
+    """
+    Searches the full text index of the database, which the database keeps
+    up to date by itself. Requires SQLite with FTS5.
+    """
+
+    def __init__(self):
+        if connection.vendor != "sqlite":
+            raise ImproperlyConfigured(
+                "The SQLite search backend requires an SQLite database",
+            )
+
+    def _check_index(self) -> None:
+        # Checked on every use, other processes may create or drop the index
+        if not database_index_exists():
+            raise ImproperlyConfigured(
+                "The full text index of the database does not exist yet, "
+                "create it with the document_index reindex command",
+            )
+
+    def add_or_update_document(self, document: Document) -> None:
+        pass
+
+    def remove_document(self, document: Document) -> None:
+        pass
+
+    def remove_documents(self, document_ids: list[int]) -> None:
+        pass
+
+    def update_documents(self, documents: QuerySet) -> None:
+        pass
+
+    def reindex(self, progress_bar_disable=False) -> int:
+        create_database_index()
+        return Document.objects.count()
+
+    def sync(self, progress_bar_disable=False) -> tuple[int, int]:
+        self._check_index()
+        # The triggers never let the index fall behind
+        return 0, 0
+
+    def optimize(self) -> None:
+        self._check_index()
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+
+    def query(self, searcher, query_params, page_size: int, user, queryset: QuerySet):
+        if "query" not in query_params and "more_like_id" not in query_params:
+            raise ValueError
+        self._check_index()
+        return SqliteQuery(queryset, query_params, page_size)
+
+    def autocomplete(self, term: str, limit: int = 10, user=None) -> list[bytes]:
+        """
+        Returns the terms of the content starting with term, which are
+        contained in the most documents visible to the user
+        """
+        self._check_index()
+        terms = _tokens(term)
+        if len(terms) != 1:
+            return []
+        prefix = terms[0]
+
+        documents = Document.objects.all()
+        if user is None:
+            documents = documents.filter(owner__isnull=True)
+        elif not user.is_superuser:
+            documents = get_objects_for_user_owner_aware(
+                user,
+                "documents.view_document",
+                Document,
+            )
+        visible_sql, visible_params = documents.values("id").query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT term FROM {FTS_INSTANCES_TABLE} "
+                "WHERE term >= %s AND term < %s AND col = 'content' "
+                f"AND doc IN ({visible_sql}) "
+                "GROUP BY term ORDER BY count(DISTINCT doc) DESC, min(doc), term "
+                "LIMIT %s",
+                [prefix, prefix + "\U0010ffff", *visible_params, limit],
+            )
+            return [row[0].encode() for row in cursor.fetchall()]
+
+    def index_size(self) -> Optional[int]:
+        with connection.cursor() as cursor:
+            try:
+                cursor.execute(
+                    "SELECT sum(pgsize) FROM dbstat WHERE name LIKE %s",
+                    [f"{FTS_TABLE}%"],
+                )
+            except OperationalError:
+                # SQLite was built without the dbstat table
+                return None
+            return cursor.fetchone()[0]
+
+
+SEARCH_BACKENDS = {
+    "whoosh": WhooshSearchBackend,
+    "sqlite": SqliteSearchBackend,
+}
+
+
+# The backends used by this process, by name
+_backends: dict[str, SearchBackend] = {}
+
+
+def get_search_backend() -> SearchBackend:
+    backend = _backends.get(settings.SEARCH_BACKEND)
+    if backend is None:
+        try:
+            backend_class = SEARCH_BACKENDS[settings.SEARCH_BACKEND]
+        except KeyError:
+            raise ImproperlyConfigured(
+                f"Unknown search backend {settings.SEARCH_BACKEND}, "
+                f"use one of {', '.join(SEARCH_BACKENDS)}",
+            )
+        backend = backend_class()
+        _backends[settings.SEARCH_BACKEND] = backend
+    return backend
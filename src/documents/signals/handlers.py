@@ -16,6 +16,7 @@ from django.contrib.contenttypes.models import ContentType
 from django.db import DatabaseError
 from django.db import close_old_connections
 from django.db import models
+from django.db import transaction
 from django.db.models import Q
 from django.dispatch import receiver
 from django.utils import termcolors
@@ -24,12 +25,16 @@ from filelock import FileLock
 
 from documents import matching
 from documents.classifier import DocumentClassifier
+from documents.classifier import classifier_labels_changed
 from documents.file_handling import create_source_path_directory
 from documents.file_handling import delete_empty_directories
 from documents.file_handling import generate_unique_filename
+from documents.models import Correspondent
 from documents.models import Document
+from documents.models import DocumentType
 from documents.models import MatchingModel
 from documents.models import PaperlessTask
+from documents.models import StoragePath
 from documents.models import Tag
 from documents.permissions import get_objects_for_user_owner_aware
 
@@ -494,6 +499,28 @@ def update_filename_and_move_files(sender, instance: Document, **kwargs):
             )
 
 
+@receiver(models.signals.post_delete, sender=Correspondent)
+@receiver(models.signals.post_delete, sender=DocumentType)
+@receiver(models.signals.post_delete, sender=StoragePath)
+@receiver(models.signals.post_delete, sender=Tag)
+@receiver(models.signals.post_save, sender=Correspondent)
+@receiver(models.signals.post_save, sender=DocumentType)
+@receiver(models.signals.post_save, sender=StoragePath)
+@receiver(models.signals.post_save, sender=Tag)
+def invalidate_matcher(sender, instance: MatchingModel, **kwargs):
+    # This transaction sees the change right away, other processes once it is
+    # committed
+    matching.clear_matcher_cache()
+    transaction.on_commit(matching.matching_rules_changed)
+
+
+@receiver(models.signals.m2m_changed, sender=Document.tags.through)
+def update_classifier_labels_version(sender, action: str, **kwargs):
+    # Changing tags does not change the modification time of documents
+    if action in ("post_add", "post_remove", "post_clear"):
+        transaction.on_commit(classifier_labels_changed)
+
+
 def set_log_entry(sender, document: Document, logging_group=None, **kwargs):
     ct = ContentType.objects.get(model="document")
     user = User.objects.get(username="consumer")
@@ -509,9 +536,9 @@ def set_log_entry(sender, document: Document, logging_group=None, **kwargs):
 
 
 def add_to_index(sender, document, **kwargs):
-    from documents import index
+    from documents.search import get_search_backend
 
-    index.add_or_update_document(document)
+    get_search_backend().add_or_update_document(document)
 
 
 @before_task_publish.connect
@@ -1,10 +1,8 @@
-import hashlib
 import logging
 import shutil
 import uuid
 from typing import Optional
 
-import tqdm
 from asgiref.sync import async_to_sync
 from celery import Task
 from celery import shared_task
@@ -14,13 +12,13 @@ from django.db import transaction
 from django.db.models.signals import post_save
 from filelock import FileLock
 from redis.exceptions import ConnectionError
-from whoosh.writing import AsyncWriter
 
-from documents import index
 from documents import sanity_checker
 from documents.barcodes import BarcodeReader
 from documents.classifier import DocumentClassifier
+from documents.classifier import get_classifier_cache_stats
 from documents.classifier import load_classifier
+from documents.classifier import remove_legacy_model_file
 from documents.consumer import Consumer
 from documents.consumer import ConsumerError
 from documents.data_models import ConsumableDocument
@@ -28,6 +26,7 @@ from documents.data_models import DocumentMetadataOverrides
 from documents.double_sided import collate
 from documents.file_handling import create_source_path_directory
 from documents.file_handling import generate_unique_filename
+from documents.index import clear_index_update_schedule
 from documents.models import Correspondent
 from documents.models import Document
 from documents.models import DocumentType
@@ -36,6 +35,8 @@ from documents.models import Tag
 from documents.parsers import DocumentParser
 from documents.parsers import get_parser_class_for_mime_type
 from documents.sanity_checker import SanityCheckFailedException
+from documents.search import get_search_backend
+from documents.utils import compute_checksum
 
 if settings.AUDIT_LOG_ENABLED:
     import json
@@ -45,24 +46,41 @@ logger = logging.getLogger("paperless.tasks")
 
 
 @shared_task
-def index_optimize():
-    ix = index.open_index()
-    writer = AsyncWriter(ix)
-    writer.commit(optimize=True)
+def index_optimize() -> dict:
+    backend = get_search_backend()
+    backend.optimize()
+    stats = backend.index_stats()
+    logger.debug(f"Index after optimizing: {stats}")
+    return stats
 
 
-def index_reindex(progress_bar_disable=False):
-    documents = Document.objects.all()
+@shared_task
+def update_index():
+    """
+    Writes the documents queued by changes to the index. If writing fails,
+    they stay queued for the next run or the next index optimization.
+    """
+    clear_index_update_schedule()
+    get_search_backend().flush()
 
-    ix = index.open_index(recreate=True)
 
-    with AsyncWriter(ix) as writer:
-        for document in tqdm.tqdm(documents, disable=progress_bar_disable):
-            index.update_document(writer, document)
+def index_reindex(progress_bar_disable=False) -> int:
+    return get_search_backend().reindex(progress_bar_disable=progress_bar_disable)
+
+
+def index_sync(progress_bar_disable=False) -> tuple[int, int]:
+    return get_search_backend().sync(progress_bar_disable=progress_bar_disable)
 
 
 @shared_task
-def train_classifier():
+def train_classifier() -> dict[str, int]:
+    """
+    Trains the classifier if the training data changed. Returns how often
+    the worker process running this task used its cached classifier, so
+    they can be seen in the results of the task.
+    """
+    remove_legacy_model_file()
+
     if (
         not Tag.objects.filter(matching_algorithm=Tag.MATCH_AUTO).exists()
         and not DocumentType.objects.filter(matching_algorithm=Tag.MATCH_AUTO).exists()
@@ -75,9 +93,10 @@ def train_classifier():
         if settings.MODEL_FILE.exists():
             logger.info(f"Removing {settings.MODEL_FILE} so it won't be used")
             settings.MODEL_FILE.unlink()
-        return
+        return get_classifier_cache_stats()
 
-    classifier = load_classifier()
+    # Train a private instance, the cached one might be in use elsewhere
+    classifier = load_classifier(use_cache=False)
 
     if not classifier:
         classifier = DocumentClassifier()
@@ -88,12 +107,17 @@ def train_classifier():
                 f"Saving updated classifier model to {settings.MODEL_FILE}...",
             )
             classifier.save()
+        elif classifier.fingerprint_changed:
+            logger.debug("Training data unchanged, saving its fingerprint.")
+            classifier.save()
         else:
             logger.debug("Training data unchanged.")
 
     except Exception as e:
         logger.warning("Classifier error: " + str(e))
 
+    return get_classifier_cache_stats()
+
 
 @shared_task(bind=True)
 def consume_file(
@@ -164,7 +188,8 @@ def consume_file(
     overrides.update(template_overrides)
 
     # continue with consumption if no barcode was found
-    document = Consumer().try_consume_file(
+    consumer = Consumer()
+    document = consumer.try_consume_file(
         input_doc.original_file,
         override_filename=overrides.filename,
         override_title=overrides.title,
@@ -184,7 +209,9 @@ def consume_file(
     )
 
     if document:
-        return f"Success. New document id {document.pk} created"
+        result = f"Success. New document id {document.pk} created"
+        ocr_summary = consumer.get_ocr_summary()
+        return f"{result}. {ocr_summary}" if ocr_summary else result
     else:
         raise ConsumerError(
             "Unknown error: Returned document was null, but "
@@ -212,14 +239,10 @@ def sanity_check():
 def bulk_update_documents(document_ids):
     documents = Document.objects.filter(id__in=document_ids)
 
-    ix = index.open_index()
-
     for doc in documents:
         post_save.send(Document, instance=doc, created=False)
 
-    with AsyncWriter(ix) as writer:
-        for doc in documents:
-            index.update_document(writer, doc)
+    get_search_backend().update_documents(documents)
 
 
 @shared_task
@@ -253,8 +276,7 @@ def update_document_archive_file(document_id):
 
         if parser.get_archive_path():
             with transaction.atomic():
-                with open(parser.get_archive_path(), "rb") as f:
-                    checksum = hashlib.md5(f.read()).hexdigest()
+                checksum = compute_checksum(parser.get_archive_path())
                 # I'm going to save first so that in case the file move
                 # fails, the database is rolled back.
                 # We also don't use save() since that triggers the filehandling
@@ -299,8 +321,7 @@ def update_document_archive_file(document_id):
                     shutil.move(parser.get_archive_path(), document.archive_path)
                     shutil.move(thumbnail, document.thumbnail_path)
 
-            with index.open_index_writer() as writer:
-                index.update_document(writer, document)
+            get_search_backend().add_or_update_document(document)
 
     except Exception:
         logger.exception(
@@ -25,6 +25,9 @@ class TestBulkEdit(DirectoriesMixin, APITestCase):
         patcher = mock.patch("documents.bulk_edit.bulk_update_documents.delay")
         self.async_task = patcher.start()
         self.addCleanup(patcher.stop)
+        patcher = mock.patch("documents.bulk_edit.classifier_labels_changed")
+        self.labels_changed = patcher.start()
+        self.addCleanup(patcher.stop)
         self.c1 = Correspondent.objects.create(name="c1")
         self.c2 = Correspondent.objects.create(name="c2")
         self.dt1 = DocumentType.objects.create(name="dt1")
@@ -58,6 +61,7 @@ class TestBulkEdit(DirectoriesMixin, APITestCase):
             self.c2.id,
         )
         self.assertEqual(Document.objects.filter(correspondent=self.c2).count(), 3)
+        self.labels_changed.assert_called_once()
         self.async_task.assert_called_once()
         args, kwargs = self.async_task.call_args
         self.assertCountEqual(kwargs["document_ids"], [self.doc1.id, self.doc2.id])
@@ -150,6 +154,7 @@ class TestBulkEdit(DirectoriesMixin, APITestCase):
             self.t1.id,
         )
         self.assertEqual(Document.objects.filter(tags__id=self.t1.id).count(), 4)
+        self.labels_changed.assert_called_once()
         self.async_task.assert_called_once()
         args, kwargs = self.async_task.call_args
         self.assertCountEqual(kwargs["document_ids"], [self.doc1.id, self.doc3.id])
@@ -711,6 +711,31 @@ class TestDocumentApi(DirectoriesMixin, DocumentConsumeDelayMixin, APITestCase):
         self.assertEqual(len(response.data["all"]), 50)
         self.assertCountEqual(response.data["all"], [d.id for d in docs])
 
+    def test_pagination_all_ids_only(self):
+        """
+        GIVEN:
+            - A set of 50 documents
+        WHEN:
+            - API request for documents, with or without the ids of all results
+        THEN:
+            - The ids of all results are in the order of the results
+            - The ids of all results are left out if not requested
+        """
+        docs = [
+            Document.objects.create(checksum=i, title=f"{50 - i:02}", content="test")
+            for i in range(50)
+        ]
+
+        response = self.client.get("/api/documents/?ordering=title")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["all"], [d.id for d in reversed(docs)])
+
+        response = self.client.get("/api/documents/?include_all=false")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("all", response.data)
+        self.assertEqual(response.data["count"], 50)
+        self.assertEqual(len(response.data["results"]), 25)
+
     def test_statistics(self):
         doc1 = Document.objects.create(
             title="none1",
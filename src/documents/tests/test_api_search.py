@@ -119,6 +119,102 @@ class TestDocumentSearchApi(DirectoriesMixin, APITestCase):
             self.assertNotIn(result["id"], seen_ids)
             seen_ids.append(result["id"])
 
+    def test_search_pages_from_cached_ranking(self):
+        """
+        GIVEN:
+            - Documents in the index matching a query
+        WHEN:
+            - Several pages of the results are requested
+            - The index changes
+        THEN:
+            - The query is only searched once until the index changes
+            - All ids are returned with every page
+        """
+        with AsyncWriter(index.open_index()) as writer:
+            for i in range(25):
+                doc = Document.objects.create(
+                    checksum=str(i),
+                    pk=i + 1,
+                    title=f"Document {i+1}",
+                    content="content",
+                )
+                index.update_document(writer, doc)
+
+        with mock.patch.object(
+            index.DelayedFullTextQuery,
+            "_get_query",
+            autospec=True,
+            side_effect=index.DelayedFullTextQuery._get_query,
+        ) as get_query:
+            seen_ids = []
+            for i in range(1, 4):
+                response = self.client.get(
+                    f"/api/documents/?query=content&page={i}&page_size=10",
+                )
+                self.assertEqual(response.data["count"], 25)
+                self.assertCountEqual(response.data["all"], range(1, 26))
+                seen_ids.extend(result["id"] for result in response.data["results"])
+            self.assertCountEqual(seen_ids, range(1, 26))
+            self.assertEqual(get_query.call_count, 1)
+
+            doc = Document.objects.create(
+                checksum="new",
+                title="Another document",
+                content="content",
+            )
+            with AsyncWriter(index.open_index()) as writer:
+                index.update_document(writer, doc)
+
+            response = self.client.get("/api/documents/?query=content&page_size=10")
+            self.assertEqual(response.data["count"], 26)
+            self.assertIn(doc.id, response.data["all"])
+            self.assertEqual(get_query.call_count, 2)
+
+    @mock.patch("documents.index.SEARCH_RANKING_PAGES", 1)
+    def test_search_ranks_requested_pages_only(self):
+        """
+        GIVEN:
+            - Documents in the index matching a query
+        WHEN:
+            - Pages of the results are requested one after another
+        THEN:
+            - Only the documents up to the requested page are ranked
+            - The ranking is extended when a later page is requested
+            - The count and the ids of all results include every document
+        """
+        with AsyncWriter(index.open_index()) as writer:
+            for i in range(25):
+                doc = Document.objects.create(
+                    checksum=str(i),
+                    pk=i + 1,
+                    title=f"Document {i+1}",
+                    content="content",
+                )
+                index.update_document(writer, doc)
+
+        with mock.patch.object(
+            index.DelayedFullTextQuery,
+            "_get_query",
+            autospec=True,
+            side_effect=index.DelayedFullTextQuery._get_query,
+        ) as get_query:
+            seen_ids = []
+            for i in range(1, 4):
+                response = self.client.get(
+                    f"/api/documents/?query=content&page={i}&page_size=10",
+                )
+                self.assertEqual(response.data["count"], 25)
+                self.assertCountEqual(response.data["all"], range(1, 26))
+                seen_ids.extend(result["id"] for result in response.data["results"])
+                self.assertEqual(get_query.call_count, i)
+            self.assertCountEqual(seen_ids, range(1, 26))
+
+            # Ranked completely by now
+            response = self.client.get(
+                "/api/documents/?query=content&page=1&page_size=10",
+            )
+            self.assertEqual(get_query.call_count, 3)
+
     def test_search_invalid_page(self):
         with AsyncWriter(index.open_index()) as writer:
             for i in range(15):
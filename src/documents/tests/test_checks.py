@@ -2,12 +2,15 @@ import textwrap
 from unittest import mock
 
 from django.core.checks import Error
+from django.core.checks import Warning
 from django.test import TestCase
 from django.test import override_settings
 
 from documents.checks import changed_password_check
 from documents.checks import parser_check
+from documents.checks import search_backend_check
 from documents.models import Document
+from documents.search import create_database_index
 from documents.tests.factories import DocumentFactory
 
 
@@ -73,3 +76,59 @@ class TestDocumentChecks(TestCase):
                     ),
                 ],
             )
+
+    def test_search_backend_check(self):
+        """
+        GIVEN:
+            - The SQLite search backend is selected
+        WHEN:
+            - The full text index of the database is missing, then created
+        THEN:
+            - A warning is shown until the index is created
+        """
+        self.assertEqual(search_backend_check(None), [])
+
+        with override_settings(SEARCH_BACKEND="sqlite"):
+            self.assertEqual(
+                search_backend_check(None),
+                [
+                    Warning(
+                        "The full text index of the SQLite search backend "
+                        "does not exist yet. Create it with the document_index "
+                        "reindex command.",
+                    ),
+                ],
+            )
+
+            create_database_index()
+            self.assertEqual(search_backend_check(None), [])
+
+    def test_search_backend_check_unsupported(self):
+        """
+        GIVEN:
+            - An unknown search backend, or the SQLite search backend with
+              another database
+        WHEN:
+            - The settings are checked
+        THEN:
+            - An error is shown
+        """
+        with override_settings(SEARCH_BACKEND="elastic"):
+            self.assertEqual(
+                search_backend_check(None),
+                [Error("Unknown search backend elastic, use one of whoosh, sqlite.")],
+            )
+
+        with override_settings(SEARCH_BACKEND="sqlite"), mock.patch(
+            "documents.checks.connection",
+        ) as connection:
+            connection.vendor = "postgresql"
+            self.assertEqual(
+                search_backend_check(None),
+                [
+                    Error(
+                        "The SQLite search backend requires an SQLite database, "
+                        "use the whoosh search backend with other databases.",
+                    ),
+                ],
+            )
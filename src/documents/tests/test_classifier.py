@@ -1,16 +1,26 @@
 import os
+import pickle
 import re
+import sqlite3
+import threading
 from pathlib import Path
 from unittest import mock
 
-import pytest
+import numpy as np
 from django.conf import settings
+from django.db import connection
 from django.test import TestCase
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 
 from documents.classifier import ClassifierModelCorruptError
+from documents.classifier import ClassifierPrediction
 from documents.classifier import DocumentClassifier
 from documents.classifier import IncompatibleClassifierVersionError
+from documents.classifier import _json_params
+from documents.classifier import classifier_labels_changed
+from documents.classifier import get_classifier_cache_stats
+from documents.classifier import get_preprocessed_text_cache
 from documents.classifier import load_classifier
 from documents.models import Correspondent
 from documents.models import Document
@@ -30,6 +40,12 @@ def dummy_preprocess(content: str):
     return content
 
 
+# The version of the labels is kept in the cache
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    },
+)
 class TestClassifier(DirectoriesMixin, TestCase):
     def setUp(self):
         super().setUp()
@@ -242,6 +258,85 @@ class TestClassifier(DirectoriesMixin, TestCase):
         )
         self.assertEqual(self.classifier.predict_document_type(self.doc2.content), None)
 
+    def test_predict_all(self):
+        """
+        GIVEN:
+            - Classifier trained against test data
+        WHEN:
+            - Predictions for several documents are requested at once
+        THEN:
+            - Only content not seen in training is preprocessed, once
+            - Predictions match the ones for the single documents
+            - Later single predictions reuse the batch predictions
+        """
+        self.generate_test_data()
+        self.classifier.train()
+        self.classifier.preprocess_content.reset_mock()
+
+        predictions = self.classifier.predict_all(
+            [self.doc1.content, self.doc2.content, "some new document"],
+        )
+
+        self.assertEqual(self.classifier.preprocess_content.call_count, 1)
+        self.assertEqual(
+            predictions[0],
+            ClassifierPrediction(
+                correspondent=self.c1.pk,
+                document_type=self.dt.pk,
+                tags=[self.t1.pk],
+                storage_path=self.sp1.pk,
+            ),
+        )
+        self.assertIsNone(predictions[1].correspondent)
+        self.assertListEqual(predictions[1].tags, [self.t1.pk, self.t3.pk])
+
+        self.assertEqual(
+            self.classifier.predict_correspondent(self.doc1.content),
+            self.c1.pk,
+        )
+        self.assertListEqual(
+            self.classifier.predict_tags(self.doc2.content),
+            [self.t1.pk, self.t3.pk],
+        )
+        self.assertEqual(self.classifier.preprocess_content.call_count, 1)
+
+        self.assertListEqual(self.classifier.predict_all([]), [])
+
+    def test_predict_all_kept_per_thread(self):
+        """
+        GIVEN:
+            - Classifier trained against test data
+        WHEN:
+            - Predictions for several documents are requested at once
+        THEN:
+            - Only checksums of the content are kept, by document id
+            - Predictions beyond the cache size are not kept
+            - Other threads do not see the predictions
+        """
+        self.generate_test_data()
+        self.classifier.train()
+
+        with mock.patch.object(DocumentClassifier, "PREDICTIONS_CACHE_SIZE", 1):
+            self.classifier.predict_all(
+                [self.doc1.content, self.doc2.content],
+                [self.doc1.pk, self.doc2.pk],
+            )
+        predictions = self.classifier._local.predictions
+        self.assertEqual(len(predictions), 1)
+        ((document_id, checksum),) = predictions.keys()
+        self.assertEqual(document_id, self.doc1.pk)
+        self.assertNotIn(self.doc1.content.encode(), checksum)
+
+        other_predictions = []
+        thread = threading.Thread(
+            target=lambda: other_predictions.append(
+                getattr(self.classifier._local, "predictions", None),
+            ),
+        )
+        thread.start()
+        thread.join()
+        self.assertListEqual(other_predictions, [None])
+
     def test_no_retrain_if_no_change(self):
         """
         GIVEN:
@@ -277,6 +372,203 @@ class TestClassifier(DirectoriesMixin, TestCase):
 
         self.assertTrue(self.classifier.train())
 
+    def test_no_retrain_check_without_documents(self):
+        """
+        GIVEN:
+            - Classifier trained with current data
+        WHEN:
+            - Classifier training is requested again
+            - Nothing changed
+        THEN:
+            - No documents are fetched to find out
+        """
+        self.generate_test_data()
+        self.assertTrue(self.classifier.train())
+
+        with mock.patch.object(self.classifier, "_training_rows") as training_rows:
+            self.assertFalse(self.classifier.train())
+        training_rows.assert_not_called()
+
+    def test_retrain_if_labels_changed_in_bulk(self):
+        """
+        GIVEN:
+            - Classifier trained with current data
+        WHEN:
+            - Classifier training is requested again
+            - Labels were changed without saving the documents
+        THEN:
+            - Classifier does redo training
+        """
+        self.generate_test_data()
+        self.assertTrue(self.classifier.train())
+
+        Document.objects.filter(pk=self.doc2.pk).update(correspondent=self.c1)
+        self.assertTrue(self.classifier.train())
+
+        Document.tags.through.objects.filter(
+            document_id=self.doc1.pk,
+            tag_id=self.t1.pk,
+        ).delete()
+        self.assertTrue(self.classifier.train())
+        self.assertFalse(self.classifier.train())
+
+    def test_retrain_if_labels_swapped(self):
+        """
+        GIVEN:
+            - Classifier trained with current data
+        WHEN:
+            - Classifier training is requested again
+            - Labels were moved between documents without saving them, keeping
+              the sum of document id times label id the same
+        THEN:
+            - Classifier does redo training
+        """
+        self.generate_test_data()
+        tag_a = Tag.objects.create(
+            name="ta",
+            matching_algorithm=Tag.MATCH_AUTO,
+            pk=self.doc2.pk * 100,
+        )
+        tag_b = Tag.objects.create(
+            name="tb",
+            matching_algorithm=Tag.MATCH_AUTO,
+            pk=self.doc1.pk * 100,
+        )
+        self.doc1.tags.add(tag_a)
+        self.assertTrue(self.classifier.train())
+
+        Document.tags.through.objects.filter(
+            document_id=self.doc1.pk,
+            tag_id=tag_a.pk,
+        ).delete()
+        Document.tags.through.objects.create(
+            document_id=self.doc2.pk,
+            tag_id=tag_b.pk,
+        )
+        self.assertTrue(self.classifier.train())
+
+    def test_fingerprint_changed(self):
+        """
+        GIVEN:
+            - Classifier trained with current data
+        WHEN:
+            - Classifier training is requested again
+            - Only a label which is not used for training changed
+        THEN:
+            - Classifier does not redo training
+            - Classifier reports that only the fingerprint changed
+        """
+        self.generate_test_data()
+        self.assertTrue(self.classifier.train())
+        self.assertFalse(self.classifier.fingerprint_changed)
+
+        Document.objects.filter(pk=self.doc2.pk).update(correspondent=None)
+        # As bulk edits do
+        classifier_labels_changed()
+        self.assertFalse(self.classifier.train())
+        self.assertTrue(self.classifier.fingerprint_changed)
+
+        self.assertFalse(self.classifier.train())
+        self.assertFalse(self.classifier.fingerprint_changed)
+
+    def test_retrain_if_tags_moved(self):
+        """
+        GIVEN:
+            - Classifier trained with current data
+        WHEN:
+            - An AUTO tag is moved to other documents, keeping the number and
+              the sum of the ids of its documents
+        THEN:
+            - Classifier does redo training
+        """
+        tag = Tag.objects.create(name="t", matching_algorithm=Tag.MATCH_AUTO)
+        docs = [
+            Document.objects.create(
+                pk=pk,
+                title=f"doc{pk}",
+                content=f"this is document {pk}",
+                checksum=f"D{pk}",
+            )
+            for pk in (101, 102, 103, 104)
+        ]
+        docs[0].tags.add(tag)
+        docs[3].tags.add(tag)
+        self.assertTrue(self.classifier.train())
+        self.assertFalse(self.classifier.train())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            docs[0].tags.remove(tag)
+            docs[3].tags.remove(tag)
+            docs[1].tags.add(tag)
+            docs[2].tags.add(tag)
+
+        self.assertTrue(self.classifier.train())
+
+    def test_retrain_if_tags_moved_without_signals(self):
+        """
+        GIVEN:
+            - Classifier trained with current data
+        WHEN:
+            - An AUTO tag is moved to other documents in the database only,
+              keeping the number and the sum of the ids of its documents
+        THEN:
+            - Classifier does redo training
+        """
+        tag = Tag.objects.create(name="t", matching_algorithm=Tag.MATCH_AUTO)
+        docs = [
+            Document.objects.create(
+                pk=pk,
+                title=f"doc{pk}",
+                content=f"this is document {pk}",
+                checksum=f"D{pk}",
+            )
+            for pk in (101, 102, 103, 104)
+        ]
+        docs[0].tags.add(tag)
+        docs[3].tags.add(tag)
+        self.assertTrue(self.classifier.train())
+        self.assertFalse(self.classifier.train())
+
+        Document.tags.through.objects.filter(tag_id=tag.pk).delete()
+        Document.tags.through.objects.bulk_create(
+            [
+                Document.tags.through(document_id=docs[1].pk, tag_id=tag.pk),
+                Document.tags.through(document_id=docs[2].pk, tag_id=tag.pk),
+            ],
+        )
+
+        # The fingerprint changed, so the documents are checked
+        with mock.patch.object(
+            self.classifier,
+            "_training_rows",
+            wraps=self.classifier._training_rows,
+        ) as training_rows:
+            self.assertTrue(self.classifier.train())
+        training_rows.assert_called()
+
+    def test_fingerprint_without_cache(self):
+        """
+        GIVEN:
+            - Classifier trained with current data
+            - The cache is not available
+        WHEN:
+            - Classifier training is requested again
+        THEN:
+            - The documents are checked and the classifier does not redo
+              training
+            - The classifier is not changed
+        """
+        self.generate_test_data()
+        with mock.patch(
+            "documents.classifier.cache.get",
+            side_effect=ConnectionError("no cache"),
+        ):
+            self.assertTrue(self.classifier.train())
+            self.assertIsNone(self.classifier.training_fingerprint)
+
+            self.assertFalse(self.classifier.train())
+            self.assertFalse(self.classifier.fingerprint_changed)
+
     def test_retrain_if_auto_match_set_changed(self):
         """
         GIVEN:
@@ -299,6 +591,198 @@ class TestClassifier(DirectoriesMixin, TestCase):
 
         self.assertTrue(self.classifier.train())
 
+    @override_settings(CLASSIFIER_VOCABULARY_DRIFT=1.0)
+    def test_retrain_incrementally(self):
+        """
+        GIVEN:
+            - Classifier trained with current data
+        WHEN:
+            - Classifier training is requested again
+            - A document changed, but no new labels exist
+        THEN:
+            - Classifier is only trained with the changed document
+        """
+        self.generate_test_data()
+        self.assertTrue(self.classifier.train())
+        vectorizer = self.classifier.data_vectorizer
+
+        self.doc2.content = "this is a document from c2"
+        self.doc2.save()
+
+        with mock.patch.object(
+            self.classifier.correspondent_classifier,
+            "partial_fit",
+        ) as partial_fit:
+            self.assertTrue(self.classifier.train())
+
+        self.assertIs(self.classifier.data_vectorizer, vectorizer)
+        self.assertEqual(
+            partial_fit.call_count,
+            DocumentClassifier.INCREMENTAL_EPOCHS,
+        )
+        X, y = partial_fit.call_args.args
+        self.assertEqual(X.shape[0], 1)
+        self.assertListEqual(y, [-1])
+
+        # Documents which changed only in other ways need no training at all
+        self.doc1.title = "changed"
+        self.doc1.save()
+
+        with mock.patch.object(
+            self.classifier.correspondent_classifier,
+            "partial_fit",
+        ) as partial_fit:
+            self.assertTrue(self.classifier.train())
+        partial_fit.assert_not_called()
+        self.assertFalse(self.classifier.train())
+
+    @override_settings(CLASSIFIER_VOCABULARY_DRIFT=1.0)
+    def test_retrain_fully_if_new_labels(self):
+        """
+        GIVEN:
+            - Classifier trained with current data
+        WHEN:
+            - Classifier training is requested again
+            - A document has a label the classifier does not know
+        THEN:
+            - Classifier is trained from scratch
+        """
+        self.generate_test_data()
+        self.assertTrue(self.classifier.train())
+        vectorizer = self.classifier.data_vectorizer
+
+        self.doc2.correspondent = self.c3
+        self.doc2.save()
+
+        self.assertTrue(self.classifier.train())
+        self.assertIsNot(self.classifier.data_vectorizer, vectorizer)
+        self.assertListEqual(
+            list(self.classifier.correspondent_classifier.classes_),
+            [self.c1.pk, self.c3.pk],
+        )
+
+    @override_settings(CLASSIFIER_VOCABULARY_DRIFT=0.0)
+    def test_retrain_fully_if_vocabulary_drifted(self):
+        """
+        GIVEN:
+            - Classifier trained with current data
+        WHEN:
+            - Classifier training is requested again
+            - A document changed and contains many new words
+        THEN:
+            - Classifier is trained from scratch
+        """
+        self.generate_test_data()
+        self.assertTrue(self.classifier.train())
+        vectorizer = self.classifier.data_vectorizer
+
+        self.doc2.content = "completely different words"
+        self.doc2.save()
+
+        self.assertTrue(self.classifier.train())
+        self.assertIsNot(self.classifier.data_vectorizer, vectorizer)
+        self.assertIn("different", self.classifier.data_vectorizer.vocabulary_)
+
+    def test_train_constant_queries(self):
+        """
+        GIVEN:
+            - Classifier trained with current data
+        WHEN:
+            - More documents with labels are added
+            - A new classifier is trained
+        THEN:
+            - The number of database queries does not grow with the documents
+        """
+        self.generate_test_data()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(self.classifier.train())
+        num_queries = len(queries)
+
+        for i in range(20):
+            doc = Document.objects.create(
+                title=f"doc{i}",
+                content=f"this is document {i} from c1",
+                correspondent=self.c1,
+                document_type=self.dt,
+                storage_path=self.sp1,
+                checksum=f"D{i}",
+            )
+            doc.tags.add(self.t1, self.t3)
+
+        classifier2 = DocumentClassifier()
+        classifier2.preprocess_content = mock.MagicMock(side_effect=dummy_preprocess)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(classifier2.train())
+        self.assertEqual(len(queries), num_queries)
+        self.assertListEqual(
+            classifier2.predict_tags(self.doc1.content),
+            [self.t1.pk, self.t3.pk],
+        )
+
+    def test_preprocessed_texts_cached(self):
+        """
+        GIVEN:
+            - Classifier trained with current data
+        WHEN:
+            - A new classifier is trained with the same data
+            - A document changed
+            - A document is deleted
+        THEN:
+            - Only content which was not preprocessed before is preprocessed
+            - Texts of deleted documents are removed by the next training
+        """
+        self.generate_test_data()
+        self.assertTrue(self.classifier.train())
+        self.assertEqual(self.classifier.preprocess_content.call_count, 2)
+
+        classifier2 = DocumentClassifier()
+        classifier2.preprocess_content = mock.MagicMock(side_effect=dummy_preprocess)
+        self.assertTrue(classifier2.train())
+        classifier2.preprocess_content.assert_not_called()
+
+        self.doc2.content = "this is a document from c2"
+        self.doc2.save()
+
+        classifier3 = DocumentClassifier()
+        classifier3.preprocess_content = mock.MagicMock(side_effect=dummy_preprocess)
+        self.assertTrue(classifier3.train())
+        classifier3.preprocess_content.assert_called_once_with(
+            "this is a document from c2",
+        )
+
+        cache = get_preprocessed_text_cache()
+        checksum = cache.checksum(self.doc2.content)
+        self.assertIn(checksum, cache.get_many([checksum]))
+
+        self.doc2.delete()
+        self.assertIn(checksum, cache.get_many([checksum]))
+        self.assertTrue(classifier3.train())
+        self.assertDictEqual(cache.get_many([checksum]), {})
+
+    def test_preprocessed_text_cache_connection_reused(self):
+        """
+        GIVEN:
+            - Classifier trained with current data
+        WHEN:
+            - Classifiers are trained and used for predictions again
+        THEN:
+            - The database of preprocessed texts is opened only once
+        """
+        self.generate_test_data()
+        with mock.patch(
+            "documents.classifier.sqlite3.connect",
+            wraps=sqlite3.connect,
+        ) as connect:
+            self.assertTrue(self.classifier.train())
+            self.classifier.predict_all(["some content", "other content"])
+
+            classifier2 = DocumentClassifier()
+            classifier2.preprocess_content = mock.MagicMock(
+                side_effect=dummy_preprocess,
+            )
+            self.assertTrue(classifier2.train())
+        connect.assert_called_once()
+
     def testVersionIncreased(self):
         """
         GIVEN:
@@ -343,11 +827,11 @@ class TestClassifier(DirectoriesMixin, TestCase):
 
         self.assertCountEqual(new_classifier.predict_tags(self.doc2.content), [45, 12])
 
-    @mock.patch("documents.classifier.pickle.load")
-    def test_load_corrupt_file(self, patched_pickle_load: mock.MagicMock):
+    @mock.patch("documents.classifier._restore_vectorizer")
+    def test_load_corrupt_file(self, patched_restore: mock.MagicMock):
         """
         GIVEN:
-            - Corrupted classifier pickle file
+            - Corrupted classifier model file
         WHEN:
             - An attempt is made to load the classifier
         THEN:
@@ -355,36 +839,185 @@ class TestClassifier(DirectoriesMixin, TestCase):
         """
         self.generate_train_and_save()
 
-        # First load is the schema version,allow it
-        patched_pickle_load.side_effect = [DocumentClassifier.FORMAT_VERSION, OSError()]
+        # The header was read, the rest fails
+        patched_restore.side_effect = OSError()
 
         with self.assertRaises(ClassifierModelCorruptError):
             self.classifier.load()
-            patched_pickle_load.assert_called()
+            patched_restore.assert_called()
 
-        patched_pickle_load.reset_mock()
-        patched_pickle_load.side_effect = [
-            DocumentClassifier.FORMAT_VERSION,
-            ClassifierModelCorruptError(),
-        ]
+        patched_restore.reset_mock()
+        patched_restore.side_effect = ClassifierModelCorruptError()
 
         self.assertIsNone(load_classifier())
-        patched_pickle_load.assert_called()
+        patched_restore.assert_called()
+
+    def test_load_truncated_file(self):
+        """
+        GIVEN:
+            - Classifier model file which lost its arrays
+        WHEN:
+            - An attempt is made to load the classifier
+        THEN:
+            - The ClassifierModelCorruptError is raised
+            - The model file is deleted
+        """
+        self.generate_train_and_save()
+
+        # Keep the header, but lose the arrays
+        size = os.path.getsize(settings.MODEL_FILE)
+        with open(settings.MODEL_FILE, "r+b") as f:
+            f.truncate(size // 2)
+
+        with self.assertRaises(ClassifierModelCorruptError):
+            self.classifier.load()
+
+        self.assertIsNone(load_classifier())
+        self.assertFalse(os.path.exists(settings.MODEL_FILE))
+
+    def test_load_unknown_format(self):
+        """
+        GIVEN:
+            - Classifier model file in an older format
+        WHEN:
+            - An attempt is made to load the classifier
+        THEN:
+            - The IncompatibleClassifierVersionError is raised
+        """
+        with open(settings.MODEL_FILE, "wb") as f:
+            pickle.dump(9, f)
+
+        with self.assertRaises(IncompatibleClassifierVersionError):
+            self.classifier.load()
 
     def test_load_new_scikit_learn_version(self):
         """
         GIVEN:
-            - classifier pickle file created with a different scikit-learn version
+            - classifier model file created with a different scikit-learn
+              version, whose classifiers do not fit the installed one
+        WHEN:
+            - An attempt is made to load the classifier
+        THEN:
+            - The IncompatibleClassifierVersionError is raised
+            - The model file is deleted, so the classifier is trained again
+        """
+        self.generate_train_and_save()
+
+        # As if the output layer of the installed version was different
+        self.classifier.correspondent_classifier.out_activation_ = "softmax2"
+        self.classifier.save()
+
+        with self.assertRaises(IncompatibleClassifierVersionError):
+            DocumentClassifier().load()
+
+        self.assertIsNone(load_classifier())
+        self.assertFalse(os.path.exists(settings.MODEL_FILE))
+
+    def test_load_other_scikit_learn_version(self):
+        """
+        GIVEN:
+            - classifier model file created with a different scikit-learn
+              version, whose classifiers might have other private state
+        WHEN:
+            - An attempt is made to load the classifier
+        THEN:
+            - The IncompatibleClassifierVersionError is raised
+            - The model file is deleted, so the classifier is trained again
+        """
+        self.generate_train_and_save()
+
+        with mock.patch("sklearn.__version__", "0.0.1"):
+            with self.assertRaises(IncompatibleClassifierVersionError):
+                DocumentClassifier().load()
+
+            self.assertIsNone(load_classifier())
+        self.assertFalse(os.path.exists(settings.MODEL_FILE))
+
+    def test_load_private_state_changed(self):
+        """
+        GIVEN:
+            - classifier model file
+            - The installed scikit-learn keeps other private state in its
+              classifiers than the one which was restored
         WHEN:
             - An attempt is made to load the classifier
         THEN:
-            - The classifier reports the warning was captured and processed
+            - The IncompatibleClassifierVersionError is raised
         """
-        # TODO: This wasn't testing the warning anymore, as the schema changed
-        # but as it was implemented, it would require installing an old version
-        # rebuilding the file and committing that.  Not developer friendly
-        # Need to rethink how to pass the load through to a file with a single
-        # old model?
+        self.generate_train_and_save()
+
+        def forward_pass_fast(classifier, X, *args, **kwargs):
+            # As if the installed version read an attribute never restored
+            return classifier._renamed_label_binarizer
+
+        with mock.patch(
+            "sklearn.neural_network.MLPClassifier._forward_pass_fast",
+            forward_pass_fast,
+        ):
+            with self.assertRaises(IncompatibleClassifierVersionError):
+                DocumentClassifier().load()
+
+    def test_load_unknown_parameters(self):
+        """
+        GIVEN:
+            - classifier model file created with a different scikit-learn
+              version, which had other parameters
+        WHEN:
+            - An attempt is made to load the classifier
+        THEN:
+            - The classifier is loaded and predicts the same as before
+        """
+        self.generate_train_and_save()
+
+        with mock.patch(
+            "documents.classifier._json_params",
+            side_effect=lambda estimator: {
+                **_json_params(estimator),
+                "removed_parameter": 1,
+            },
+        ):
+            self.classifier.save()
+
+        classifier2 = DocumentClassifier()
+        classifier2.load()
+        classifier2.preprocess_content = mock.MagicMock(side_effect=dummy_preprocess)
+        self.assertEqual(
+            classifier2.predict_all([self.doc1.content, self.doc2.content]),
+            self.classifier.predict_all([self.doc1.content, self.doc2.content]),
+        )
+
+    def test_load_memory_mapped(self):
+        """
+        GIVEN:
+            - Saved classifier model
+        WHEN:
+            - The classifier is loaded
+            - The loaded classifier is trained incrementally
+        THEN:
+            - The weights are mapped from the model file
+            - Training does not change the model file
+        """
+        self.generate_train_and_save()
+        with open(settings.MODEL_FILE, "rb") as f:
+            saved = f.read()
+
+        classifier2 = DocumentClassifier()
+        classifier2.load()
+        classifier2.preprocess_content = mock.MagicMock(side_effect=dummy_preprocess)
+        coefs = classifier2.correspondent_classifier.coefs_[0]
+        self.assertIsInstance(coefs, np.memmap)
+        # Loading does not fit the classifiers to anything
+        self.assertEqual(classifier2.correspondent_classifier.n_iter_, 0)
+        saved_coefs = np.array(coefs)
+
+        self.doc2.content = "this is a document from c2"
+        self.doc2.save()
+        with override_settings(CLASSIFIER_VOCABULARY_DRIFT=1.0):
+            self.assertTrue(classifier2.train())
+        self.assertFalse(np.array_equal(coefs, saved_coefs))
+
+        with open(settings.MODEL_FILE, "rb") as f:
+            self.assertEqual(f.read(), saved)
 
     def test_one_correspondent_predict(self):
         c1 = Correspondent.objects.create(
@@ -625,25 +1258,50 @@ class TestClassifier(DirectoriesMixin, TestCase):
         self.assertIsNotNone(load_classifier())
         load.assert_called_once()
 
-    @override_settings(
-        CACHES={
-            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
-        },
-    )
-    @override_settings(
-        MODEL_FILE=os.path.join(os.path.dirname(__file__), "data", "model.pickle"),
-    )
-    @pytest.mark.skip(
-        reason="Disabled caching due to high memory usage - need to investigate.",
-    )
     def test_load_classifier_cached(self):
+        """
+        GIVEN:
+            - A saved classifier model
+        WHEN:
+            - The classifier is loaded several times
+            - The model file is replaced by a newly trained one
+        THEN:
+            - The model file is only loaded when it was not loaded yet or
+              has been changed
+            - The use of the cache is logged on reload
+        """
+        self.generate_train_and_save()
+        stats = get_classifier_cache_stats()
+
         classifier = load_classifier()
         self.assertIsNotNone(classifier)
 
         with mock.patch("documents.classifier.DocumentClassifier.load") as load:
-            load_classifier()
+            self.assertIs(load_classifier(), classifier)
             load.assert_not_called()
 
+        self.classifier.save()
+        with self.assertLogs("paperless.classifier", level="INFO") as logs:
+            new_classifier = load_classifier()
+        self.assertIsNotNone(new_classifier)
+        self.assertIsNot(new_classifier, classifier)
+        self.assertIn(
+            f"Loaded from cache {stats['hits'] + 1} times",
+            logs.output[0],
+        )
+
+        self.assertIsNot(load_classifier(use_cache=False), new_classifier)
+
+        new_stats = get_classifier_cache_stats()
+        self.assertEqual(new_stats["hits"], stats["hits"] + 1)
+        self.assertEqual(
+            new_stats["misses"] + new_stats["reloads"],
+            stats["misses"] + stats["reloads"] + 2,
+        )
+
+        Path(settings.MODEL_FILE).unlink()
+        self.assertIsNone(load_classifier())
+
     @mock.patch("documents.classifier.DocumentClassifier.load")
     def test_load_classifier_incompatible_version(self, load):
         Path(settings.MODEL_FILE).touch()
@@ -33,6 +33,8 @@ from documents.parsers import ParseError
 from documents.tasks import sanity_check
 from documents.tests.utils import DirectoriesMixin
 from documents.tests.utils import FileSystemAssertsMixin
+from documents.utils import StagedFile
+from documents.utils import stage_file
 
 
 class TestAttributes(TestCase):
@@ -237,7 +239,15 @@ def fake_magic_from_file(file, mime=False):
         return "A verbose string that describes the contents of the file"
 
 
-@mock.patch("documents.consumer.magic.from_file", fake_magic_from_file)
+def fake_stage_file(source, dest):
+    staged_file = stage_file(source, dest)
+    return StagedFile(
+        checksum=staged_file.checksum,
+        mime_type=fake_magic_from_file(str(dest), mime=True),
+    )
+
+
+@mock.patch("documents.consumer.stage_file", fake_stage_file)
 class TestConsumer(DirectoriesMixin, FileSystemAssertsMixin, TestCase):
     def _assert_first_last_send_progress(
         self,
@@ -786,7 +796,7 @@ class TestConsumer(DirectoriesMixin, FileSystemAssertsMixin, TestCase):
         sanity_check()
 
 
-@mock.patch("documents.consumer.magic.from_file", fake_magic_from_file)
+@mock.patch("documents.consumer.stage_file", fake_stage_file)
 class TestConsumerCreatedDate(DirectoriesMixin, TestCase):
     def setUp(self):
         super().setUp()
@@ -1136,3 +1146,30 @@ class PostConsumeTestCase(TestCase):
                 c.path = "path-to-file"
                 with self.assertRaises(ConsumerError):
                     c.run_post_consume_script(doc)
+
+
+class TestConsumerOcrSummary(TestCase):
+    def test_ocr_summary(self):
+        """
+        GIVEN:
+            - A document which was OCRed, with pages OCRed again
+        WHEN:
+            - The OCR summary is requested
+        THEN:
+            - The summary contains the total time, slowest pages and pages OCRed again
+        """
+        c = Consumer()
+        self.assertIsNone(c.get_ocr_summary())
+
+        c.ocr_page_timings = {1: 1.0, 2: 4.0, 3: 2.5, 4: 0.5}
+        self.assertEqual(
+            c.get_ocr_summary(),
+            "OCR of 4 pages took 8.0s, slowest pages: 2 (4.0s), 3 (2.5s), 1 (1.0s)",
+        )
+
+        c.ocr_fallback_pages = [2, 3]
+        self.assertEqual(
+            c.get_ocr_summary(),
+            "OCR of 4 pages took 8.0s, slowest pages: 2 (4.0s), 3 (2.5s), 1 (1.0s), "
+            "OCRed again: 2, 3",
+        )
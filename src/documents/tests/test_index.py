@@ -1,9 +1,26 @@
+import threading
+import time
 from unittest import mock
 
+from django.contrib.auth.models import Group
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
 from django.test import TestCase
+from django.test import override_settings
+from guardian.shortcuts import assign_perm
+from whoosh import classify
+from whoosh import query
+from whoosh.searching import Searcher
 
 from documents import index
+from documents import tasks
+from documents.models import Correspondent
+from documents.models import CustomField
+from documents.models import CustomFieldInstance
 from documents.models import Document
+from documents.models import Note
+from documents.models import Tag
 from documents.tests.utils import DirectoriesMixin
 
 
@@ -34,6 +51,183 @@ class TestAutoComplete(DirectoriesMixin, TestCase):
         self.assertListEqual(index.autocomplete(ix, "tes", limit=1), [b"test2"])
         self.assertListEqual(index.autocomplete(ix, "tes", limit=0), [])
 
+    def test_auto_complete_permissions(self):
+        """
+        GIVEN:
+            - Documents without owner, owned by users and shared with a user
+        WHEN:
+            - Terms are autocompleted for different users
+        THEN:
+            - Only documents visible to the user are counted
+        """
+        u1 = User.objects.create_user("user1")
+        u2 = User.objects.create_user("user2")
+        superuser = User.objects.create_superuser("admin")
+        doc1 = Document.objects.create(
+            title="doc1",
+            checksum="A",
+            content="apple apricot",
+        )
+        doc2 = Document.objects.create(
+            title="doc2",
+            checksum="B",
+            content="apricot application",
+            owner=u1,
+        )
+        doc3 = Document.objects.create(
+            title="doc3",
+            checksum="C",
+            content="application appendix",
+            owner=u2,
+        )
+        doc4 = Document.objects.create(
+            title="doc4",
+            checksum="D",
+            content="application",
+            owner=u2,
+        )
+        assign_perm("view_document", u1, doc4)
+
+        index.add_or_update_document(doc1)
+        index.add_or_update_document(doc2)
+        index.add_or_update_document(doc3)
+        index.add_or_update_document(doc4)
+
+        ix = index.open_index()
+
+        self.assertListEqual(
+            index.autocomplete(ix, "ap", user=u1),
+            [b"apricot", b"application", b"apple"],
+        )
+        self.assertListEqual(
+            index.autocomplete(ix, "ap", user=u2),
+            [b"application", b"apple", b"apricot", b"appendix"],
+        )
+        self.assertListEqual(index.autocomplete(ix, "ap"), [b"apple", b"apricot"])
+        self.assertListEqual(
+            index.autocomplete(ix, "ap", user=superuser),
+            [b"application", b"apricot", b"apple", b"appendix"],
+        )
+        self.assertListEqual(index.autocomplete(ix, "appx", user=superuser), [])
+
+    def test_auto_complete_reads_new_segments_only(self):
+        """
+        GIVEN:
+            - Index with a segment which was autocompleted before
+        WHEN:
+            - Another segment is added to the index
+        THEN:
+            - Only the new segment is read
+            - Terms are counted over all segments
+        """
+        doc1 = Document.objects.create(title="doc1", checksum="A", content="test")
+        doc2 = Document.objects.create(title="doc2", checksum="B", content="test2")
+        doc3 = Document.objects.create(title="doc3", checksum="C", content="test2")
+        doc4 = Document.objects.create(title="doc4", checksum="D", content="test")
+
+        ix = index.open_index()
+        for docs in [(doc1, doc2), (doc3,), (doc4,)]:
+            writer = ix.writer()
+            for doc in docs:
+                index.update_document(writer, doc)
+            writer.commit(merge=False)
+
+            with mock.patch(
+                "documents.index.AutocompleteTerms",
+                wraps=index.AutocompleteTerms,
+            ) as terms:
+                results = index.autocomplete(ix, "te")
+            terms.assert_called_once()
+
+        self.assertListEqual(results, [b"test", b"test2"])
+        self.assertEqual(len(ix.reader().leaf_readers()), 3)
+
+    def test_auto_complete_deleted_documents(self):
+        """
+        GIVEN:
+            - Index with a segment which was autocompleted before
+        WHEN:
+            - A document of the segment is changed, which deletes it there
+        THEN:
+            - Only the segment with the changed document is read
+            - Terms of the old version of the document are not counted
+        """
+        documents = [
+            Document.objects.create(
+                title=f"doc{i}",
+                checksum=str(i),
+                content="apricot" if i == 0 else "apple",
+            )
+            for i in range(20)
+        ]
+
+        ix = index.open_index()
+        with ix.writer() as writer, index.open_index_searcher() as searcher:
+            for doc in documents:
+                index.update_document(writer, doc, reader=searcher.reader())
+        self.assertListEqual(index.autocomplete(ix, "ap"), [b"apple", b"apricot"])
+
+        documents[0].content = "apple"
+        documents[0].save()
+        writer = ix.writer()
+        index.update_document(writer, documents[0])
+        writer.commit(merge=False)
+
+        with mock.patch(
+            "documents.index.AutocompleteTerms",
+            wraps=index.AutocompleteTerms,
+        ) as terms:
+            self.assertListEqual(index.autocomplete(ix, "ap"), [b"apple"])
+            self.assertListEqual(index.autocomplete(ix, "apr"), [])
+        terms.assert_called_once()
+
+    def test_auto_complete_reads_terms_of_prefix(self):
+        """
+        GIVEN:
+            - Index with terms starting with different characters
+        WHEN:
+            - A prefix is autocompleted
+        THEN:
+            - Only the terms starting with the first character of the prefix
+              are read
+        """
+        doc = Document.objects.create(
+            title="doc",
+            checksum="A",
+            content="apple banana cherry",
+        )
+        index.add_or_update_document(doc)
+        ix = index.open_index()
+
+        with mock.patch(
+            "documents.index.IndexReader.expand_prefix",
+            autospec=True,
+            side_effect=lambda reader, field, prefix: iter([b"apple"]),
+        ) as expand_prefix:
+            self.assertListEqual(index.autocomplete(ix, "ap"), [b"apple"])
+            self.assertListEqual(index.autocomplete(ix, "a"), [b"apple"])
+        expand_prefix.assert_called_once()
+        self.assertEqual(expand_prefix.call_args.args[1:], ("content", b"a"))
+
+        self.assertListEqual(index.autocomplete(ix, "ba"), [b"banana"])
+
+    def test_auto_complete_long_invalid_term(self):
+        """
+        GIVEN:
+            - Index with documents
+        WHEN:
+            - A long term which is not a single word is autocompleted
+        THEN:
+            - The term is rejected quickly
+        """
+        doc = Document.objects.create(title="doc", checksum="A", content="apple")
+        index.add_or_update_document(doc)
+        ix = index.open_index()
+
+        start = time.monotonic()
+        self.assertListEqual(index.autocomplete(ix, "a" * 5000 + "!"), [])
+        self.assertLess(time.monotonic() - start, 2)
+
     def test_archive_serial_number_ranging(self):
         """
         GIVEN:
@@ -90,3 +284,819 @@ class TestAutoComplete(DirectoriesMixin, TestCase):
             _, kwargs = mocked_update_doc.call_args
 
             self.assertIsNone(kwargs["asn"])
+
+
+class TestBulkIndex(DirectoriesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user1 = User.objects.create(username="user1")
+        self.user2 = User.objects.create(username="user2")
+        self.group = Group.objects.create(name="group")
+        self.user2.groups.add(self.group)
+
+        tag1 = Tag.objects.create(name="tag1")
+        tag2 = Tag.objects.create(name="tag2")
+        field = CustomField.objects.create(
+            name="field",
+            data_type=CustomField.FieldDataType.STRING,
+        )
+
+        self.docs = []
+        for i in range(5):
+            doc = Document.objects.create(
+                title=f"doc{i}",
+                checksum=f"{i}",
+                content=f"document number {i}",
+                correspondent=Correspondent.objects.create(name=f"c{i}"),
+                owner=self.user1,
+            )
+            doc.tags.add(tag1, tag2)
+            Note.objects.create(document=doc, note=f"note {i}", user=self.user1)
+            CustomFieldInstance.objects.create(
+                document=doc,
+                field=field,
+                value_text=f"value {i}",
+            )
+            self.docs.append(doc)
+
+        assign_perm("view_document", self.user1, self.docs[0])
+        assign_perm("view_document", self.group, self.docs[0])
+        assign_perm("view_document", self.group, self.docs[1])
+        assign_perm("change_document", self.user2, self.docs[2])
+
+    def test_iter_document_fields(self):
+        """
+        GIVEN:
+            - Documents with tags, notes, custom fields and permissions
+        WHEN:
+            - The index fields of all documents are generated in bulk
+        THEN:
+            - The fields are the same as for single documents
+            - The number of queries does not depend on the number of documents
+        """
+        with self.assertNumQueries(7):
+            fields = list(
+                index.iter_document_fields(Document.objects.all(), chunk_size=10),
+            )
+
+        self.assertEqual(len(fields), len(self.docs))
+        for doc_fields, doc in zip(fields, self.docs):
+            expected = index.get_document_fields(doc)
+            expected["viewer_id"] = (
+                ",".join(sorted(expected["viewer_id"].split(",")))
+                if expected["viewer_id"]
+                else None
+            )
+            self.assertDictEqual(doc_fields, expected)
+
+        self.assertEqual(fields[0]["viewer_id"], f"{self.user1.pk},{self.user2.pk}")
+        self.assertEqual(fields[1]["viewer_id"], f"{self.user2.pk}")
+        self.assertIsNone(fields[2]["viewer_id"])
+
+    @override_settings(INDEX_REINDEX_PROCS=2)
+    def test_bulk_index_documents_multiprocess(self):
+        """
+        GIVEN:
+            - Several documents
+        WHEN:
+            - The index is rebuilt with several processes
+        THEN:
+            - All documents are indexed and can be found
+            - The segments of the processes are merged into one
+        """
+        # Enough documents for the processes to each write a batch
+        Document.objects.bulk_create(
+            Document(title="doc", checksum=f"bulk{i}", content="bulk number")
+            for i in range(250)
+        )
+        count = Document.objects.count()
+
+        ix = index.open_index(recreate=True)
+        self.assertEqual(
+            index.bulk_index_documents(ix, Document.objects.all()),
+            count,
+        )
+        self.assertEqual(len(index.get_segments(index.open_index())), 1)
+
+        with index.open_index_searcher() as searcher:
+            self.assertEqual(searcher.doc_count(), count)
+            results = searcher.search(query.Term("content", "number"), limit=None)
+            self.assertEqual(len(results), count)
+
+    def test_sync_index(self):
+        """
+        GIVEN:
+            - An index of documents, some of which changed, were deleted or
+              were added since
+        WHEN:
+            - The index is synced
+        THEN:
+            - Only the changed and added documents are indexed again
+            - The deleted documents are removed from the index
+        """
+        ix = index.open_index(recreate=True)
+        index.bulk_index_documents(ix, Document.objects.all())
+
+        self.docs[1].content = "changed content"
+        self.docs[1].save()
+        self.docs[3].delete()
+        added = Document.objects.create(title="new", checksum="new", content="new")
+        # Changed without a new modification time
+        Document.objects.filter(pk=self.docs[4].pk).update(content="ignored")
+
+        with index.open_index_searcher() as searcher:
+            with mock.patch(
+                "documents.index.iter_document_fields",
+                wraps=index.iter_document_fields,
+            ) as iter_document_fields:
+                self.assertEqual(
+                    index.sync_index(ix, searcher.reader()),
+                    (2, 1),
+                )
+            self.assertCountEqual(
+                iter_document_fields.call_args.args[0].values_list("pk", flat=True),
+                [self.docs[1].pk, added.pk],
+            )
+
+        with index.open_index_searcher() as searcher:
+            self.assertCountEqual(
+                [
+                    doc_id
+                    for doc_id, _ in index.iter_indexed_versions(searcher.reader())
+                ],
+                [doc.pk for doc in Document.objects.all()],
+            )
+            self.assertEqual(
+                len(searcher.search(query.Term("content", "changed"))),
+                1,
+            )
+            self.assertEqual(len(searcher.search(query.Term("content", "ignored"))), 0)
+
+            # Nothing changed since
+            self.assertEqual(index.sync_index(ix, searcher.reader()), (0, 0))
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    },
+)
+class TestIndexUpdateQueue(DirectoriesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        delay_override = override_settings(INDEX_UPDATE_DELAY=60)
+        delay_override.enable()
+        self.addCleanup(delay_override.disable)
+        patcher = mock.patch("documents.tasks.update_index.apply_async")
+        self.apply_async = patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.clear()
+
+    def get_indexed_ids(self) -> list[int]:
+        with index.open_index_searcher() as searcher:
+            return sorted(fields["id"] for fields in searcher.all_stored_fields())
+
+    def test_updates_queued(self):
+        """
+        GIVEN:
+            - Index updates are delayed
+        WHEN:
+            - Documents are added, updated and removed
+        THEN:
+            - Nothing is written to the index until the queue is flushed
+            - All changes are written in one transaction
+        """
+        doc1 = Document.objects.create(title="doc1", checksum="A", content="first")
+        doc2 = Document.objects.create(title="doc2", checksum="B", content="second")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            index.add_or_update_document(doc1)
+            index.add_or_update_document(doc2)
+            index.add_or_update_document(doc1)
+
+        self.assertEqual(index.get_index_queue_depth(), 2)
+        self.assertListEqual(self.get_indexed_ids(), [])
+
+        with mock.patch(
+            "documents.index.open_index",
+            wraps=index.open_index,
+        ) as open_index:
+            self.assertEqual(index.flush_index_queue(), 2)
+        open_index.assert_called_once()
+        self.assertEqual(index.get_index_queue_depth(), 0)
+        self.assertListEqual(self.get_indexed_ids(), [doc1.pk, doc2.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            index.remove_document_from_index(doc2)
+        index.flush_index_queue()
+        self.assertListEqual(self.get_indexed_ids(), [doc1.pk])
+
+    def test_deleted_documents_removed(self):
+        """
+        GIVEN:
+            - Index updates are delayed
+        WHEN:
+            - A document is updated and deleted before the queue is flushed
+        THEN:
+            - The document is removed from the index
+        """
+        doc = Document.objects.create(title="doc", checksum="A", content="first")
+        with override_settings(INDEX_UPDATE_DELAY=0):
+            index.add_or_update_document(doc)
+        self.assertListEqual(self.get_indexed_ids(), [doc.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            index.add_or_update_document(doc)
+        doc.delete()
+        index.flush_index_queue()
+
+        self.assertListEqual(self.get_indexed_ids(), [])
+
+    def test_failed_write_kept(self):
+        """
+        GIVEN:
+            - Index updates are delayed
+        WHEN:
+            - Writing the queued documents to the index fails
+        THEN:
+            - The documents stay queued
+            - The next flush writes them
+        """
+        doc = Document.objects.create(title="doc", checksum="A", content="first")
+        with self.captureOnCommitCallbacks(execute=True):
+            index.add_or_update_document(doc)
+
+        with mock.patch(
+            "documents.index.iter_document_fields",
+            side_effect=OSError("disk full"),
+        ):
+            with self.assertRaises(OSError):
+                index.flush_index_queue()
+        self.assertEqual(index.get_index_queue_depth(), 1)
+        self.assertListEqual(self.get_indexed_ids(), [])
+
+        self.assertEqual(index.flush_index_queue(), 1)
+        self.assertEqual(index.get_index_queue_depth(), 0)
+        self.assertListEqual(self.get_indexed_ids(), [doc.pk])
+
+    def test_update_task_scheduled(self):
+        """
+        GIVEN:
+            - Index updates are delayed
+        WHEN:
+            - Documents are queued
+        THEN:
+            - The task writing the queue is scheduled once after the delay
+            - The task is scheduled right away once enough documents are queued
+        """
+        doc1 = Document.objects.create(title="doc1", checksum="A", content="first")
+        doc2 = Document.objects.create(title="doc2", checksum="B", content="second")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            index.add_or_update_document(doc1)
+        with self.captureOnCommitCallbacks(execute=True):
+            index.add_or_update_document(doc2)
+        self.apply_async.assert_called_once()
+        self.assertAlmostEqual(
+            self.apply_async.call_args.kwargs["countdown"],
+            60,
+            delta=1,
+        )
+
+        self.apply_async.reset_mock()
+        with override_settings(INDEX_UPDATE_BATCH_SIZE=2):
+            with self.captureOnCommitCallbacks(execute=True):
+                index.remove_document_from_index(doc1)
+        self.apply_async.assert_called_once_with(countdown=0)
+
+    def test_queue_depth_not_counted(self):
+        """
+        GIVEN:
+            - Index updates are delayed
+        WHEN:
+            - A document is queued
+        THEN:
+            - The queue is not counted to schedule the task
+        """
+        doc = Document.objects.create(title="doc", checksum="A", content="first")
+        with self.assertNumQueries(1):
+            with self.captureOnCommitCallbacks(execute=True):
+                index.add_or_update_document(doc)
+        self.apply_async.assert_called_once()
+
+    def test_schedule_failed(self):
+        """
+        GIVEN:
+            - Index updates are delayed
+        WHEN:
+            - The task writing the queue cannot be scheduled
+        THEN:
+            - The change is committed without an error
+            - The document stays queued
+            - The next change schedules the task again
+        """
+        doc = Document.objects.create(title="doc", checksum="A", content="first")
+        self.apply_async.side_effect = OSError("broker unreachable")
+        with self.assertLogs("paperless.index", level="WARNING"):
+            with self.captureOnCommitCallbacks(execute=True):
+                index.add_or_update_document(doc)
+        self.assertEqual(index.get_index_queue_depth(), 1)
+
+        self.apply_async.side_effect = None
+        self.apply_async.reset_mock()
+        with self.captureOnCommitCallbacks(execute=True):
+            index.add_or_update_document(doc)
+        self.apply_async.assert_called_once()
+
+    def test_rolled_back_not_queued(self):
+        """
+        GIVEN:
+            - Index updates are delayed
+        WHEN:
+            - The transaction changing a document is rolled back
+        THEN:
+            - The document is not queued
+            - No task is scheduled
+        """
+        doc = Document.objects.create(title="doc", checksum="A", content="first")
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    index.add_or_update_document(doc)
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(index.get_index_queue_depth(), 0)
+        self.apply_async.assert_not_called()
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    },
+)
+class TestIndexUpdateBatching(DirectoriesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        delay_override = override_settings(INDEX_UPDATE_DELAY=0.5)
+        delay_override.enable()
+        self.addCleanup(delay_override.disable)
+        cache.clear()
+        patcher = mock.patch("documents.tasks.update_index.apply_async")
+        self.apply_async = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def change_in_processes(self, documents: list[Document]):
+        with self.captureOnCommitCallbacks() as callbacks:
+            for doc in documents:
+                index.add_or_update_document(doc)
+        # Each thread stands in for a process committing one change, they
+        # only share the cache
+        threads = [threading.Thread(target=callback) for callback in callbacks]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_changes_coalesced(self):
+        """
+        GIVEN:
+            - Index updates are delayed by the default delay
+        WHEN:
+            - Several processes change documents within the delay
+            - The scheduled task runs
+        THEN:
+            - The task writing the queue is scheduled once
+            - The task writes all changes to the index at once
+            - The next change schedules the task again
+        """
+        docs = [
+            Document.objects.create(title=f"doc{i}", checksum=f"{i}", content="text")
+            for i in range(3)
+        ]
+
+        self.change_in_processes(docs)
+        self.apply_async.assert_called_once_with(countdown=0.5)
+        self.assertEqual(index.get_index_queue_depth(), 3)
+
+        time.sleep(0.5)
+        with mock.patch(
+            "documents.index._write_queued",
+            wraps=index._write_queued,
+        ) as write_queued:
+            tasks.update_index()
+        write_queued.assert_called_once()
+        self.assertEqual(index.get_index_queue_depth(), 0)
+        with index.open_index_searcher() as searcher:
+            self.assertEqual(searcher.doc_count(), 3)
+
+        self.apply_async.reset_mock()
+        self.change_in_processes(docs[:1])
+        self.apply_async.assert_called_once_with(countdown=0.5)
+
+    def test_batch_flushed(self):
+        """
+        GIVEN:
+            - Index updates are delayed by the default delay
+            - The task writing the queue is scheduled already
+        WHEN:
+            - Processes together change as many documents as a batch holds
+              since the task was scheduled
+        THEN:
+            - The task is scheduled right away
+        """
+        docs = [
+            Document.objects.create(title=f"doc{i}", checksum=f"{i}", content="text")
+            for i in range(4)
+        ]
+
+        with override_settings(INDEX_UPDATE_BATCH_SIZE=3):
+            self.change_in_processes(docs[:1])
+            self.change_in_processes(docs[1:3])
+            self.apply_async.assert_called_once_with(countdown=0.5)
+
+            self.apply_async.reset_mock()
+            self.change_in_processes(docs[3:])
+        self.apply_async.assert_called_once_with(countdown=0)
+
+    def test_schedule_expired(self):
+        """
+        GIVEN:
+            - Index updates are delayed by the default delay
+            - The scheduled task never ran
+        WHEN:
+            - A document is changed after the delay
+        THEN:
+            - The task is scheduled again
+        """
+        doc = Document.objects.create(title="doc", checksum="A", content="text")
+
+        self.change_in_processes([doc])
+        self.change_in_processes([doc])
+        self.apply_async.assert_called_once()
+
+        # The cache keeps the schedule for whole seconds
+        time.sleep(1.1)
+        self.change_in_processes([doc])
+        self.assertEqual(self.apply_async.call_count, 2)
+
+
+class TestMergeSegments(DirectoriesMixin, TestCase):
+    def add_segment(self, ix, count: int):
+        writer = ix.writer()
+        for _ in range(count):
+            doc = Document.objects.create(
+                title="doc",
+                checksum=f"{Document.objects.count()}",
+                content="content",
+            )
+            index.update_document(writer, doc)
+        writer.commit(merge=False)
+
+    def test_merge_small_segments(self):
+        """
+        GIVEN:
+            - An index with a larger segment and many segments of one document
+        WHEN:
+            - The segments are merged
+        THEN:
+            - Only the small segments are merged
+            - Nothing is merged when the index is merged well enough
+        """
+        ix = index.open_index()
+        self.add_segment(ix, 20)
+        for _ in range(12):
+            self.add_segment(ix, 1)
+        self.assertEqual(index.get_index_stats(ix)["segment_count"], 13)
+
+        self.assertEqual(index.merge_segments(ix, time_limit=60), 1)
+
+        stats = index.get_index_stats(ix)
+        self.assertEqual(stats["segment_count"], 2)
+        self.assertEqual(stats["documents"], 32)
+        self.assertCountEqual(
+            [segment["documents"] for segment in stats["segments"]],
+            [20, 12],
+        )
+        self.assertEqual(
+            stats["size_bytes"],
+            sum(segment["size_bytes"] for segment in stats["segments"]),
+        )
+        with index.open_index_searcher() as searcher:
+            self.assertEqual(len(searcher.search(query.Term("content", "content"))), 32)
+
+        self.assertEqual(index.merge_segments(ix, time_limit=60), 0)
+
+    def test_merge_deleted_documents(self):
+        """
+        GIVEN:
+            - A segment of which many documents were deleted
+        WHEN:
+            - The segments are merged
+        THEN:
+            - The segment is rewritten without the deleted documents
+        """
+        ix = index.open_index()
+        writer = ix.writer()
+        docs = []
+        for i in range(4):
+            doc = Document.objects.create(title=f"doc{i}", checksum=f"{i}")
+            index.update_document(writer, doc)
+            docs.append(doc)
+        writer.commit()
+        writer = ix.writer()
+        index.remove_document(writer, docs[0])
+        index.remove_document(writer, docs[1])
+        writer.commit(merge=False)
+        self.assertEqual(index.get_index_stats(ix)["deleted_documents"], 2)
+
+        self.assertEqual(index.merge_segments(ix, time_limit=60), 1)
+
+        stats = index.get_index_stats(ix)
+        self.assertEqual(stats["segment_count"], 1)
+        self.assertEqual(stats["documents"], 2)
+        self.assertEqual(stats["deleted_documents"], 0)
+
+    def test_merge_too_large_for_time_left(self):
+        """
+        GIVEN:
+            - An index with many segments of one document
+            - A segment of which many documents were deleted
+        WHEN:
+            - The segments are merged with little time left
+        THEN:
+            - Merges which would not finish in time are left out
+            - Smaller merges are still done
+        """
+        ix = index.open_index()
+        for _ in range(10):
+            self.add_segment(ix, 1)
+        self.assertEqual(len(index.select_merge(index.get_segments(ix), 10)), 10)
+        self.assertEqual(index.select_merge(index.get_segments(ix), 9), [])
+
+        with mock.patch("documents.index.MERGE_DOCUMENTS_PER_SECOND", 1):
+            self.assertEqual(index.merge_segments(ix, time_limit=5), 0)
+        self.assertEqual(index.get_index_stats(ix)["segment_count"], 10)
+
+        writer = ix.writer()
+        docs = []
+        for i in range(4):
+            doc = Document.objects.create(title=f"del{i}", checksum=f"del{i}")
+            index.update_document(writer, doc)
+            docs.append(doc)
+        writer.commit(merge=False)
+        writer = ix.writer()
+        index.remove_document(writer, docs[0])
+        index.remove_document(writer, docs[1])
+        writer.commit(merge=False)
+
+        selected = index.select_merge(index.get_segments(ix), 5)
+        self.assertEqual(len(selected), 1)
+        self.assertEqual(selected[0].deleted_count(), 2)
+
+    def test_merge_locked_or_no_time(self):
+        """
+        GIVEN:
+            - An index with many segments of one document
+        WHEN:
+            - The segments are merged while the index is locked or without time
+        THEN:
+            - Nothing is merged
+        """
+        ix = index.open_index()
+        for _ in range(10):
+            self.add_segment(ix, 1)
+
+        self.assertEqual(index.merge_segments(ix, time_limit=0), 0)
+        writer = ix.writer()
+        try:
+            self.assertEqual(index.merge_segments(ix, time_limit=60), 0)
+        finally:
+            writer.cancel()
+
+        self.assertEqual(index.get_index_stats(ix)["segment_count"], 10)
+
+
+class TestSearcherPool(DirectoriesMixin, TestCase):
+    def test_reader_reused(self):
+        """
+        GIVEN:
+            - Index with a document
+        WHEN:
+            - The index is searched several times
+            - A document is added to the index in between
+        THEN:
+            - The index reader is only opened again after the index changed
+            - The added document is found
+        """
+        doc1 = Document.objects.create(title="doc1", checksum="A", content="first")
+        index.add_or_update_document(doc1)
+
+        with index.open_index_searcher() as searcher:
+            reader = searcher.reader()
+            self.assertEqual(searcher.doc_count(), 1)
+
+        with index.open_index_searcher() as searcher:
+            self.assertIs(searcher.reader(), reader)
+
+        doc2 = Document.objects.create(title="doc2", checksum="B", content="second")
+        index.add_or_update_document(doc2)
+
+        with index.open_index_searcher() as searcher:
+            self.assertIsNot(searcher.reader(), reader)
+            self.assertEqual(searcher.doc_count(), 2)
+
+    def test_concurrent_searchers(self):
+        """
+        GIVEN:
+            - Index with a document
+        WHEN:
+            - Several searchers are used at the same time
+        THEN:
+            - Each searcher has its own reader
+        """
+        doc = Document.objects.create(title="doc", checksum="A", content="first")
+        index.add_or_update_document(doc)
+
+        with index.open_index_searcher() as searcher1:
+            with index.open_index_searcher() as searcher2:
+                self.assertIsNot(searcher1.reader(), searcher2.reader())
+                self.assertEqual(searcher2.doc_count(), 1)
+            self.assertEqual(searcher1.doc_count(), 1)
+
+
+class TestPermissionFilter(DirectoriesMixin, TestCase):
+    def test_permission_filter_cached(self):
+        """
+        GIVEN:
+            - Documents owned by different users
+        WHEN:
+            - The documents a user may view are requested several times
+            - The index changes in between
+        THEN:
+            - The documents are only looked up again after the index changed
+            - Superusers are not filtered
+        """
+        user1 = User.objects.create(username="user1")
+        user2 = User.objects.create(username="user2")
+        superuser = User.objects.create(username="superuser", is_superuser=True)
+        doc1 = Document.objects.create(title="doc1", checksum="A", owner=user1)
+        doc2 = Document.objects.create(title="doc2", checksum="B", owner=user2)
+        index.add_or_update_document(doc1)
+        index.add_or_update_document(doc2)
+
+        def viewable_ids(user):
+            with index.open_index_searcher() as searcher:
+                permission_filter = index.get_permission_filter(searcher, user)
+                return sorted(
+                    searcher.stored_fields(n)["id"] for n in permission_filter
+                )
+
+        with mock.patch(
+            "whoosh.searching.Searcher.docs_for_query",
+            autospec=True,
+            side_effect=Searcher.docs_for_query,
+        ) as docs_for_query:
+            self.assertListEqual(viewable_ids(user1), [doc1.pk])
+            self.assertListEqual(viewable_ids(user1), [doc1.pk])
+            self.assertListEqual(viewable_ids(user2), [doc2.pk])
+            self.assertEqual(docs_for_query.call_count, 2)
+
+            doc2.owner = None
+            doc2.save()
+            index.add_or_update_document(doc2)
+            self.assertListEqual(viewable_ids(user1), [doc1.pk, doc2.pk])
+            self.assertEqual(docs_for_query.call_count, 3)
+
+        with index.open_index_searcher() as searcher:
+            self.assertIsNone(index.get_permission_filter(searcher, superuser))
+
+
+class TestMoreLikeThis(DirectoriesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.docs = [
+            Document.objects.create(
+                title=f"doc{i}",
+                checksum=str(i),
+                content=content,
+            )
+            for i, content in enumerate(
+                [
+                    "invoice for the repair of the heating system",
+                    "invoice for the repair of the car brakes",
+                    "rental contract for the apartment",
+                ],
+            )
+        ]
+        for doc in self.docs:
+            index.add_or_update_document(doc)
+
+    def test_key_terms_stored(self):
+        """
+        GIVEN:
+            - Index with documents
+        WHEN:
+            - Key terms of a new document are computed before it is indexed
+        THEN:
+            - Key terms are the same as those computed from the index after
+        """
+        doc = Document.objects.create(
+            title="new",
+            checksum="new",
+            content="repair of the apartment heating, invoice for the heating",
+        )
+        with index.open_index_searcher() as searcher:
+            key_terms = index.get_key_terms(searcher.reader(), doc.content)
+
+        index.add_or_update_document(doc)
+
+        with index.open_index_searcher() as searcher:
+            expected = searcher.key_terms_from_text(
+                "content",
+                doc.content,
+                numterms=index.MORE_LIKE_THIS_TERMS,
+                model=classify.Bo1Model,
+                normalize=False,
+            )
+            docnum = searcher.document_number(id=doc.pk)
+            self.assertEqual(searcher.stored_fields(docnum)["key_terms"], key_terms)
+
+        self.assertEqual([t for t, _ in key_terms], [t for t, _ in expected])
+        for (_, weight), (_, expected_weight) in zip(key_terms, expected):
+            self.assertAlmostEqual(weight, expected_weight)
+
+    @override_settings(INDEX_REINDEX_PROCS=2)
+    def test_key_terms_multiprocess(self):
+        """
+        GIVEN:
+            - Index with documents
+        WHEN:
+            - The index is rebuilt with several processes
+        THEN:
+            - The key terms are computed by the processes
+            - Key terms are the same as those computed by this process
+        """
+        with index.open_index_searcher() as searcher:
+            reader = searcher.reader()
+            expected = {
+                doc.pk: index.get_key_terms(reader, doc.content) for doc in self.docs
+            }
+
+            ix = index.open_index(recreate=True)
+            with mock.patch("documents.index.KEY_TERMS_CHUNK_SIZE", 2), mock.patch(
+                "documents.index.iter_document_fields_parallel",
+                wraps=index.iter_document_fields_parallel,
+            ) as iter_document_fields_parallel:
+                self.assertEqual(
+                    index.bulk_index_documents(
+                        ix,
+                        Document.objects.all(),
+                        reader=reader,
+                    ),
+                    len(self.docs),
+                )
+            iter_document_fields_parallel.assert_called_once()
+
+        with index.open_index_searcher() as searcher:
+            for doc in self.docs:
+                docnum = searcher.document_number(id=doc.pk)
+                self.assertIsNotNone(expected[doc.pk])
+                self.assertEqual(
+                    searcher.stored_fields(docnum)["key_terms"],
+                    expected[doc.pk],
+                )
+
+    def test_more_like_this_stored_key_terms(self):
+        """
+        GIVEN:
+            - Document indexed into an empty index, without key terms
+            - Documents indexed with key terms
+        WHEN:
+            - Documents similar to these are searched
+        THEN:
+            - Key terms are only computed from the content without stored ones
+            - Similar documents are found either way
+        """
+        with mock.patch.object(
+            Searcher,
+            "key_terms_from_text",
+            autospec=True,
+            side_effect=Searcher.key_terms_from_text,
+        ) as key_terms_from_text:
+            with index.open_index_searcher() as searcher:
+                for doc, computed, similar in [
+                    (self.docs[0], 1, self.docs[1]),
+                    (self.docs[1], 1, self.docs[0]),
+                ]:
+                    q = index.DelayedMoreLikeThisQuery(
+                        searcher,
+                        {"more_like_id": str(doc.pk)},
+                        10,
+                        None,
+                    )
+                    self.assertListEqual(
+                        [hit["id"] for hit in q[0:10]],
+                        [similar.pk],
+                    )
+                    self.assertEqual(key_terms_from_text.call_count, computed)
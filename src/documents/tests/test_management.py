@@ -3,10 +3,12 @@ import hashlib
 import os
 import shutil
 import tempfile
+from io import StringIO
 from pathlib import Path
 from unittest import mock
 
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.test import TestCase
 from django.test import override_settings
 
@@ -172,13 +174,67 @@ class TestDecryptDocuments(FileSystemAssertsMixin, TestCase):
 class TestMakeIndex(TestCase):
     @mock.patch("documents.management.commands.document_index.index_reindex")
     def test_reindex(self, m):
-        call_command("document_index", "reindex")
+        m.return_value = 42
+        stdout = StringIO()
+        call_command("document_index", "reindex", stdout=stdout)
         m.assert_called_once()
+        self.assertIn("Indexed 42 documents", stdout.getvalue())
+        self.assertIn("documents/s", stdout.getvalue())
+
+    @mock.patch("documents.management.commands.document_index.index_sync")
+    def test_sync(self, m):
+        m.return_value = (3, 1)
+        stdout = StringIO()
+        call_command("document_index", "sync", stdout=stdout)
+        m.assert_called_once()
+        self.assertIn("Updated 3 documents, removed 1 documents", stdout.getvalue())
 
     @mock.patch("documents.management.commands.document_index.index_optimize")
     def test_optimize(self, m):
-        call_command("document_index", "optimize")
+        m.return_value = {
+            "segment_count": 2,
+            "documents": 10,
+            "deleted_documents": 1,
+            "size_bytes": 1024**2,
+            "queued_documents": 3,
+        }
+        stdout = StringIO()
+        call_command("document_index", "optimize", stdout=stdout)
         m.assert_called_once()
+        self.assertIn("The index has 2 segments", stdout.getvalue())
+        self.assertIn("3 changed documents are queued", stdout.getvalue())
+
+    @mock.patch("documents.management.commands.document_index.index_reindex")
+    @mock.patch("documents.management.commands.document_index.drop_database_index")
+    def test_drop_database_index(self, drop, reindex):
+        """
+        GIVEN:
+            - The full text index of the database might exist
+        WHEN:
+            - The index is rebuilt with --drop-database-index
+        THEN:
+            - The database index is removed before reindexing
+            - It is kept if the SQLite search backend uses it
+        """
+        reindex.return_value = 0
+        call_command("document_index", "reindex", stdout=StringIO())
+        drop.assert_not_called()
+
+        call_command(
+            "document_index",
+            "reindex",
+            "--drop-database-index",
+            stdout=StringIO(),
+        )
+        drop.assert_called_once()
+
+        drop.reset_mock()
+        reindex.reset_mock()
+        with override_settings(SEARCH_BACKEND="sqlite"):
+            with self.assertRaises(CommandError):
+                call_command("document_index", "reindex", "--drop-database-index")
+        drop.assert_not_called()
+        reindex.assert_not_called()
 
 
 class TestRenamer(DirectoriesMixin, FileSystemAssertsMixin, TestCase):
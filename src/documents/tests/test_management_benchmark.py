@@ -0,0 +1,203 @@
+import json
+import os
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+import pytest
+from django.conf import settings
+from django.core.management import CommandError
+from django.core.management import call_command
+from django.test import TestCase
+
+from documents.models import Document
+from documents.parsers import ParseError
+from documents.tests.utils import DirectoriesMixin
+
+try:
+    import pypdfium2  # noqa: F401
+
+    HAS_PDFIUM_LIB = True
+except ImportError:
+    HAS_PDFIUM_LIB = False
+
+
+class TestSearchBenchmarkCommand(DirectoriesMixin, TestCase):
+    def call_command(self, *args, **kwargs):
+        stdout = StringIO()
+        stderr = StringIO()
+        call_command(
+            "document_search_benchmark",
+            "--no-progress-bar",
+            *args,
+            stdout=stdout,
+            stderr=stderr,
+            **kwargs,
+        )
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_benchmark(self):
+        """
+        GIVEN:
+            - An empty database
+        WHEN:
+            - The benchmark runs with two sizes for each search backend
+        THEN:
+            - The results of both sizes are written
+            - Nothing generated is kept
+            - The settings are restored
+        """
+        search_backend = settings.SEARCH_BACKEND
+        for backend in ["whoosh", "sqlite"]:
+            with self.subTest(backend=backend):
+                output = Path(self.dirs.scratch_dir) / f"{backend}.json"
+
+                self.call_command(
+                    "--documents",
+                    "40",
+                    "20",
+                    "--users",
+                    "3",
+                    "--queries",
+                    "5",
+                    "--backend",
+                    backend,
+                    "--output",
+                    str(output),
+                )
+
+                results = json.loads(output.read_text())
+                self.assertEqual(results["backend"], backend)
+                self.assertEqual(
+                    [run["documents"] for run in results["runs"]],
+                    [20, 40],
+                )
+                for run in results["runs"]:
+                    self.assertGreater(run["index"]["documents_per_second"], 0)
+                    for name in ["query", "more_like", "autocomplete", "update"]:
+                        self.assertEqual(run[name]["count"], 5)
+                        self.assertLessEqual(run[name]["p50_ms"], run[name]["p99_ms"])
+                self.assertEqual(
+                    "permissions" in results["runs"][0],
+                    backend == "whoosh",
+                )
+                self.assertFalse(Document.objects.exists())
+                self.assertEqual(os.listdir(self.dirs.index_dir), [])
+                self.assertEqual(settings.INDEX_DIR, self.dirs.index_dir)
+                self.assertEqual(settings.SEARCH_BACKEND, search_backend)
+
+    def test_compare(self):
+        """
+        GIVEN:
+            - Results of an earlier run
+        WHEN:
+            - The benchmark runs compared to these results
+        THEN:
+            - The changes to the earlier results are shown
+        """
+        output = Path(self.dirs.scratch_dir) / "results.json"
+        self.call_command("--documents", "20", "--queries", "2", "--output", output)
+
+        stdout, _ = self.call_command(
+            "--documents",
+            "20",
+            "--queries",
+            "2",
+            "--compare",
+            output,
+        )
+
+        self.assertRegex(stdout, r"query: p50 [\d.]+ ms \([+-]\d+%\)")
+
+    def test_not_empty(self):
+        """
+        GIVEN:
+            - A database with documents
+        WHEN:
+            - The benchmark runs
+        THEN:
+            - It refuses to run
+        """
+        Document.objects.create(title="test", content="test", checksum="A")
+
+        with self.assertRaises(CommandError):
+            self.call_command("--documents", "10")
+
+
+def fake_convert(input_file, output_file, **kwargs):
+    Path(output_file).write_bytes(b"RIFF thumbnail")
+
+
+@mock.patch("documents.parsers.run_convert", side_effect=fake_convert)
+class TestThumbnailBenchmarkCommand(DirectoriesMixin, TestCase):
+    SAMPLE_FILE = Path(__file__).parent / "samples" / "simple.pdf"
+
+    def call_command(self, *args, **kwargs):
+        stdout = StringIO()
+        call_command(
+            "document_thumbnail_benchmark",
+            "--no-progress-bar",
+            *args,
+            stdout=stdout,
+            **kwargs,
+        )
+        return stdout.getvalue()
+
+    @pytest.mark.skipif(
+        not HAS_PDFIUM_LIB,
+        reason="No pypdfium2",
+    )
+    def test_benchmark(self, m):
+        """
+        GIVEN:
+            - A PDF file
+        WHEN:
+            - The thumbnail benchmark runs for every engine
+        THEN:
+            - The timings and thumbnail sizes of both engines are written
+        """
+        output = Path(self.dirs.scratch_dir) / "results.json"
+
+        stdout = self.call_command(
+            str(self.SAMPLE_FILE),
+            "--repeat",
+            "2",
+            "--output",
+            str(output),
+        )
+
+        results = json.loads(output.read_text())
+        self.assertEqual(m.call_count, 2)
+        for engine in ["pdfium", "convert"]:
+            self.assertEqual(results["engines"][engine]["count"], 2)
+            self.assertEqual(results["engines"][engine]["errors"], 0)
+            self.assertGreater(results["engines"][engine]["mean_size_bytes"], 0)
+            self.assertRegex(stdout, rf"{engine}: p50 [\d.]+ ms")
+
+    def test_engine_fails(self, m):
+        """
+        GIVEN:
+            - An engine which cannot make thumbnails
+        WHEN:
+            - The thumbnail benchmark runs
+        THEN:
+            - The error is reported instead of timings
+        """
+        m.side_effect = ParseError("Does not compute.")
+
+        stdout = self.call_command(str(self.SAMPLE_FILE), "--engines", "convert")
+
+        self.assertIn("convert: failed", stdout)
+        self.assertIn("Does not compute.", stdout)
+
+    def test_no_documents(self, m):
+        """
+        GIVEN:
+            - An archive without PDF documents
+        WHEN:
+            - The thumbnail benchmark runs without files
+        THEN:
+            - It refuses to run
+        """
+        with self.assertRaises(CommandError):
+            self.call_command()
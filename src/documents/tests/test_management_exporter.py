@@ -3,6 +3,7 @@ import json
 import os
 import shutil
 import tempfile
+from io import StringIO
 from pathlib import Path
 from unittest import mock
 from zipfile import ZipFile
@@ -32,6 +33,7 @@ from documents.models import StoragePath
 from documents.models import Tag
 from documents.models import User
 from documents.sanity_checker import check_sanity
+from documents.search import drop_database_index
 from documents.settings import EXPORTER_FILE_NAME
 from documents.tests.utils import DirectoriesMixin
 from documents.tests.utils import FileSystemAssertsMixin
@@ -168,7 +170,7 @@ class TestExportImport(DirectoriesMixin, FileSystemAssertsMixin, TestCase):
 
         manifest = self._do_export(use_filename_format=use_filename_format)
 
-        self.assertEqual(len(manifest), 172)
+        self.assertEqual(len(manifest), 177)
 
         # dont include consumer or AnonymousUser users
         self.assertEqual(
@@ -262,7 +264,7 @@ class TestExportImport(DirectoriesMixin, FileSystemAssertsMixin, TestCase):
             self.assertEqual(Document.objects.get(id=self.d4.id).title, "wow_dec")
             self.assertEqual(GroupObjectPermission.objects.count(), 1)
             self.assertEqual(UserObjectPermission.objects.count(), 1)
-            self.assertEqual(Permission.objects.count(), 124)
+            self.assertEqual(Permission.objects.count(), 128)
             messages = check_sanity()
             # everything is alright after the test
             self.assertEqual(len(messages), 0)
@@ -622,6 +624,37 @@ class TestExportImport(DirectoriesMixin, FileSystemAssertsMixin, TestCase):
             call_command("document_importer", "--no-progress-bar", self.target)
             self.assertEqual(Document.objects.count(), 4)
 
+    def test_import_without_database_index(self):
+        """
+        GIVEN:
+            - Request to import documents
+            - The SQLite search backend, whose index does not exist
+        WHEN:
+            - Documents are imported
+        THEN:
+            - The documents are imported
+            - Updating the search index is skipped with a warning
+        """
+        shutil.rmtree(os.path.join(self.dirs.media_dir, "documents"))
+        shutil.copytree(
+            os.path.join(os.path.dirname(__file__), "samples", "documents"),
+            os.path.join(self.dirs.media_dir, "documents"),
+        )
+        self._do_export()
+
+        with paperless_environment(), override_settings(SEARCH_BACKEND="sqlite"):
+            drop_database_index()
+            Document.objects.all().delete()
+            stdout = StringIO()
+            call_command(
+                "document_importer",
+                "--no-progress-bar",
+                self.target,
+                stdout=stdout,
+            )
+            self.assertEqual(Document.objects.count(), 4)
+            self.assertIn("Not updating the search index", stdout.getvalue())
+
     def test_split_manifest(self):
         """
         GIVEN:
@@ -694,15 +727,15 @@ class TestExportImport(DirectoriesMixin, FileSystemAssertsMixin, TestCase):
             os.path.join(self.dirs.media_dir, "documents"),
         )
 
-        self.assertEqual(ContentType.objects.count(), 31)
-        self.assertEqual(Permission.objects.count(), 124)
+        self.assertEqual(ContentType.objects.count(), 32)
+        self.assertEqual(Permission.objects.count(), 128)
 
         manifest = self._do_export()
 
         with paperless_environment():
             self.assertEqual(
                 len(list(filter(lambda e: e["model"] == "auth.permission", manifest))),
-                124,
+                128,
             )
             # add 1 more to db to show objects are not re-created by import
             Permission.objects.create(
@@ -710,7 +743,7 @@ class TestExportImport(DirectoriesMixin, FileSystemAssertsMixin, TestCase):
                 codename="test_perm",
                 content_type_id=1,
             )
-            self.assertEqual(Permission.objects.count(), 125)
+            self.assertEqual(Permission.objects.count(), 129)
 
             # will cause an import error
             self.user.delete()
@@ -719,5 +752,5 @@ class TestExportImport(DirectoriesMixin, FileSystemAssertsMixin, TestCase):
             with self.assertRaises(IntegrityError):
                 call_command("document_importer", "--no-progress-bar", self.target)
 
-            self.assertEqual(ContentType.objects.count(), 31)
-            self.assertEqual(Permission.objects.count(), 125)
+            self.assertEqual(ContentType.objects.count(), 32)
+            self.assertEqual(Permission.objects.count(), 129)
@@ -2,11 +2,13 @@ import shutil
 import tempfile
 from collections.abc import Iterable
 from random import randint
+from unittest import mock
 
 from django.contrib.admin.models import LogEntry
 from django.contrib.auth.models import User
 from django.test import TestCase
 from django.test import override_settings
+from rapidfuzz import fuzz
 
 from documents import matching
 from documents.models import Correspondent
@@ -381,6 +383,196 @@ class TestCaseSensitiveMatching(_TestMatchingBase):
         )
 
 
+class TestCompiledMatcher(TestCase):
+    def test_overlapping_words(self):
+        """
+        GIVEN:
+            - Rules with words which start at the same position in the content
+        WHEN:
+            - The rules are matched against the document at once
+        THEN:
+            - All rules matching the content are reported
+        """
+        t1 = Tag.objects.create(
+            name="t1",
+            match="new",
+            matching_algorithm=Tag.MATCH_ANY,
+        )
+        t2 = Tag.objects.create(
+            name="t2",
+            match='"new  york"',
+            matching_algorithm=Tag.MATCH_ANY,
+        )
+        t3 = Tag.objects.create(
+            name="t3",
+            match="NEW York City",
+            matching_algorithm=Tag.MATCH_LITERAL,
+            is_insensitive=False,
+        )
+        t4 = Tag.objects.create(
+            name="t4",
+            match="new york city",
+            matching_algorithm=Tag.MATCH_LITERAL,
+        )
+        t5 = Tag.objects.create(
+            name="t5",
+            match="york new",
+            matching_algorithm=Tag.MATCH_ALL,
+        )
+        c1 = Correspondent.objects.create(
+            name="c1",
+            match="York",
+            matching_algorithm=Correspondent.MATCH_ANY,
+            is_insensitive=False,
+        )
+        c2 = Correspondent.objects.create(
+            name="c2",
+            match=r"y\w+k",
+            matching_algorithm=Correspondent.MATCH_REGEX,
+        )
+        dt = DocumentType.objects.create(
+            name="dt",
+            match="newyork",
+            matching_algorithm=DocumentType.MATCH_ANY,
+        )
+
+        doc = Document(content="Welcome to New York City!")
+        self.assertCountEqual(
+            matching.match_tags(doc, None),
+            [t1, t2, t4, t5],
+        )
+        self.assertCountEqual(matching.match_correspondents(doc, None), [c1, c2])
+        self.assertNotIn(dt, matching.match_document_types(doc, None))
+
+        doc = Document(content="Welcome to NEW York City!")
+        self.assertIn(t3, matching.match_tags(doc, None))
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        },
+    )
+    def test_matcher_cache(self):
+        """
+        GIVEN:
+            - A compiled matcher
+        WHEN:
+            - The rules of a matching model are changed or deleted
+        THEN:
+            - The matcher is compiled again with the new rules
+        """
+        doc = Document(content="I contain the keyword.")
+        tag = Tag.objects.create(
+            name="test",
+            match="keyword",
+            matching_algorithm=Tag.MATCH_ANY,
+        )
+
+        matcher = matching.get_matcher()
+        self.assertIs(matching.get_matcher(), matcher)
+        self.assertEqual(matching.match_tags(doc, None), [tag])
+
+        tag.match = "no-match"
+        tag.save()
+
+        self.assertIsNot(matching.get_matcher(), matcher)
+        self.assertEqual(matching.match_tags(doc, None), [])
+
+        # A change in bulk is seen right away, by other processes once it is
+        # committed
+        with self.captureOnCommitCallbacks() as callbacks:
+            Tag.objects.filter(pk=tag.pk).update(match="contain")
+        self.assertEqual(matching.match_tags(doc, None), [tag])
+        self.assertIn(matching.matching_rules_changed, callbacks)
+
+        tag.delete()
+        self.assertEqual(matching.match_tags(doc, None), [])
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        },
+    )
+    def test_matching_rules_loaded_once(self):
+        """
+        GIVEN:
+            - Matching rules which were loaded before
+        WHEN:
+            - Documents are matched repeatedly
+        THEN:
+            - The rules are not loaded again until they change
+        """
+        doc = Document(content="I contain the keyword.")
+        tag = Tag.objects.create(
+            name="test",
+            match="keyword",
+            matching_algorithm=Tag.MATCH_ANY,
+        )
+        matching.matching_rules_changed()
+        matching.get_matcher()
+
+        # Only the labels visible to the user are fetched
+        with self.assertNumQueries(4):
+            for _ in range(2):
+                self.assertEqual(matching.match_tags(doc, None), [tag])
+                self.assertEqual(matching.match_correspondents(doc, None), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.match = "no-match"
+            tag.save()
+        # The rules once, and the tags for each match
+        with self.assertNumQueries(3):
+            self.assertEqual(matching.match_tags(doc, None), [])
+            self.assertEqual(matching.match_tags(doc, None), [])
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        },
+    )
+    def test_document_scanned_once(self):
+        """
+        GIVEN:
+            - Regular expression and fuzzy rules of several models
+        WHEN:
+            - The labels of all models are matched against a document
+            - The content of the document changes
+        THEN:
+            - The content is scanned once for all models
+            - The changed content is scanned again
+        """
+        tag = Tag.objects.create(
+            name="tag",
+            match="key.ord",
+            matching_algorithm=Tag.MATCH_REGEX,
+        )
+        correspondent = Correspondent.objects.create(
+            name="correspondent",
+            match="contain the keyword",
+            matching_algorithm=Correspondent.MATCH_FUZZY,
+        )
+        doc = Document.objects.create(
+            title="doc",
+            checksum="A",
+            content="I contain the keyword.",
+        )
+
+        with mock.patch(
+            "rapidfuzz.fuzz.partial_ratio",
+            wraps=fuzz.partial_ratio,
+        ) as partial_ratio:
+            self.assertEqual(matching.match_tags(doc, None), [tag])
+            self.assertEqual(matching.match_correspondents(doc, None), [correspondent])
+            self.assertEqual(matching.match_document_types(doc, None), [])
+            self.assertEqual(matching.match_storage_paths(doc, None), [])
+            partial_ratio.assert_called_once()
+
+            doc.content = "Nothing to see."
+            self.assertEqual(matching.match_tags(doc, None), [])
+            self.assertEqual(matching.match_correspondents(doc, None), [])
+        self.assertEqual(partial_ratio.call_count, 2)
+
+
 @override_settings(POST_CONSUME_SCRIPT=None)
 class TestDocumentConsumptionFinishedSignal(TestCase):
     """
@@ -1,6 +1,8 @@
+from pathlib import Path
 from tempfile import TemporaryDirectory
 from unittest import mock
 
+import pytest
 from django.apps import apps
 from django.test import TestCase
 from django.test import override_settings
@@ -9,10 +11,19 @@ from documents.parsers import get_default_file_extension
 from documents.parsers import get_parser_class_for_mime_type
 from documents.parsers import get_supported_file_extensions
 from documents.parsers import is_file_ext_supported
+from documents.parsers import make_thumbnail_from_pdf
+from documents.tests.utils import DirectoriesMixin
 from paperless_tesseract.parsers import RasterisedDocumentParser
 from paperless_text.parsers import TextDocumentParser
 from paperless_tika.parsers import TikaDocumentParser
 
+try:
+    import pypdfium2  # noqa: F401
+
+    HAS_PDFIUM_LIB = True
+except ImportError:
+    HAS_PDFIUM_LIB = False
+
 
 class TestParserDiscovery(TestCase):
     @mock.patch("documents.parsers.document_consumer_declaration.send")
@@ -226,3 +237,54 @@ class TestParserAvailability(TestCase):
         self.assertTrue(is_file_ext_supported(".pdf"))
         self.assertFalse(is_file_ext_supported(".hsdfh"))
         self.assertFalse(is_file_ext_supported(""))
+
+
+@pytest.mark.skipif(
+    not HAS_PDFIUM_LIB,
+    reason="No pypdfium2",
+)
+class TestPdfiumThumbnail(DirectoriesMixin, TestCase):
+    SAMPLE_DIR = Path(__file__).parent / "samples"
+
+    @mock.patch("documents.parsers.run_convert")
+    def test_thumbnail(self, m):
+        """
+        GIVEN:
+            - A PDF document
+        WHEN:
+            - The thumbnail of the document is made
+        THEN:
+            - The first page is rendered in process as a 500px wide WebP
+            - convert is not run
+        """
+        from PIL import Image
+
+        thumb = make_thumbnail_from_pdf(
+            self.SAMPLE_DIR / "simple.pdf",
+            self.dirs.scratch_dir,
+        )
+
+        m.assert_not_called()
+        with Image.open(thumb) as image:
+            self.assertEqual(image.format, "WEBP")
+            self.assertEqual(image.width, 500)
+
+    @mock.patch("documents.parsers.run_convert")
+    def test_thumbnail_fallback(self, m):
+        """
+        GIVEN:
+            - A PDF document pdfium cannot open
+        WHEN:
+            - The thumbnail of the document is made
+        THEN:
+            - The thumbnail is made with convert
+        """
+        with self.assertLogs("paperless.parsing", level="WARNING") as cm:
+            thumb = make_thumbnail_from_pdf(
+                self.SAMPLE_DIR / "password-is-test.pdf",
+                self.dirs.scratch_dir,
+            )
+
+        m.assert_called_once()
+        self.assertEqual(thumb, str(self.dirs.scratch_dir / "convert.webp"))
+        self.assertIn("Unable to make thumbnail with pdfium", cm.output[0])
@@ -0,0 +1,391 @@
+from unittest import mock
+from urllib.parse import quote
+
+from django.contrib.auth.models import Permission
+from django.contrib.auth.models import User
+from django.test import override_settings
+from guardian.shortcuts import assign_perm
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from documents.models import Correspondent
+from documents.models import Document
+from documents.search import SqliteQuery
+from documents.search import create_database_index
+from documents.search import database_index_exists
+from documents.search import drop_database_index
+from documents.search import get_search_backend
+from documents.tests.utils import DirectoriesMixin
+
+
+class SearchBackendTestMixin(DirectoriesMixin):
+    """
+    The same searches with every search backend
+    """
+
+    backend: str
+
+    def setUp(self):
+        super().setUp()
+        search_backend = override_settings(SEARCH_BACKEND=self.backend)
+        search_backend.enable()
+        self.addCleanup(search_backend.disable)
+
+        self.user = User.objects.create_superuser(username="temp_admin")
+        self.client.force_authenticate(user=self.user)
+
+    def add_document(self, **kwargs) -> Document:
+        kwargs.setdefault("checksum", str(Document.objects.count()))
+        doc = Document.objects.create(**kwargs)
+        get_search_backend().add_or_update_document(doc)
+        return doc
+
+    def create_user(self, username: str) -> User:
+        user = User.objects.create_user(username)
+        user.user_permissions.add(Permission.objects.get(codename="view_document"))
+        return user
+
+    def search(self, params: str) -> dict:
+        response = self.client.get(f"/api/documents/?{params}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_search(self):
+        """
+        GIVEN:
+            - Documents with different content
+        WHEN:
+            - Documents are searched
+        THEN:
+            - Documents containing all words are found, with highlights
+        """
+        d1 = self.add_document(
+            title="invoice",
+            content="the thing i bought at a shop and paid with bank account",
+        )
+        d2 = self.add_document(
+            title="bank statement 1",
+            content="things i paid for in august",
+        )
+        self.add_document(title="letter", content="dear sir or madam")
+
+        data = self.search("query=bank")
+        self.assertEqual(data["count"], 2)
+        self.assertCountEqual([r["id"] for r in data["results"]], [d1.id, d2.id])
+        self.assertCountEqual(data["all"], [d1.id, d2.id])
+
+        data = self.search("query=paid%20august")
+        self.assertEqual([r["id"] for r in data["results"]], [d2.id])
+        hit = data["results"][0]["__search_hit__"]
+        self.assertEqual(hit["rank"], 0)
+        self.assertIn('class="match', hit["highlights"])
+
+        data = self.search("query=nothing")
+        self.assertEqual(data["count"], 0)
+        self.assertEqual(data["all"], [])
+
+    def test_search_multi_page(self):
+        """
+        GIVEN:
+            - More matching documents than fit on a page
+        WHEN:
+            - All pages are requested
+        THEN:
+            - Every document is on exactly one page
+        """
+        for i in range(25):
+            self.add_document(title=f"Document {i + 1}", content="content")
+
+        seen_ids = []
+        for page in range(1, 4):
+            data = self.search(f"query=content&page={page}&page_size=10")
+            self.assertEqual(data["count"], 25)
+            seen_ids.extend(r["id"] for r in data["results"])
+        self.assertCountEqual(seen_ids, Document.objects.values_list("id", flat=True))
+
+    def test_search_ordering(self):
+        """
+        GIVEN:
+            - Matching documents
+        WHEN:
+            - Documents are searched and ordered by title
+        THEN:
+            - Documents are in the order of their title
+        """
+        d1 = self.add_document(title="b", content="content")
+        d2 = self.add_document(title="c", content="content")
+        d3 = self.add_document(title="a", content="content")
+
+        data = self.search("query=content&ordering=title")
+        self.assertEqual([r["id"] for r in data["results"]], [d3.id, d1.id, d2.id])
+        data = self.search("query=content&ordering=-title")
+        self.assertEqual([r["id"] for r in data["results"]], [d2.id, d1.id, d3.id])
+
+    def test_search_filtering(self):
+        """
+        GIVEN:
+            - Matching documents with different correspondents
+        WHEN:
+            - Documents are searched with a correspondent filter
+        THEN:
+            - Only documents of the correspondent are found
+        """
+        c = Correspondent.objects.create(name="correspondent")
+        d1 = self.add_document(title="a", content="content", correspondent=c)
+        self.add_document(title="b", content="content")
+
+        data = self.search(f"query=content&correspondent__id={c.id}")
+        self.assertEqual([r["id"] for r in data["results"]], [d1.id])
+
+    def test_search_permissions(self):
+        """
+        GIVEN:
+            - Documents owned by different users, shared or without owner
+        WHEN:
+            - A user searches the documents
+        THEN:
+            - Only documents the user may view are found
+        """
+        user = self.create_user("user")
+        other = self.create_user("other")
+        d1 = self.add_document(title="a", content="content", owner=user)
+        self.add_document(title="b", content="content", owner=other)
+        d3 = self.add_document(title="c", content="content")
+        d4 = Document.objects.create(
+            title="d",
+            content="content",
+            checksum="d",
+            owner=other,
+        )
+        assign_perm("view_document", user, d4)
+        get_search_backend().add_or_update_document(d4)
+
+        self.client.force_authenticate(user=user)
+        data = self.search("query=content")
+        self.assertCountEqual(data["all"], [d1.id, d3.id, d4.id])
+
+    def test_search_updated_and_deleted(self):
+        """
+        GIVEN:
+            - A document
+        WHEN:
+            - The document is changed and then deleted
+        THEN:
+            - The document is found by its new content, then not at all
+        """
+        doc = self.add_document(title="a", content="old")
+
+        response = self.client.patch(
+            f"/api/documents/{doc.id}/",
+            {"content": "new"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.search("query=old")["count"], 0)
+        self.assertEqual(self.search("query=new")["count"], 1)
+
+        response = self.client.delete(f"/api/documents/{doc.id}/")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.search("query=new")["count"], 0)
+
+    def test_sync(self):
+        """
+        GIVEN:
+            - A document which was added without making it searchable
+        WHEN:
+            - The search backend is synced
+        THEN:
+            - The document is found
+        """
+        self.add_document(title="a", content="content")
+        Document.objects.create(title="b", content="content", checksum="b")
+
+        get_search_backend().sync()
+
+        self.assertEqual(self.search("query=content")["count"], 2)
+
+    def test_search_more_like(self):
+        """
+        GIVEN:
+            - Documents with similar content and one with different content
+        WHEN:
+            - Documents similar to one of them are searched
+        THEN:
+            - The similar documents are found, the most similar first
+        """
+        d1 = self.add_document(
+            title="invoice",
+            content="the thing i bought at a shop and paid with bank account",
+        )
+        d2 = self.add_document(
+            title="bank statement 1",
+            content="things i paid for in august",
+        )
+        d3 = self.add_document(
+            title="bank statement 3",
+            content="things i paid for in september",
+        )
+        self.add_document(
+            title="Monty Python & the Holy Grail",
+            content="And now for something completely different",
+        )
+
+        data = self.search(f"more_like_id={d2.id}")
+        self.assertEqual([r["id"] for r in data["results"]], [d3.id, d1.id])
+
+    def test_autocomplete(self):
+        """
+        GIVEN:
+            - Documents visible to a user and one which is not
+        WHEN:
+            - Terms are autocompleted for the user
+        THEN:
+            - Terms in the most visible documents come first
+        """
+        user = self.create_user("user")
+        other = self.create_user("other")
+        self.add_document(title="a", content="apples applebaum", owner=user)
+        self.add_document(title="b", content="applebaum")
+        self.add_document(title="c", content="appletini", owner=other)
+
+        self.client.force_authenticate(user=user)
+        response = self.client.get("/api/search/autocomplete/?term=app")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [b"applebaum", b"apples"])
+
+
+class TestWhooshSearchBackend(SearchBackendTestMixin, APITestCase):
+    backend = "whoosh"
+
+
+class TestSqliteSearchBackend(SearchBackendTestMixin, APITestCase):
+    backend = "sqlite"
+
+    def setUp(self):
+        super().setUp()
+        get_search_backend().reindex()
+
+    def test_index_created_on_reindex(self):
+        """
+        GIVEN:
+            - The SQLite backend, whose index was dropped
+        WHEN:
+            - Documents are searched, then the backend is reindexed
+        THEN:
+            - Searching fails until the index is created by reindexing
+            - Reindexing with the Whoosh backend keeps the index
+        """
+        self.add_document(title="a", content="content")
+        drop_database_index()
+        self.assertFalse(database_index_exists())
+
+        response = self.client.get("/api/documents/?query=content")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        get_search_backend().reindex()
+        self.assertTrue(database_index_exists())
+        self.assertEqual(self.search("query=content")["count"], 1)
+
+        with override_settings(SEARCH_BACKEND="whoosh"):
+            get_search_backend().reindex()
+        self.assertTrue(database_index_exists())
+
+    def test_index_checked_on_use(self):
+        """
+        GIVEN:
+            - The SQLite backend of this process
+        WHEN:
+            - Another process drops or creates the index
+        THEN:
+            - The same backend is returned
+            - The backend notices the change when it is used next
+        """
+        self.add_document(title="a", content="content")
+        backend = get_search_backend()
+
+        drop_database_index()
+        self.assertIs(get_search_backend(), backend)
+        response = self.client.get("/api/documents/?query=content")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        create_database_index()
+        self.assertIs(get_search_backend(), backend)
+        self.assertEqual(self.search("query=content")["count"], 1)
+
+    def test_search_more_like_key_terms_stored(self):
+        """
+        GIVEN:
+            - The SQLite backend
+        WHEN:
+            - Documents similar to one are searched repeatedly
+            - The content of the document changes
+        THEN:
+            - The key terms of the document are computed once
+            - They are computed again for the changed content
+        """
+        d1 = self.add_document(title="a", content="bank statement of august")
+        d2 = self.add_document(title="b", content="bank statement of september")
+        d3 = self.add_document(title="c", content="holy grail of september")
+
+        with mock.patch.object(
+            SqliteQuery,
+            "_compute_key_terms",
+            autospec=True,
+            side_effect=SqliteQuery._compute_key_terms,
+        ) as compute_key_terms:
+            for _ in range(2):
+                data = self.search(f"more_like_id={d1.id}")
+                self.assertEqual([r["id"] for r in data["results"]], [d2.id])
+            compute_key_terms.assert_called_once()
+
+            d1.content = "holy grail"
+            d1.save()
+            data = self.search(f"more_like_id={d1.id}")
+            self.assertEqual([r["id"] for r in data["results"]], [d3.id])
+            self.assertEqual(compute_key_terms.call_count, 2)
+
+    def test_search_syntax(self):
+        """
+        GIVEN:
+            - Documents with different titles and content
+        WHEN:
+            - Documents are searched with phrases, operators, wildcards and fields
+        THEN:
+            - The query is translated for the full text index of the database
+        """
+        d1 = self.add_document(title="invoice", content="bank account paid")
+        d2 = self.add_document(title="statement", content="account of the bank")
+        d3 = self.add_document(title="letter", content="dear sir")
+
+        for query, expected in [
+            ('"bank account"', [d1]),
+            ("bank AND NOT paid", [d2]),
+            ("dear OR paid", [d1, d3]),
+            ("(dear OR paid) invoice", [d1]),
+            ("acc*", [d1, d2]),
+            ("title:invoice", [d1]),
+            ("title:bank", []),
+        ]:
+            with self.subTest(query=query):
+                data = self.search(f"query={quote(query)}")
+                self.assertCountEqual(data["all"], [d.id for d in expected])
+
+    def test_search_unsupported_syntax(self):
+        """
+        GIVEN:
+            - The SQLite backend
+        WHEN:
+            - Documents are searched with syntax it does not support
+        THEN:
+            - The search is rejected with the reason
+        """
+        for query in ["tag:invoice", "NOT bank", "ba?k", "bank~2", "(bank"]:
+            with self.subTest(query=query):
+                response = self.client.get(f"/api/documents/?query={quote(query)}")
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(
+            b"tag field",
+            self.client.get(
+                "/api/documents/?query=tag:invoice",
+            ).content,
+        )
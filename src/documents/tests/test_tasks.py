@@ -3,15 +3,20 @@ from unittest import mock
 
 from django.conf import settings
 from django.test import TestCase
+from django.test import override_settings
 from django.utils import timezone
 
+from documents import index
 from documents import tasks
+from documents.classifier import classifier_labels_changed
+from documents.classifier import load_classifier
 from documents.models import Correspondent
 from documents.models import Document
 from documents.models import DocumentType
 from documents.models import Tag
 from documents.sanity_checker import SanityCheckFailedException
 from documents.sanity_checker import SanityCheckMessages
+from documents.search import get_search_backend
 from documents.tests.test_classifier import dummy_preprocess
 from documents.tests.utils import DirectoriesMixin
 from documents.tests.utils import FileSystemAssertsMixin
@@ -42,6 +47,46 @@ class TestIndexReindex(DirectoriesMixin, TestCase):
 
         tasks.index_optimize()
 
+    def test_index_stats_queue_depth(self):
+        """
+        GIVEN:
+            - A document queued for an index update
+        WHEN:
+            - The index is optimized
+        THEN:
+            - The stats report the queued document before
+            - The optimization writes it, the stats report none after
+        """
+        doc = Document.objects.create(title="test", content="my document")
+        with override_settings(INDEX_UPDATE_DELAY=60):
+            index.add_or_update_document(doc)
+        self.assertEqual(get_search_backend().index_stats()["queued_documents"], 1)
+
+        stats = tasks.index_optimize()
+
+        self.assertEqual(stats["queued_documents"], 0)
+        self.assertEqual(stats["documents"], 1)
+
+    def test_update_index(self):
+        """
+        GIVEN:
+            - A document queued for an index update
+        WHEN:
+            - The index update task runs
+        THEN:
+            - The queue is written to the index
+        """
+        doc = Document.objects.create(title="test", content="my document")
+        with override_settings(INDEX_UPDATE_DELAY=60):
+            index.add_or_update_document(doc)
+        self.assertEqual(index.get_index_queue_depth(), 1)
+
+        tasks.update_index()
+
+        self.assertEqual(index.get_index_queue_depth(), 0)
+        with index.open_index_searcher() as searcher:
+            self.assertEqual(searcher.doc_count(), 1)
+
 
 class TestClassifier(DirectoriesMixin, FileSystemAssertsMixin, TestCase):
     @mock.patch("documents.tasks.load_classifier")
@@ -73,6 +118,13 @@ class TestClassifier(DirectoriesMixin, FileSystemAssertsMixin, TestCase):
         load_classifier.assert_called_once()
         self.assertIsNotFile(settings.MODEL_FILE)
 
+    @mock.patch("documents.tasks.load_classifier")
+    def test_train_classifier_removes_legacy_model_file(self, load_classifier):
+        legacy_file = settings.MODEL_FILE.with_name("classification_model.pickle")
+        legacy_file.touch()
+        tasks.train_classifier()
+        self.assertIsNotFile(legacy_file)
+
     def test_train_classifier(self):
         c = Correspondent.objects.create(matching_algorithm=Tag.MATCH_AUTO, name="test")
         doc = Document.objects.create(correspondent=c, content="test", title="test")
@@ -99,6 +151,81 @@ class TestClassifier(DirectoriesMixin, FileSystemAssertsMixin, TestCase):
             mtime3 = os.stat(settings.MODEL_FILE).st_mtime
             self.assertNotEqual(mtime2, mtime3)
 
+    def test_train_classifier_cache_stats(self):
+        """
+        GIVEN:
+            - A trained classifier loaded from the cache of this process
+        WHEN:
+            - The classifier is trained
+        THEN:
+            - The task returns how often the cached classifier was used
+        """
+        c = Correspondent.objects.create(matching_algorithm=Tag.MATCH_AUTO, name="test")
+        Document.objects.create(correspondent=c, content="test", title="test")
+
+        with mock.patch(
+            "documents.classifier.DocumentClassifier.preprocess_content",
+        ) as pre_proc_mock:
+            pre_proc_mock.side_effect = dummy_preprocess
+            tasks.train_classifier()
+            load_classifier()
+            hits = tasks.train_classifier()["hits"]
+            # The model is unchanged, the cached classifier is used
+            load_classifier()
+            stats = tasks.train_classifier()
+
+        self.assertEqual(stats["hits"], hits + 1)
+        self.assertCountEqual(stats.keys(), ["hits", "misses", "reloads"])
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        },
+    )
+    def test_train_classifier_fingerprint_changed(self):
+        """
+        GIVEN:
+            - A trained and saved classifier
+        WHEN:
+            - A label which is not used for training changed
+        THEN:
+            - The classifier is saved with the new fingerprint
+            - The next check does not walk the documents
+        """
+        c = Correspondent.objects.create(matching_algorithm=Tag.MATCH_AUTO, name="test")
+        c2 = Correspondent.objects.create(name="test2")
+        Document.objects.create(
+            correspondent=c,
+            content="test",
+            title="test",
+            checksum="A",
+        )
+        doc = Document.objects.create(
+            correspondent=c2,
+            content="t",
+            title="t2",
+            checksum="B",
+        )
+
+        with mock.patch(
+            "documents.classifier.DocumentClassifier.preprocess_content",
+        ) as pre_proc_mock:
+            pre_proc_mock.side_effect = dummy_preprocess
+
+            tasks.train_classifier()
+            fingerprint = load_classifier(use_cache=False).training_fingerprint
+
+            Document.objects.filter(pk=doc.pk).update(correspondent=None)
+            # As bulk edits do
+            classifier_labels_changed()
+            tasks.train_classifier()
+            classifier = load_classifier(use_cache=False)
+            self.assertNotEqual(classifier.training_fingerprint, fingerprint)
+
+            with mock.patch.object(classifier, "_training_rows") as training_rows:
+                self.assertFalse(classifier.train())
+            training_rows.assert_not_called()
+
 
 class TestSanityCheck(DirectoriesMixin, TestCase):
     @mock.patch("documents.tasks.sanity_checker.check_sanity")
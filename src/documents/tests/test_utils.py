@@ -0,0 +1,88 @@
+import hashlib
+import os
+import shutil
+from pathlib import Path
+from unittest import mock
+
+from django.test import TestCase
+
+from documents.tests.utils import DirectoriesMixin
+from documents.utils import compute_checksum
+from documents.utils import stage_file
+
+
+class TestChecksum(DirectoriesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.source = Path(self.dirs.scratch_dir) / "source.bin"
+        self.data = os.urandom(10000)
+        self.source.write_bytes(self.data)
+        os.utime(self.source, ns=(1_000_000_000, 2_000_000_000))
+
+    def test_compute_checksum(self):
+        """
+        GIVEN:
+            - A file larger than the chunks it is read in
+        WHEN:
+            - The checksum of the file is computed
+        THEN:
+            - The checksum is the MD5 of the whole file
+        """
+        self.assertEqual(
+            compute_checksum(self.source, chunk_size=4096),
+            hashlib.md5(self.data).hexdigest(),
+        )
+        self.assertEqual(
+            compute_checksum(str(self.source)),
+            hashlib.md5(self.data).hexdigest(),
+        )
+
+
+class TestStageFile(DirectoriesMixin, TestCase):
+    SAMPLE_DIR = Path(__file__).parent / "samples"
+
+    def setUp(self):
+        super().setUp()
+        self.source = Path(self.dirs.scratch_dir) / "simple.pdf"
+        shutil.copy(self.SAMPLE_DIR / "simple.pdf", self.source)
+        os.utime(self.source, ns=(1_000_000_000, 2_000_000_000))
+        self.data = self.source.read_bytes()
+
+    def test_stage_file(self):
+        """
+        GIVEN:
+            - A PDF file
+        WHEN:
+            - The file is staged
+        THEN:
+            - The copy has the same content and modification time
+            - The checksum and mime type of the file are returned
+        """
+        dest = Path(self.dirs.scratch_dir) / "staged.pdf"
+
+        staged_file = stage_file(self.source, dest, chunk_size=4096)
+
+        self.assertEqual(staged_file.checksum, hashlib.md5(self.data).hexdigest())
+        self.assertEqual(staged_file.mime_type, "application/pdf")
+        self.assertEqual(dest.read_bytes(), self.data)
+        self.assertEqual(dest.stat().st_mtime_ns, 2_000_000_000)
+
+    @mock.patch("documents.utils._clone_file", return_value=False)
+    def test_stage_file_without_clone(self, m):
+        """
+        GIVEN:
+            - A PDF file on a file system which cannot clone files
+        WHEN:
+            - The file is staged
+        THEN:
+            - The file is copied and its checksum and mime type are returned
+        """
+        dest = Path(self.dirs.scratch_dir) / "staged.pdf"
+
+        staged_file = stage_file(self.source, dest, chunk_size=4096)
+
+        m.assert_called_once()
+        self.assertEqual(staged_file.checksum, hashlib.md5(self.data).hexdigest())
+        self.assertEqual(staged_file.mime_type, "application/pdf")
+        self.assertEqual(dest.read_bytes(), self.data)
+        self.assertEqual(dest.stat().st_mtime_ns, 2_000_000_000)
@@ -56,8 +56,11 @@ def setup_directories():
         LOGGING_DIR=dirs.logging_dir,
         INDEX_DIR=dirs.index_dir,
         STATIC_ROOT=dirs.static_dir,
-        MODEL_FILE=dirs.data_dir / "classification_model.pickle",
+        MODEL_FILE=dirs.data_dir / "classification_model.bin",
+        PREPROCESSED_TEXT_FILE=dirs.data_dir / "classification_texts.sqlite3",
+        OCR_CACHE_DIR=dirs.data_dir / "ocr-cache",
         MEDIA_LOCK=dirs.media_dir / "media.lock",
+        INDEX_UPDATE_DELAY=0,
     )
     dirs.settings_override.enable()
 
@@ -1,8 +1,18 @@
+import dataclasses
+import hashlib
 import shutil
 from os import utime
 from pathlib import Path
+from typing import BinaryIO
 from typing import Union
 
+import magic
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
 
 def _coerce_to_path(
     source: Union[Path, str],
@@ -40,3 +50,113 @@ def copy_file_with_basic_stats(
 
     shutil.copy(source, dest)
     copy_basic_file_stats(source, dest)
+
+
+# Files are read in chunks of this size, instead of all at once
+CHECKSUM_CHUNK_SIZE = 1024 * 1024
+
+
+def _iter_chunks(f, chunk_size: int):
+    """
+    Yields the remaining content of the binary file in chunks, all read into
+    the same buffer
+    """
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    while size := f.readinto(buffer):
+        yield view[:size]
+
+
+def compute_checksum(
+    path: Union[Path, str],
+    chunk_size: int = CHECKSUM_CHUNK_SIZE,
+) -> str:
+    """
+    Returns the MD5 checksum of the file as hex digits. The file is read in
+    chunks, so the memory used does not depend on the size of the file.
+    """
+    checksum = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in _iter_chunks(f, chunk_size):
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+def copy_with_checksum(
+    source_file: BinaryIO,
+    dest_file: BinaryIO,
+    chunk_size: int = CHECKSUM_CHUNK_SIZE,
+) -> str:
+    """
+    Copies the remaining content of a binary file object to another in
+    chunks like shutil.copyfileobj, and returns the MD5 checksum of the
+    copied content as hex digits
+    """
+    checksum = hashlib.md5()
+    for chunk in _iter_chunks(source_file, chunk_size):
+        checksum.update(chunk)
+        dest_file.write(chunk)
+    return checksum.hexdigest()
+
+
+# Request of the ioctl which makes a file share the data of another file until
+# either is changed, from linux/fs.h
+FICLONE = 0x40049409
+
+
+def _clone_file(source: Path, dest: Path) -> bool:
+    """
+    Makes dest a copy on write clone of source, if both are on the same file
+    system and it supports this, like Btrfs or XFS. Returns whether it did.
+    """
+    if fcntl is None or source.stat().st_dev != dest.parent.stat().st_dev:
+        return False
+    with open(source, "rb") as src, open(dest, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            return False
+    return True
+
+
+@dataclasses.dataclass(frozen=True)
+class StagedFile:
+    checksum: str
+    mime_type: str
+
+
+def stage_file(
+    source: Union[Path, str],
+    dest: Union[Path, str],
+    chunk_size: int = CHECKSUM_CHUNK_SIZE,
+) -> StagedFile:
+    """
+    Copies the file like copy_file_with_basic_stats, reading it only once to
+    also compute its MD5 checksum and detect its mime type from the first
+    chunk. If possible, the copy is a clone sharing the data of source, and
+    only the clone is read.
+    """
+    source, dest = _coerce_to_path(source, dest)
+
+    checksum = hashlib.md5()
+    head = None
+    if _clone_file(source, dest):
+        with open(dest, "rb") as f:
+            for chunk in _iter_chunks(f, chunk_size):
+                if head is None:
+                    head = bytes(chunk)
+                checksum.update(chunk)
+    else:
+        with open(source, "rb") as src, open(dest, "wb") as dst:
+            for chunk in _iter_chunks(src, chunk_size):
+                if head is None:
+                    head = bytes(chunk)
+                checksum.update(chunk)
+                dst.write(chunk)
+    shutil.copymode(source, dest)
+    copy_basic_file_stats(source, dest)
+
+    return StagedFile(
+        checksum=checksum.hexdigest(),
+        mime_type=magic.from_buffer(head or b"", mime=True),
+    )
@@ -317,15 +317,15 @@ class DocumentViewSet(
 
     def update(self, request, *args, **kwargs):
         response = super().update(request, *args, **kwargs)
-        from documents import index
+        from documents.search import get_search_backend
 
-        index.add_or_update_document(self.get_object())
+        get_search_backend().add_or_update_document(self.get_object())
         return response
 
     def destroy(self, request, *args, **kwargs):
-        from documents import index
+        from documents.search import get_search_backend
 
-        index.remove_document_from_index(self.get_object())
+        get_search_backend().remove_document(self.get_object())
         return super().destroy(request, *args, **kwargs)
 
     @staticmethod
@@ -561,9 +561,9 @@ class DocumentViewSet(
                 doc.modified = timezone.now()
                 doc.save()
 
-                from documents import index
+                from documents.search import get_search_backend
 
-                index.add_or_update_document(self.get_object())
+                get_search_backend().add_or_update_document(self.get_object())
 
                 return Response(self.getNotes(doc))
             except Exception as e:
@@ -598,9 +598,9 @@ class DocumentViewSet(
             doc.modified = timezone.now()
             doc.save()
 
-            from documents import index
+            from documents.search import get_search_backend
 
-            index.add_or_update_document(doc)
+            get_search_backend().add_or_update_document(doc)
 
             return Response(self.getNotes(doc))
 
@@ -689,34 +689,31 @@ class UnifiedSearchViewSet(DocumentViewSet):
 
     def filter_queryset(self, queryset):
         if self._is_search_request():
-            from documents import index
+            from documents.search import get_search_backend
 
-            if "query" in self.request.query_params:
-                query_class = index.DelayedFullTextQuery
-            elif "more_like_id" in self.request.query_params:
-                query_class = index.DelayedMoreLikeThisQuery
-            else:
-                raise ValueError
-
-            return query_class(
+            return get_search_backend().query(
                 self.searcher,
                 self.request.query_params,
                 self.paginator.get_page_size(self.request),
                 self.request.user,
+                super().filter_queryset(queryset),
             )
         else:
             return super().filter_queryset(queryset)
 
     def list(self, request, *args, **kwargs):
         if self._is_search_request():
-            from documents import index
+            from documents.search import UnsupportedQueryError
+            from documents.search import get_search_backend
 
             try:
-                with index.open_index_searcher() as s:
+                with get_search_backend().searcher() as s:
                     self.searcher = s
                     return super().list(request)
             except NotFound:
                 raise
+            except UnsupportedQueryError as e:
+                return HttpResponseBadRequest(str(e))
             except Exception as e:
                 logger.warning(f"An error occurred listing search results: {e!s}")
                 return HttpResponseBadRequest(
@@ -954,13 +951,10 @@ class SearchAutoCompleteView(APIView):
         else:
             limit = 10
 
-        from documents import index
-
-        ix = index.open_index()
+        from documents.search import get_search_backend
 
         return Response(
-            index.autocomplete(
-                ix,
+            get_search_backend().autocomplete(
                 term,
                 limit,
                 user,
@@ -66,6 +66,7 @@ def paths_check(app_configs, **kwargs):
         + path_check("PAPERLESS_TRASH_DIR", settings.TRASH_DIR)
         + path_check("PAPERLESS_MEDIA_ROOT", settings.MEDIA_ROOT)
         + path_check("PAPERLESS_CONSUMPTION_DIR", settings.CONSUMPTION_DIR)
+        + path_check("PAPERLESS_OCR_SPLIT_DIR", settings.OCR_SPLIT_DIR)
     )
 
 
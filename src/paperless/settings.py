@@ -198,6 +198,19 @@ def _parse_beat_schedule() -> dict:
                 * 60.0,
             },
         },
+        {
+            "name": "Prune the OCR cache",
+            "env_key": "PAPERLESS_OCR_CACHE_TASK_CRON",
+            # Default daily at 01:30
+            "env_default": "30 1 * * *",
+            "task": "paperless_tesseract.tasks.prune_ocr_cache",
+            "options": {
+                # 1 hour before default schedule sends again
+                "expires": 23.0
+                * 60.0
+                * 60.0,
+            },
+        },
     ]
     for task in tasks:
         # Either get the environment setting or use the default
@@ -247,7 +260,9 @@ TRASH_DIR = os.getenv("PAPERLESS_TRASH_DIR")
 # threads.
 MEDIA_LOCK = MEDIA_ROOT / "media.lock"
 INDEX_DIR = DATA_DIR / "index"
-MODEL_FILE = DATA_DIR / "classification_model.pickle"
+MODEL_FILE = DATA_DIR / "classification_model.bin"
+PREPROCESSED_TEXT_FILE = DATA_DIR / "classification_texts.sqlite3"
+OCR_CACHE_DIR = DATA_DIR / "ocr-cache"
 
 LOGGING_DIR = __get_path("PAPERLESS_LOGGING_DIR", DATA_DIR / "log")
 
@@ -750,6 +765,31 @@ THREADS_PER_WORKER = os.getenv(
     default_threads_per_worker(CELERY_WORKER_CONCURRENCY),
 )
 
+# Where documents are searched, "whoosh" for the index in the data directory
+# or "sqlite" for the full text index of an SQLite database
+SEARCH_BACKEND: Final[str] = os.getenv("PAPERLESS_SEARCH_BACKEND", "whoosh").lower()
+
+# Processes and memory per process in MB used to rebuild the search index
+INDEX_REINDEX_PROCS: Final[int] = __get_int(
+    "PAPERLESS_INDEX_REINDEX_PROCS",
+    min(4, multiprocessing.cpu_count()),
+)
+INDEX_REINDEX_MEMORY: Final[int] = __get_int("PAPERLESS_INDEX_REINDEX_MEMORY", 128)
+
+# Seconds the scheduled optimization may spend merging segments of the index
+INDEX_MERGE_TIME_LIMIT: Final[float] = __get_float(
+    "PAPERLESS_INDEX_MERGE_TIME_LIMIT",
+    60.0,
+)
+
+# Seconds to collect document changes before writing them to the index at
+# once, and the number of changed documents to write the index right away
+INDEX_UPDATE_DELAY: Final[float] = __get_float("PAPERLESS_INDEX_UPDATE_DELAY", 0.5)
+INDEX_UPDATE_BATCH_SIZE: Final[int] = __get_int(
+    "PAPERLESS_INDEX_UPDATE_BATCH_SIZE",
+    100,
+)
+
 ###############################################################################
 # Paperless Specific Settings                                                 #
 ###############################################################################
@@ -871,6 +911,24 @@ OCR_COLOR_CONVERSION_STRATEGY = os.getenv(
 
 OCR_USER_ARGS = os.getenv("PAPERLESS_OCR_USER_ARGS", "{}")
 
+# PDFs with at least this many pages are OCRed in parts by several workers
+OCR_SPLIT_PAGES: Final[int] = __get_int("PAPERLESS_OCR_SPLIT_PAGES", 0)
+
+OCR_SPLIT_PART_PAGES: Final[int] = max(
+    __get_int("PAPERLESS_OCR_SPLIT_PART_PAGES", 20),
+    1,
+)
+
+# Where the parts are stored, which all workers must share. A folder of the
+# scratch directory if not set.
+OCR_SPLIT_DIR = __get_path("PAPERLESS_OCR_SPLIT_DIR")
+
+# Maximum size of the cache of OCR results per page image in megabytes, off
+# unless set
+OCR_CACHE_SIZE: Final[int] = __get_int("PAPERLESS_OCR_CACHE_SIZE", 0)
+# Days after which OCR results not used since are removed from the cache
+OCR_CACHE_MAX_AGE: Final[float] = __get_float("PAPERLESS_OCR_CACHE_MAX_AGE", 30)
+
 # GNUPG needs a home directory for some reason
 GNUPG_HOME = os.getenv("HOME", "/tmp")
 
@@ -1028,6 +1086,11 @@ NLTK_ENABLED: Final[bool] = __get_boolean("PAPERLESS_ENABLE_NLTK", "yes")
 
 NLTK_LANGUAGE: Optional[str] = _get_nltk_language_setting(OCR_LANGUAGE)
 
+CLASSIFIER_VOCABULARY_DRIFT: Final[float] = __get_float(
+    "PAPERLESS_CLASSIFIER_VOCABULARY_DRIFT",
+    0.05,
+)
+
 ###############################################################################
 # Email (SMTP) Backend                                                        #
 ###############################################################################
@@ -37,6 +37,15 @@ class TestChecks(DirectoriesMixin, TestCase):
         for msg in msgs:
             self.assertTrue(msg.msg.endswith("is set but doesn't exist."))
 
+    @override_settings(OCR_SPLIT_DIR=Path("/nonexistent/ocr-split"))
+    def test_paths_check_ocr_split_dir(self):
+        msgs = paths_check(None)
+        self.assertEqual(len(msgs), 1, str(msgs))
+        self.assertEqual(
+            msgs[0].msg,
+            "PAPERLESS_OCR_SPLIT_DIR is set but doesn't exist.",
+        )
+
     def test_paths_check_no_access(self):
         os.chmod(self.dirs.data_dir, 0o000)
         os.chmod(self.dirs.media_dir, 0o000)
@@ -154,6 +154,7 @@ class TestCeleryScheduleParsing(TestCase):
     CLASSIFIER_EXPIRE_TIME = 59.0 * 60.0
     INDEX_EXPIRE_TIME = 23.0 * 60.0 * 60.0
     SANITY_EXPIRE_TIME = ((7.0 * 24.0) - 1.0) * 60.0 * 60.0
+    OCR_CACHE_EXPIRE_TIME = 23.0 * 60.0 * 60.0
 
     def test_schedule_configuration_default(self):
         """
@@ -188,6 +189,11 @@ class TestCeleryScheduleParsing(TestCase):
                     "schedule": crontab(minute=30, hour=0, day_of_week="sun"),
                     "options": {"expires": self.SANITY_EXPIRE_TIME},
                 },
+                "Prune the OCR cache": {
+                    "task": "paperless_tesseract.tasks.prune_ocr_cache",
+                    "schedule": crontab(minute=30, hour=1),
+                    "options": {"expires": self.OCR_CACHE_EXPIRE_TIME},
+                },
             },
             schedule,
         )
@@ -230,6 +236,11 @@ class TestCeleryScheduleParsing(TestCase):
                     "schedule": crontab(minute=30, hour=0, day_of_week="sun"),
                     "options": {"expires": self.SANITY_EXPIRE_TIME},
                 },
+                "Prune the OCR cache": {
+                    "task": "paperless_tesseract.tasks.prune_ocr_cache",
+                    "schedule": crontab(minute=30, hour=1),
+                    "options": {"expires": self.OCR_CACHE_EXPIRE_TIME},
+                },
             },
             schedule,
         )
@@ -264,6 +275,11 @@ class TestCeleryScheduleParsing(TestCase):
                     "schedule": crontab(minute=30, hour=0, day_of_week="sun"),
                     "options": {"expires": self.SANITY_EXPIRE_TIME},
                 },
+                "Prune the OCR cache": {
+                    "task": "paperless_tesseract.tasks.prune_ocr_cache",
+                    "schedule": crontab(minute=30, hour=1),
+                    "options": {"expires": self.OCR_CACHE_EXPIRE_TIME},
+                },
             },
             schedule,
         )
@@ -284,6 +300,7 @@ class TestCeleryScheduleParsing(TestCase):
                 "PAPERLESS_TRAIN_TASK_CRON": "disable",
                 "PAPERLESS_SANITY_TASK_CRON": "disable",
                 "PAPERLESS_INDEX_TASK_CRON": "disable",
+                "PAPERLESS_OCR_CACHE_TASK_CRON": "disable",
             },
         ):
             schedule = _parse_beat_schedule()
@@ -3,6 +3,7 @@ from collections import OrderedDict
 
 from django.contrib.auth.models import Group
 from django.contrib.auth.models import User
+from django.db.models import QuerySet
 from django.db.models.functions import Lower
 from django.http import HttpResponse
 from django.views.generic import View
@@ -27,34 +28,34 @@ class StandardPagination(PageNumberPagination):
     page_size = 25
     page_size_query_param = "page_size"
     max_page_size = 100000
+    # Clients not using the ids of all results may leave them out
+    include_all_query_param = "include_all"
 
     def get_paginated_response(self, data):
-        return Response(
-            OrderedDict(
-                [
-                    ("count", self.page.paginator.count),
-                    ("next", self.get_next_link()),
-                    ("previous", self.get_previous_link()),
-                    ("all", self.get_all_result_ids()),
-                    ("results", data),
-                ],
-            ),
-        )
+        response = [
+            ("count", self.page.paginator.count),
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+        ]
+        if self.get_include_all():
+            response.append(("all", self.get_all_result_ids()))
+        response.append(("results", data))
+        return Response(OrderedDict(response))
+
+    def get_include_all(self):
+        value = self.request.query_params.get(self.include_all_query_param, "true")
+        return value.lower() not in {"false", "0"}
 
     def get_all_result_ids(self):
         ids = []
-        if hasattr(self.page.paginator.object_list, "saved_results"):
-            results_page = self.page.paginator.object_list.saved_results[0]
-            if results_page is not None:
-                for i in range(len(results_page.results.docs())):
-                    try:
-                        fields = results_page.results.fields(i)
-                        if "id" in fields:
-                            ids.append(fields["id"])
-                    except Exception:
-                        pass
+        object_list = self.page.paginator.object_list
+        if hasattr(object_list, "get_result_ids"):
+            ids = object_list.get_result_ids()
+        elif isinstance(object_list, QuerySet):
+            # Only the ids, not every object
+            ids = list(object_list.values_list("pk", flat=True))
         else:
-            for obj in self.page.paginator.object_list:
+            for obj in object_list:
                 if hasattr(obj, "id"):
                     ids.append(obj.id)
                 elif hasattr(obj, "fields"):
@@ -0,0 +1,232 @@
+"""
+An OCRmyPDF plugin which remembers the OCR result of every page image, so
+pages which are OCRed again with the same settings, for example when
+documents are archived again, don't need to go through Tesseract again.
+It also records how long the OCR of every page took. The cache is pruned
+by a scheduled task, not while OCRing.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from ocrmypdf import hookimpl
+from ocrmypdf.builtin_plugins.tesseract_ocr import TesseractOcrEngine
+
+logger = logging.getLogger("paperless.parsing.tesseract")
+
+# The OCRmyPDF options which change the OCR result of a page image
+KEY_OPTIONS = (
+    "languages",
+    "tesseract_oem",
+    "tesseract_config",
+    "tesseract_pagesegmode",
+    "tesseract_thresholding",
+    "tesseract_timeout",
+    "user_words",
+    "user_patterns",
+    "force_ocr",
+    "skip_text",
+    "redo_ocr",
+    "clean",
+    "clean_final",
+    "deskew",
+)
+
+
+# Seconds spent on every page, by input file given to OCRmyPDF and page number
+_page_timings: dict[str, dict[int, float]] = {}
+_page_timings_lock = threading.Lock()
+
+
+def pop_page_timings(input_file) -> dict[int, float]:
+    """
+    Returns the seconds the OCR of every page of input_file took, by page
+    number, and forgets them.
+    """
+    with _page_timings_lock:
+        return _page_timings.pop(os.fspath(input_file), {})
+
+
+def _record_page_timing(options, output_file: Path, seconds: float) -> None:
+    # OCRmyPDF prefixes the files of every page with the page number
+    try:
+        page = int(output_file.name.split("_", 1)[0])
+    except ValueError:
+        return
+    with _page_timings_lock:
+        timings = _page_timings.setdefault(os.fspath(options.input_file), {})
+        timings[page] = timings.get(page, 0.0) + seconds
+
+
+@lru_cache(maxsize=1)
+def _engine_version() -> str:
+    return TesseractOcrEngine.version()
+
+
+def cache_key(input_file: Path, output_type: str, options) -> str:
+    """
+    Returns the key of the OCR result of a page image, made of the pixels of
+    the image, the Tesseract version and the options used.
+    """
+    key = hashlib.sha256()
+    with open(input_file, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            key.update(chunk)
+    key.update(
+        repr(
+            (
+                output_type,
+                _engine_version(),
+                *(getattr(options, name, None) for name in KEY_OPTIONS),
+            ),
+        ).encode(),
+    )
+    return key.hexdigest()
+
+
+def prune_ocr_cache(cache_dir: Path, max_size: int, max_age: float = 0) -> None:
+    """
+    Removes the OCR results not used for more than max_age seconds, if set,
+    and then the least recently used ones until the cache is at most
+    max_size bytes large. Results of deleted documents are never used again,
+    so they are removed this way too.
+    """
+    entries = []
+    for entry_dir in cache_dir.glob("*/*"):
+        if entry_dir.name.startswith("."):
+            continue
+        try:
+            entries.append(
+                (
+                    entry_dir.stat().st_mtime,
+                    sum(f.stat().st_size for f in entry_dir.iterdir()),
+                    entry_dir,
+                ),
+            )
+        except OSError:
+            # Removed by someone else in the meantime
+            continue
+
+    oldest = time.time() - max_age if max_age > 0 else 0
+    total_size = sum(size for _, size, _ in entries)
+    for used, size, entry_dir in sorted(entries):
+        if total_size <= max_size and used >= oldest:
+            break
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        total_size -= size
+
+
+def _is_skipped(output_files: tuple[Path, ...]) -> bool:
+    """
+    Returns whether OCRmyPDF skipped the page instead of Tesseract finishing,
+    e.g. because it timed out. It then writes an empty hOCR or PDF file.
+    """
+    try:
+        return output_files[0].stat().st_size == 0
+    except FileNotFoundError:
+        return True
+
+
+def _store(entry_dir: Path, output_files: tuple[Path, ...]) -> None:
+    entry_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=".", dir=entry_dir.parent))
+    for output_file in output_files:
+        shutil.copyfile(output_file, tmp_dir / f"ocr{output_file.suffix}")
+    try:
+        os.rename(tmp_dir, entry_dir)
+    except OSError:
+        # Another worker OCRed the same page image at the same time
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _generate_cached(
+    generate,
+    input_file: Path,
+    output_files: tuple[Path, ...],
+    options,
+) -> None:
+    if settings.OCR_CACHE_SIZE <= 0:
+        generate()
+        return
+
+    output_type = output_files[0].suffix
+    cache_dir = Path(settings.OCR_CACHE_DIR)
+    key = cache_key(input_file, output_type, options)
+    entry_dir = cache_dir / key[:2] / key
+
+    if entry_dir.is_dir():
+        try:
+            for output_file in output_files:
+                shutil.copyfile(entry_dir / f"ocr{output_file.suffix}", output_file)
+            os.utime(entry_dir)
+            return
+        except OSError:
+            # Pruned in the meantime
+            pass
+
+    generate()
+    if _is_skipped(output_files):
+        # Might work next time, e.g. when the machine is less busy
+        return
+
+    try:
+        _store(entry_dir, output_files)
+    except OSError as e:
+        logger.warning(f"Unable to store the OCR result of a page in the cache: {e}")
+
+
+def _generate_timed(
+    generate,
+    input_file: Path,
+    output_files: tuple[Path, ...],
+    options,
+) -> None:
+    start = time.perf_counter()
+    _generate_cached(generate, input_file, output_files, options)
+    _record_page_timing(options, output_files[0], time.perf_counter() - start)
+
+
+class CachingTesseractOcrEngine(TesseractOcrEngine):
+    """
+    Tesseract, but only for page images it has not seen before.
+    """
+
+    @staticmethod
+    def generate_hocr(input_file, output_hocr, output_text, options):
+        _generate_timed(
+            lambda: TesseractOcrEngine.generate_hocr(
+                input_file,
+                output_hocr,
+                output_text,
+                options,
+            ),
+            Path(input_file),
+            (Path(output_hocr), Path(output_text)),
+            options,
+        )
+
+    @staticmethod
+    def generate_pdf(input_file, output_pdf, output_text, options):
+        _generate_timed(
+            lambda: TesseractOcrEngine.generate_pdf(
+                input_file,
+                output_pdf,
+                output_text,
+                options,
+            ),
+            Path(input_file),
+            (Path(output_pdf), Path(output_text)),
+            options,
+        )
+
+
+@hookimpl
+def get_ocr_engine():
+    return CachingTesseractOcrEngine()
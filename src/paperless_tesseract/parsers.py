@@ -1,8 +1,14 @@
 import json
 import os
 import re
+import shutil
 import subprocess
 import tempfile
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Optional
 
@@ -22,6 +28,249 @@ class RtlLanguageException(Exception):
     pass
 
 
+# OCRmyPDF writes one of these for every range of pages it did not OCR
+SKIPPED_PAGES_PATTERN = re.compile(r"\[OCR skipped on page\(s\) (\d+)(?:-(\d+))?\]")
+
+
+# Seconds between two signs of life of a worker OCRing a part of a document
+SPLIT_HEARTBEAT_INTERVAL = 10
+
+# Seconds without a sign of life after which a part is OCRed by someone else
+SPLIT_STALE_CLAIM = 60
+
+
+def _split_part_path(part_dir: Path, index: int, suffix: str) -> Path:
+    return part_dir / f"part-{index:04d}{suffix}"
+
+
+def _claim_part(claim_file: Path, owner: str, take_over: bool = False) -> bool:
+    """
+    Claims a part for the owner, unless another worker has claimed it already
+    or the part is taken over. Returns whether the part was claimed.
+    """
+    if take_over:
+        # Replaced at once, the previous owner sees the claim is not its own
+        temp_file = claim_file.with_name(f"{claim_file.name}-{owner}")
+        temp_file.write_text(owner)
+        os.replace(temp_file, claim_file)
+        return True
+    try:
+        fd = os.open(claim_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except (FileExistsError, FileNotFoundError):
+        # Another worker is on it, or the whole document is done already
+        return False
+    with os.fdopen(fd, "w") as f:
+        f.write(owner)
+    return True
+
+
+def _owns_claim(claim_file: Path, owner: str) -> bool:
+    try:
+        return claim_file.read_text() == owner
+    except FileNotFoundError:
+        return False
+
+
+def _heartbeat(claim_file: Path, owner: str, stop: threading.Event) -> None:
+    while not stop.wait(SPLIT_HEARTBEAT_INTERVAL):
+        if not _owns_claim(claim_file, owner):
+            # The document is done, or the part was taken over
+            return
+        try:
+            os.utime(claim_file)
+        except FileNotFoundError:
+            return
+
+
+def _claim_is_stale(claim_file: Path) -> bool:
+    try:
+        return time.time() - claim_file.stat().st_mtime > SPLIT_STALE_CLAIM
+    except FileNotFoundError:
+        return False
+
+
+@contextmanager
+def _omp_thread_limit(limit: str):
+    """
+    Sets OMP_THREAD_LIMIT for the Tesseract processes started meanwhile, and
+    restores it afterwards for the other tasks of the worker
+    """
+    previous = os.environ.get("OMP_THREAD_LIMIT")
+    os.environ["OMP_THREAD_LIMIT"] = limit
+    try:
+        yield
+    finally:
+        if previous is None:
+            del os.environ["OMP_THREAD_LIMIT"]
+        else:
+            os.environ["OMP_THREAD_LIMIT"] = previous
+
+
+def ocr_split_part(
+    part_dir: Path,
+    index: int,
+    ocrmypdf_args: dict,
+    take_over: bool = False,
+) -> bool:
+    """
+    OCRs one part of a split document, unless another worker has already
+    claimed it and it is not taken over. Marks the part as done, or records
+    the error, for the worker merging the parts. Returns whether the part was
+    OCRed here.
+
+    While the part is OCRed, the claim is touched regularly, so the merging
+    worker can tell a claim of a worker which died from one which is busy.
+    The results are written to files of this worker, and only renamed to
+    those the merging worker reads if the claim is still its own.
+    """
+    owner = uuid.uuid4().hex
+    claim_file = _split_part_path(part_dir, index, ".claim")
+    if not _claim_part(claim_file, owner, take_over):
+        return False
+
+    import ocrmypdf
+
+    from paperless_tesseract.ocr_cache import pop_page_timings
+
+    input_file = _split_part_path(part_dir, index, ".pdf")
+    outputs = {
+        suffix: _split_part_path(part_dir, index, f"-{owner}{suffix}")
+        for suffix in ("-archive.pdf", "-sidecar.txt", "-timings.json")
+    }
+    stop_heartbeat = threading.Event()
+    threading.Thread(
+        target=_heartbeat,
+        args=(claim_file, owner, stop_heartbeat),
+        daemon=True,
+    ).start()
+    try:
+        # This forces tesseract to use one core per page.
+        with _omp_thread_limit("1"):
+            ocrmypdf.ocr(
+                **{
+                    **ocrmypdf_args,
+                    "input_file": input_file,
+                    "output_file": outputs["-archive.pdf"],
+                    "sidecar": outputs["-sidecar.txt"],
+                },
+            )
+    except Exception as e:
+        pop_page_timings(input_file)
+        if _owns_claim(claim_file, owner):
+            _split_part_path(part_dir, index, ".error").write_text(
+                f"{e.__class__.__name__}: {e!s}",
+            )
+        return True
+    else:
+        outputs["-timings.json"].write_text(json.dumps(pop_page_timings(input_file)))
+        if not _owns_claim(claim_file, owner):
+            # Taken over, the results of the new owner are used
+            for output in outputs.values():
+                output.unlink(missing_ok=True)
+            return False
+        for suffix, output in outputs.items():
+            os.replace(output, _split_part_path(part_dir, index, suffix))
+        _split_part_path(part_dir, index, ".done").touch()
+        return True
+    finally:
+        stop_heartbeat.set()
+
+
+def _wait_for_part(result, timeout: float) -> None:
+    """
+    Waits up to timeout seconds for the task OCRing a part to finish
+    """
+    if result is None:
+        # Not handed out, only a worker taking it over on its own may OCR it
+        time.sleep(timeout)
+        return
+
+    from celery.exceptions import TimeoutError
+
+    try:
+        # The parts are OCRed by other tasks, no task waits for this one
+        result.get(timeout=timeout, propagate=False, disable_sync_subtasks=False)
+    except TimeoutError:
+        pass
+
+
+def split_sidecar(text: str) -> list[Optional[str]]:
+    """
+    Splits the text of a sidecar file into the text of every page, which is
+    None for pages OCRmyPDF did not OCR.
+    """
+    page_texts = []
+    for page_text in text.split("\f"):
+        skipped = SKIPPED_PAGES_PATTERN.fullmatch(page_text.strip())
+        if skipped:
+            first = int(skipped.group(1))
+            last = int(skipped.group(2) or first)
+            page_texts.extend([None] * (last - first + 1))
+        else:
+            page_texts.append(page_text)
+    return page_texts
+
+
+def _copy_outline(source, target) -> None:
+    """
+    Copies the outline of the source PDF to the target PDF, which has the
+    same pages in the same order. Entries pointing to a page point to the
+    same page of the target, other entries are copied without a destination.
+    """
+    import pikepdf
+    from pikepdf import OutlineItem
+
+    page_numbers = {page.objgen: number for number, page in enumerate(source.pages)}
+
+    def resolve(destination):
+        if isinstance(destination, pikepdf.Name) and "/Dests" in source.Root:
+            destination = source.Root.Dests.get(destination)
+        elif isinstance(destination, pikepdf.String) and "/Dests" in source.Root.get(
+            "/Names",
+            {},
+        ):
+            destination = pikepdf.NameTree(source.Root.Names.Dests).get(
+                str(destination),
+            )
+        if isinstance(destination, pikepdf.Dictionary):
+            destination = destination.get("/D")
+        return destination
+
+    def copy_destination(item: OutlineItem):
+        destination = item.destination
+        if (
+            destination is None
+            and item.action is not None
+            and item.action.get("/S") == pikepdf.Name.GoTo
+        ):
+            destination = item.action.get("/D")
+        destination = resolve(destination)
+        if (
+            not isinstance(destination, pikepdf.Array)
+            or len(destination) == 0
+            or not isinstance(destination[0], pikepdf.Dictionary)
+            or destination[0].objgen not in page_numbers
+        ):
+            return None
+        page = target.pages[page_numbers[destination[0].objgen]]
+        return pikepdf.Array([page.obj, *list(destination)[1:]])
+
+    def copy_items(items: list[OutlineItem]) -> list[OutlineItem]:
+        copies = []
+        for item in items:
+            copy = OutlineItem(str(item.title))
+            copy.destination = copy_destination(item)
+            copy.is_closed = item.is_closed
+            copy.children.extend(copy_items(item.children))
+            copies.append(copy)
+        return copies
+
+    items = copy_items(source.open_outline().root)
+    if items:
+        with target.open_outline() as outline:
+            outline.root[:] = items
+
+
 class RasterisedDocumentParser(DocumentParser):
     """
     This parser uses Tesseract to try and get some text out of a rasterised
@@ -173,7 +422,12 @@ class RasterisedDocumentParser(DocumentParser):
         output_file,
         sidecar_file,
         safe_fallback=False,
+        limit_pages=True,
     ):
+        """
+        limit_pages is False if the input file contains only pages selected
+        for OCR already, so that PAPERLESS_OCR_PAGES does not apply to it
+        """
         ocrmypdf_args = {
             "input_file": input_file,
             "output_file": output_file,
@@ -219,7 +473,9 @@ class RasterisedDocumentParser(DocumentParser):
                 "rotate_pages_threshold"
             ] = settings.OCR_ROTATE_PAGES_THRESHOLD
 
-        if settings.OCR_PAGES > 0:
+        ocrmypdf_args["plugins"] = ["paperless_tesseract.ocr_cache"]
+
+        if limit_pages and settings.OCR_PAGES > 0:
             ocrmypdf_args["pages"] = f"1-{settings.OCR_PAGES}"
         else:
             # sidecar is incompatible with pages
@@ -281,7 +537,338 @@ class RasterisedDocumentParser(DocumentParser):
 
         return ocrmypdf_args
 
+    def get_split_page_ranges(
+        self,
+        document_path: Path,
+        mime_type,
+    ) -> list[tuple[int, int]]:
+        """
+        Returns the page ranges of the parts to OCR in parallel, or an empty
+        list if the document is OCRed as a whole.
+        """
+        if (
+            mime_type != "application/pdf"
+            or settings.OCR_SPLIT_PAGES <= 0
+            or settings.OCR_PAGES > 0
+        ):
+            return []
+
+        import pikepdf
+
+        try:
+            with pikepdf.open(document_path) as pdf:
+                page_count = len(pdf.pages)
+        except Exception as e:
+            self.log.debug(f"Not splitting {document_path} for OCR: {e!s}")
+            return []
+
+        if page_count < settings.OCR_SPLIT_PAGES:
+            return []
+
+        part_pages = settings.OCR_SPLIT_PART_PAGES
+        page_ranges = [
+            (start, min(start + part_pages, page_count))
+            for start in range(0, page_count, part_pages)
+        ]
+        return page_ranges if len(page_ranges) > 1 else []
+
+    def dispatch_split_parts(self, part_dir: Path, count: int, ocrmypdf_args):
+        """
+        Hands out the parts to the task workers, and returns the results of
+        their tasks by the index of the part, or None if that failed
+        """
+        from celery import group
+
+        from paperless_tesseract.tasks import ocr_split_part as ocr_split_part_task
+
+        try:
+            return (
+                group(
+                    ocr_split_part_task.s(str(part_dir), index, ocrmypdf_args)
+                    for index in range(count)
+                )
+                .apply_async()
+                .results
+            )
+        except Exception as e:
+            self.log.warning(
+                f"Unable to hand out parts of the document to other workers, "
+                f"all parts are OCRed here: {e!s}",
+            )
+            return None
+
+    def ocr_split(self, page_ranges: list[tuple[int, int]], ocrmypdf_args):
+        """
+        Splits the document into parts which are OCRed by any idle worker,
+        including this one, and merges their archive files and sidecars.
+        The parts are stored in PAPERLESS_OCR_SPLIT_DIR, which workers on
+        other machines must share.
+        """
+        split_dir = Path(
+            settings.OCR_SPLIT_DIR or Path(settings.SCRATCH_DIR) / "ocr-split",
+        )
+        split_dir.mkdir(parents=True, exist_ok=True)
+        part_dir = Path(tempfile.mkdtemp(prefix="paperless-split-", dir=split_dir))
+        try:
+            self.ocr_parts(part_dir, page_ranges, ocrmypdf_args)
+        finally:
+            # Tasks of parts OCRed here find nothing left to do
+            shutil.rmtree(part_dir, ignore_errors=True)
+
+    def ocr_parts(
+        self,
+        part_dir: Path,
+        page_ranges: list[tuple[int, int]],
+        ocrmypdf_args,
+    ):
+        """
+        OCRs the parts of the document in part_dir, waiting for the tasks of
+        the parts claimed by other workers, and merges them
+        """
+        import pikepdf
+
+        with pikepdf.open(ocrmypdf_args["input_file"]) as pdf:
+            for index, (start, end) in enumerate(page_ranges):
+                with pikepdf.new() as part:
+                    part.pages.extend(pdf.pages[start:end])
+                    if index == 0:
+                        # OCRmyPDF carries the metadata over to the archive file
+                        part.docinfo = part.copy_foreign(pdf.docinfo)
+                        if "/Metadata" in pdf.Root:
+                            part.Root.Metadata = part.copy_foreign(
+                                pdf.Root.Metadata,
+                            )
+                    part.save(_split_part_path(part_dir, index, ".pdf"))
+
+        self.log.info(
+            f"OCRing {len(page_ranges)} parts of {page_ranges[-1][1]} pages "
+            f"in parallel",
+        )
+        results = self.dispatch_split_parts(part_dir, len(page_ranges), ocrmypdf_args)
+
+        # The other workers take the parts in order, start at the other end
+        for index in reversed(range(len(page_ranges))):
+            ocr_split_part(part_dir, index, ocrmypdf_args)
+
+        # Only wait for half the time left before the task is killed, so
+        # there is time to OCR the whole document here if a part is late
+        now = time.monotonic()
+        deadline = (
+            now + (self.parse_started + settings.CELERY_TASK_TIME_LIMIT - now) / 2
+        )
+        for index, (start, end) in enumerate(page_ranges):
+            result = results[index] if results else None
+            while True:
+                # The task may finish right after the part was found not done
+                finished = result is not None and result.ready()
+                if _split_part_path(part_dir, index, ".done").exists():
+                    break
+                error_file = _split_part_path(part_dir, index, ".error")
+                if error_file.exists():
+                    raise ParseError(
+                        f"OCR of pages {start + 1} to {end} failed: "
+                        f"{error_file.read_text()}",
+                    )
+                claim_file = _split_part_path(part_dir, index, ".claim")
+                if finished or _claim_is_stale(claim_file):
+                    self.log.warning(
+                        f"The worker OCRing pages {start + 1} to {end} stopped "
+                        f"responding, OCRing them here",
+                    )
+                    # The part is only OCRed here once
+                    result = None
+                    ocr_split_part(part_dir, index, ocrmypdf_args, take_over=True)
+                    continue
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    raise ParseError(
+                        f"Timed out waiting for OCR of pages {start + 1} to {end}",
+                    )
+                _wait_for_part(result, min(left, SPLIT_HEARTBEAT_INTERVAL))
+
+        for index, (start, end) in enumerate(page_ranges):
+            timings = json.loads(
+                _split_part_path(part_dir, index, "-timings.json").read_text(),
+            )
+            self.add_page_timings(
+                {int(page): seconds for page, seconds in timings.items()},
+                list(range(start + 1, end + 1)),
+            )
+
+        with ExitStack() as stack:
+            archive = stack.enter_context(
+                pikepdf.open(_split_part_path(part_dir, 0, "-archive.pdf")),
+            )
+            for index in range(1, len(page_ranges)):
+                part = stack.enter_context(
+                    pikepdf.open(_split_part_path(part_dir, index, "-archive.pdf")),
+                )
+                archive.pages.extend(part.pages)
+            # The metadata of the first part is that of the document, as
+            # converted by OCRmyPDF. Outline and page labels refer to pages
+            # of the whole document, so the parts have none.
+            original = stack.enter_context(pikepdf.open(ocrmypdf_args["input_file"]))
+            _copy_outline(original, archive)
+            if "/PageLabels" in original.Root:
+                archive.Root.PageLabels = archive.copy_foreign(
+                    original.Root.PageLabels,
+                )
+            archive.save(ocrmypdf_args["output_file"])
+
+        # Pages in a sidecar are separated by form feeds
+        Path(ocrmypdf_args["sidecar"]).write_bytes(
+            b"\f".join(
+                _split_part_path(part_dir, index, "-sidecar.txt").read_bytes()
+                for index in range(len(page_ranges))
+            ),
+        )
+
+    def add_page_timings(
+        self,
+        timings: dict[int, float],
+        pages: Optional[list[int]] = None,
+    ):
+        """
+        Adds the seconds spent on the pages of a file given to OCRmyPDF. pages
+        are the numbers of these pages in the document, if the file contains
+        only some pages of it.
+        """
+        for page, seconds in timings.items():
+            if pages is not None:
+                page = pages[page - 1]
+            self.ocr_page_timings[page] = self.ocr_page_timings.get(page, 0.0) + seconds
+
+    def run_ocrmypdf(self, ocrmypdf_args, pages: Optional[list[int]] = None):
+        import ocrmypdf
+
+        from paperless_tesseract.ocr_cache import pop_page_timings
+
+        try:
+            ocrmypdf.ocr(**ocrmypdf_args)
+        finally:
+            self.add_page_timings(
+                pop_page_timings(ocrmypdf_args["input_file"]),
+                pages,
+            )
+
+    def get_page_texts(
+        self,
+        sidecar_file: Path,
+        pdf_file: Path,
+    ) -> Optional[list[Optional[str]]]:
+        """
+        Returns the text OCRmyPDF found on every page of the PDF, which is None
+        for the pages it did not OCR, or None if this is unknown.
+        """
+        if not os.path.isfile(sidecar_file):
+            return None
+
+        import pikepdf
+
+        page_texts = split_sidecar(self.read_file_handle_unicode_errors(sidecar_file))
+        try:
+            with pikepdf.open(pdf_file) as pdf:
+                page_count = len(pdf.pages)
+        except Exception:
+            return None
+        return page_texts if len(page_texts) == page_count else None
+
+    def ocr(self, mime_type, ocrmypdf_args):
+        page_ranges = self.get_split_page_ranges(
+            ocrmypdf_args["input_file"],
+            mime_type,
+        )
+        if page_ranges:
+            try:
+                self.ocr_split(page_ranges, ocrmypdf_args)
+                return
+            except Exception as e:
+                self.log.warning(
+                    f"Error while OCRing the document in parts: {e!s}. "
+                    f"OCRing the whole document instead.",
+                )
+        self.run_ocrmypdf(ocrmypdf_args)
+
+    def ocr_fallback(
+        self,
+        document_path: Path,
+        mime_type,
+        page_texts: Optional[list[Optional[str]]],
+    ):
+        """
+        Runs OCR with safe settings on the pages in ocr_fallback_pages, or on
+        the whole document if these are not known, and sets the text.
+        """
+        archive_path_fallback = Path(
+            os.path.join(self.tempdir, "archive-fallback.pdf"),
+        )
+        sidecar_file_fallback = Path(
+            os.path.join(self.tempdir, "sidecar-fallback.txt"),
+        )
+
+        try:
+            input_file = document_path
+            if self.ocr_fallback_pages is not None:
+                import pikepdf
+
+                input_file = Path(os.path.join(self.tempdir, "fallback-pages.pdf"))
+                with pikepdf.open(document_path) as pdf, pikepdf.new() as fallback:
+                    fallback.pages.extend(
+                        pdf.pages[page - 1] for page in self.ocr_fallback_pages
+                    )
+                    fallback.save(input_file)
+
+            # Attempt to run OCR with safe settings.
+
+            args = self.construct_ocrmypdf_parameters(
+                input_file,
+                mime_type,
+                archive_path_fallback,
+                sidecar_file_fallback,
+                safe_fallback=True,
+                limit_pages=self.ocr_fallback_pages is None,
+            )
+
+            self.log.debug(f"Fallback: Calling OCRmyPDF with args: {args}")
+            self.run_ocrmypdf(args, self.ocr_fallback_pages)
+
+            # Don't return the archived file here, since this file
+            # is bigger and blurry due to --force-ocr.
+
+            if self.ocr_fallback_pages is None:
+                import pikepdf
+
+                with pikepdf.open(archive_path_fallback) as pdf:
+                    page_count = len(pdf.pages)
+                if settings.OCR_PAGES > 0:
+                    page_count = min(page_count, settings.OCR_PAGES)
+                self.ocr_fallback_pages = list(range(1, page_count + 1))
+            elif os.path.isfile(sidecar_file_fallback):
+                fallback_texts = split_sidecar(
+                    self.read_file_handle_unicode_errors(sidecar_file_fallback),
+                )
+                if len(fallback_texts) == len(self.ocr_fallback_pages):
+                    for page, page_text in zip(
+                        self.ocr_fallback_pages,
+                        fallback_texts,
+                    ):
+                        page_texts[page - 1] = page_text
+                    self.text = post_process_text(
+                        "\f".join(page_text or "" for page_text in page_texts),
+                    )
+                    return
+
+            self.text = self.extract_text(
+                sidecar_file_fallback,
+                archive_path_fallback,
+            )
+
+        except Exception as e:
+            # If this fails, we have a serious issue at hand.
+            raise ParseError(f"{e.__class__.__name__}: {e!s}") from e
+
     def parse(self, document_path: Path, mime_type, file_name=None):
+        self.parse_started = time.monotonic()
         # This forces tesseract to use one core per page.
         os.environ["OMP_THREAD_LIMIT"] = "1"
         VALID_TEXT_LENGTH = 50
@@ -310,7 +897,6 @@ class RasterisedDocumentParser(DocumentParser):
         # file created, so OCR the file and create an archive with any
         # text located via OCR
 
-        import ocrmypdf
         from ocrmypdf import EncryptedPdfError
         from ocrmypdf import InputFileError
         from ocrmypdf import SubprocessOutputError
@@ -327,7 +913,7 @@ class RasterisedDocumentParser(DocumentParser):
 
         try:
             self.log.debug(f"Calling OCRmyPDF with args: {args}")
-            ocrmypdf.ocr(**args)
+            self.ocr(mime_type, args)
 
             if settings.OCR_SKIP_ARCHIVE_FILE != "always":
                 self.archive_path = archive_path
@@ -354,43 +940,40 @@ class RasterisedDocumentParser(DocumentParser):
                 f"SubprocessOutputError: {e!s}. See logs for more information.",
             ) from e
         except (NoTextFoundException, InputFileError) as e:
-            self.log.warning(
-                f"Encountered an error while running OCR: {e!s}. "
-                f"Attempting force OCR to get the text.",
-            )
-
-            archive_path_fallback = Path(
-                os.path.join(self.tempdir, "archive-fallback.pdf"),
-            )
-            sidecar_file_fallback = Path(
-                os.path.join(self.tempdir, "sidecar-fallback.txt"),
-            )
-
-            # Attempt to run OCR with safe settings.
-
-            args = self.construct_ocrmypdf_parameters(
-                document_path,
-                mime_type,
-                archive_path_fallback,
-                sidecar_file_fallback,
-                safe_fallback=True,
-            )
-
-            try:
-                self.log.debug(f"Fallback: Calling OCRmyPDF with args: {args}")
-                ocrmypdf.ocr(**args)
-
-                # Don't return the archived file here, since this file
-                # is bigger and blurry due to --force-ocr.
-
-                self.text = self.extract_text(
-                    sidecar_file_fallback,
-                    archive_path_fallback,
+            # When OCR ran and found no text at all, only the pages OCRmyPDF
+            # skipped because of their text layer are worth another try.
+            # Tesseract would see the other pages just like before.
+            page_texts = None
+            if isinstance(e, NoTextFoundException) and mime_type == "application/pdf":
+                page_texts = self.get_page_texts(sidecar_file, document_path)
+
+            if page_texts is None:
+                self.ocr_fallback_pages = None
+            else:
+                # OCRmyPDF reports the pages after PAPERLESS_OCR_PAGES as
+                # skipped as well
+                self.ocr_fallback_pages = [
+                    page
+                    for page, page_text in enumerate(page_texts, start=1)
+                    if page_text is None
+                    and (settings.OCR_PAGES <= 0 or page <= settings.OCR_PAGES)
+                ]
+
+            if self.ocr_fallback_pages == []:
+                self.log.warning(
+                    f"Encountered an error while running OCR: {e!s}. "
+                    f"All pages were OCRed already, not attempting force OCR.",
+                )
+            else:
+                self.log.warning(
+                    f"Encountered an error while running OCR: {e!s}. "
+                    f"Attempting force OCR to get the text.",
+                )
+                self.ocr_fallback(
+                    document_path,
+                    mime_type,
+                    page_texts,
                 )
-
-            except Exception as e:
-                # If this fails, we have a serious issue at hand.
-                raise ParseError(f"{e.__class__.__name__}: {e!s}") from e
 
         except Exception as e:
             # Anything else is probably serious.
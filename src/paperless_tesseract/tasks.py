@@ -0,0 +1,40 @@
+import logging
+from pathlib import Path
+
+from celery import shared_task
+from django.conf import settings
+
+from paperless_tesseract import ocr_cache
+from paperless_tesseract import parsers
+
+logger = logging.getLogger("paperless.parsing.tesseract")
+
+
+@shared_task
+def ocr_split_part(part_dir: str, index: int, ocrmypdf_args: dict) -> bool:
+    part_dir = Path(part_dir)
+    if not part_dir.parent.is_dir():
+        logger.warning(
+            f"Unable to help OCRing a split document, {part_dir.parent} does "
+            f"not exist on this worker. Set PAPERLESS_OCR_SPLIT_DIR to a "
+            f"directory all workers share.",
+        )
+        return False
+    # Does nothing if the document is done already
+    return parsers.ocr_split_part(part_dir, index, ocrmypdf_args)
+
+
+@shared_task
+def prune_ocr_cache():
+    """
+    Shrinks the OCR cache to its configured size and removes the results not
+    used for too long. Removes the whole cache once it is disabled.
+    """
+    cache_dir = Path(settings.OCR_CACHE_DIR)
+    if not cache_dir.is_dir():
+        return
+    ocr_cache.prune_ocr_cache(
+        cache_dir,
+        max(settings.OCR_CACHE_SIZE, 0) * 1024 * 1024,
+        settings.OCR_CACHE_MAX_AGE * 24 * 60 * 60,
+    )
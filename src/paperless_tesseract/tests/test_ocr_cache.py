@@ -0,0 +1,265 @@
+import os
+import shutil
+import time
+from argparse import Namespace
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase
+from django.test import override_settings
+from ocrmypdf.builtin_plugins.tesseract_ocr import TesseractOcrEngine
+
+from documents.tests.utils import DirectoriesMixin
+from paperless_tesseract import tasks
+from paperless_tesseract.ocr_cache import CachingTesseractOcrEngine
+from paperless_tesseract.ocr_cache import cache_key
+from paperless_tesseract.ocr_cache import pop_page_timings
+from paperless_tesseract.ocr_cache import prune_ocr_cache
+from paperless_tesseract.parsers import RasterisedDocumentParser
+
+
+def fake_generate_pdf(input_file, output_pdf, output_text, options):
+    Path(output_pdf).write_bytes(b"%PDF " + Path(input_file).read_bytes())
+    Path(output_text).write_text(f"text of {Path(input_file).name}")
+
+
+@mock.patch("paperless_tesseract.ocr_cache._engine_version", lambda: "5.3.0")
+@mock.patch.object(TesseractOcrEngine, "generate_pdf", side_effect=fake_generate_pdf)
+@override_settings(OCR_CACHE_SIZE=1024)
+class TestOcrCache(DirectoriesMixin, TestCase):
+    SAMPLE_FILES = Path(__file__).resolve().parent / "samples"
+
+    def setUp(self):
+        super().setUp()
+        self.options = Namespace(
+            input_file="document.pdf",
+            languages=["eng"],
+            tesseract_timeout=180.0,
+        )
+        self.image = self.dirs.scratch_dir / "page.png"
+        shutil.copy(self.SAMPLE_FILES / "simple.png", self.image)
+        self.addCleanup(pop_page_timings, "document.pdf")
+
+    def generate_pdf(self, image: Path, options=None) -> tuple[bytes, str]:
+        output_pdf = self.dirs.scratch_dir / "000001_ocr_tess.pdf"
+        output_text = self.dirs.scratch_dir / "000001_ocr_tess.txt"
+        CachingTesseractOcrEngine.generate_pdf(
+            image,
+            output_pdf,
+            output_text,
+            options or self.options,
+        )
+        result = output_pdf.read_bytes(), output_text.read_text()
+        output_pdf.unlink()
+        output_text.unlink()
+        return result
+
+    def test_cached_page(self, m):
+        """
+        GIVEN:
+            - A page image which was OCRed before
+        WHEN:
+            - The page image is OCRed again with the same settings
+        THEN:
+            - The cached result is used without running Tesseract
+        """
+        first = self.generate_pdf(self.image)
+
+        copy = self.dirs.scratch_dir / "copy.png"
+        shutil.copy(self.image, copy)
+        second = self.generate_pdf(copy)
+
+        m.assert_called_once()
+        self.assertEqual(first, second)
+        self.assertEqual(second[1], "text of page.png")
+
+    def test_changed_page_or_settings(self, m):
+        """
+        GIVEN:
+            - A page image which was OCRed before
+        WHEN:
+            - A different page image is OCRed
+            - The page image is OCRed with a different language
+        THEN:
+            - Tesseract is run for both
+        """
+        self.generate_pdf(self.image)
+
+        other = self.dirs.scratch_dir / "other.png"
+        shutil.copy(self.SAMPLE_FILES / "simple-alpha.png", other)
+        self.generate_pdf(other)
+        self.generate_pdf(
+            self.image,
+            Namespace(
+                input_file="document.pdf",
+                languages=["deu"],
+                tesseract_timeout=180.0,
+            ),
+        )
+
+        self.assertEqual(m.call_count, 3)
+
+    def test_prune(self, m):
+        """
+        GIVEN:
+            - A cache with the OCR results of two page images
+        WHEN:
+            - The cache is pruned to less than its size
+        THEN:
+            - The least recently used result is removed
+        """
+        other = self.dirs.scratch_dir / "other.png"
+        shutil.copy(self.SAMPLE_FILES / "simple-alpha.png", other)
+        self.generate_pdf(self.image)
+        self.generate_pdf(other)
+
+        cache_dir = Path(settings.OCR_CACHE_DIR)
+        image_key = cache_key(self.image, ".pdf", self.options)
+        other_key = cache_key(other, ".pdf", self.options)
+        image_entry = cache_dir / image_key[:2] / image_key
+        other_entry = cache_dir / other_key[:2] / other_key
+        os.utime(image_entry, (0, 0))
+
+        prune_ocr_cache(
+            cache_dir,
+            sum(f.stat().st_size for f in other_entry.iterdir()),
+        )
+        self.assertEqual(list(cache_dir.glob("*/*")), [other_entry])
+
+        prune_ocr_cache(cache_dir, 0)
+        self.assertEqual(list(cache_dir.glob("*/*")), [])
+
+    def test_prune_unused(self, m):
+        """
+        GIVEN:
+            - A cache with the OCR results of two page images
+            - One of them was not used for a day
+        WHEN:
+            - The cache is pruned to results used within the last hour
+        THEN:
+            - The result not used for a day is removed
+        """
+        other = self.dirs.scratch_dir / "other.png"
+        shutil.copy(self.SAMPLE_FILES / "simple-alpha.png", other)
+        self.generate_pdf(self.image)
+        self.generate_pdf(other)
+
+        cache_dir = Path(settings.OCR_CACHE_DIR)
+        image_key = cache_key(self.image, ".pdf", self.options)
+        other_key = cache_key(other, ".pdf", self.options)
+        image_entry = cache_dir / image_key[:2] / image_key
+        other_entry = cache_dir / other_key[:2] / other_key
+        day_ago = time.time() - 24 * 60 * 60
+        os.utime(image_entry, (day_ago, day_ago))
+
+        prune_ocr_cache(cache_dir, 1024 * 1024, 60 * 60)
+        self.assertEqual(list(cache_dir.glob("*/*")), [other_entry])
+
+    def test_prune_task(self, m):
+        """
+        GIVEN:
+            - A cache with the OCR result of a page image
+        WHEN:
+            - A page image is OCRed
+            - The scheduled task prunes the cache
+            - The task runs again after the cache was disabled
+        THEN:
+            - The cache is not pruned while OCRing
+            - The task keeps the result while it fits
+            - The task removes the whole cache once it is disabled
+        """
+        with mock.patch(
+            "paperless_tesseract.ocr_cache.prune_ocr_cache",
+            wraps=prune_ocr_cache,
+        ) as prune:
+            self.generate_pdf(self.image)
+            prune.assert_not_called()
+
+            tasks.prune_ocr_cache()
+            prune.assert_called_once()
+        cache_dir = Path(settings.OCR_CACHE_DIR)
+        self.assertEqual(len(list(cache_dir.glob("*/*"))), 1)
+
+        with override_settings(OCR_CACHE_SIZE=0):
+            tasks.prune_ocr_cache()
+        self.assertEqual(list(cache_dir.glob("*/*")), [])
+
+    def test_skipped_page_not_cached(self, m):
+        """
+        GIVEN:
+            - A page image Tesseract did not finish, e.g. because it timed out
+        WHEN:
+            - The page image is OCRed again with the same settings
+        THEN:
+            - Tesseract is run again and the skipped result is not cached
+        """
+
+        def skip_page(input_file, output_pdf, output_text, options):
+            # What OCRmyPDF writes if Tesseract times out
+            Path(output_pdf).write_bytes(b"")
+            Path(output_text).write_text("[skipped page]")
+
+        m.side_effect = skip_page
+        self.assertEqual(self.generate_pdf(self.image), (b"", "[skipped page]"))
+        self.assertEqual(list(Path(settings.OCR_CACHE_DIR).glob("*/*")), [])
+
+        m.side_effect = fake_generate_pdf
+        second = self.generate_pdf(self.image)
+
+        self.assertEqual(m.call_count, 2)
+        self.assertEqual(second[1], "text of page.png")
+
+    @override_settings(OCR_CACHE_SIZE=0)
+    def test_cache_disabled(self, m):
+        """
+        GIVEN:
+            - The OCR cache is disabled
+        WHEN:
+            - A page image is OCRed twice
+        THEN:
+            - Tesseract is run both times and nothing is cached
+        """
+        self.generate_pdf(self.image)
+        self.generate_pdf(self.image)
+
+        self.assertEqual(m.call_count, 2)
+        self.assertFalse(Path(settings.OCR_CACHE_DIR).exists())
+
+    def test_page_timings(self, m):
+        """
+        GIVEN:
+            - Pages of a document which are OCRed
+        WHEN:
+            - The page timings of the document are requested
+        THEN:
+            - The time spent on every page is returned once
+        """
+        self.generate_pdf(self.image)
+        self.generate_pdf(self.image)
+        output_pdf = self.dirs.scratch_dir / "000003_ocr_tess.pdf"
+        CachingTesseractOcrEngine.generate_pdf(
+            self.image,
+            output_pdf,
+            self.dirs.scratch_dir / "000003_ocr_tess.txt",
+            self.options,
+        )
+
+        timings = pop_page_timings("document.pdf")
+
+        self.assertCountEqual(timings.keys(), [1, 3])
+        self.assertEqual(pop_page_timings("document.pdf"), {})
+
+    def test_ocrmypdf_parameters(self, m):
+        """
+        GIVEN:
+            - A parser
+        WHEN:
+            - The OCRmyPDF parameters are constructed
+        THEN:
+            - The OCR cache plugin is used
+        """
+        parser = RasterisedDocumentParser(None)
+
+        params = parser.construct_ocrmypdf_parameters("", "", "", "")
+        self.assertEqual(params["plugins"], ["paperless_tesseract.ocr_cache"])
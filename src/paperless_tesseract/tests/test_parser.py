@@ -6,8 +6,10 @@ from contextlib import AbstractContextManager
 from pathlib import Path
 from unittest import mock
 
+import pikepdf
 from django.test import TestCase
 from django.test import override_settings
+from ocrmypdf import InputFileError
 from ocrmypdf import SubprocessOutputError
 
 from documents.parsers import ParseError
@@ -15,7 +17,9 @@ from documents.parsers import run_convert
 from documents.tests.utils import DirectoriesMixin
 from documents.tests.utils import FileSystemAssertsMixin
 from paperless_tesseract.parsers import RasterisedDocumentParser
+from paperless_tesseract.parsers import ocr_split_part
 from paperless_tesseract.parsers import post_process_text
+from paperless_tesseract.parsers import split_sidecar
 
 image_to_string_calls = []
 
@@ -92,6 +96,7 @@ class TestParser(DirectoriesMixin, FileSystemAssertsMixin, TestCase):
         )
         self.assertIsFile(thumb)
 
+    @mock.patch("documents.parsers.pypdfium2", None)
     @mock.patch("documents.parsers.run_convert")
     def test_thumbnail_fallback(self, m):
         def call_convert(input_file, output_file, **kwargs):
@@ -841,6 +846,515 @@ class TestParser(DirectoriesMixin, FileSystemAssertsMixin, TestCase):
         )
 
 
+def fake_ocr(input_file, output_file, sidecar, **kwargs):
+    # Every page of the test documents is identified by its width
+    shutil.copy(input_file, output_file)
+    with pikepdf.open(input_file) as pdf:
+        widths = [int(page.mediabox[2]) for page in pdf.pages]
+    Path(sidecar).write_text("\f".join(f"page {width}" for width in widths))
+
+
+@override_settings(OCR_MODE="force", OCR_SPLIT_PAGES=4, OCR_SPLIT_PART_PAGES=2)
+@mock.patch("ocrmypdf.ocr", side_effect=fake_ocr)
+class TestParserSplitOcr(DirectoriesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.document_path = Path(self.dirs.scratch_dir) / "document.pdf"
+        with pikepdf.new() as pdf:
+            for width in range(100, 105):
+                pdf.add_blank_page(page_size=(width, 100))
+            pdf.save(self.document_path)
+
+    def assertDocumentParsed(self, parser: RasterisedDocumentParser):
+        with pikepdf.open(parser.get_archive_path()) as pdf:
+            self.assertEqual(
+                [int(page.mediabox[2]) for page in pdf.pages],
+                [100, 101, 102, 103, 104],
+            )
+        self.assertEqual(
+            parser.get_text(),
+            "page 100 page 101 page 102 page 103 page 104",
+        )
+
+    def test_split_page_ranges(self, m):
+        """
+        GIVEN:
+            - A PDF with 5 pages
+        WHEN:
+            - The page ranges to OCR in parallel are determined
+        THEN:
+            - The PDF is split into parts of the configured number of pages
+            - The PDF is not split if it is too small, or only some pages are OCRed
+        """
+        parser = RasterisedDocumentParser(None)
+
+        self.assertEqual(
+            parser.get_split_page_ranges(self.document_path, "application/pdf"),
+            [(0, 2), (2, 4), (4, 5)],
+        )
+        self.assertEqual(
+            parser.get_split_page_ranges(self.document_path, "image/tiff"),
+            [],
+        )
+        with override_settings(OCR_SPLIT_PAGES=6):
+            self.assertEqual(
+                parser.get_split_page_ranges(self.document_path, "application/pdf"),
+                [],
+            )
+        with override_settings(OCR_SPLIT_PART_PAGES=5):
+            self.assertEqual(
+                parser.get_split_page_ranges(self.document_path, "application/pdf"),
+                [],
+            )
+        with override_settings(OCR_PAGES=2):
+            self.assertEqual(
+                parser.get_split_page_ranges(self.document_path, "application/pdf"),
+                [],
+            )
+
+    @mock.patch.object(RasterisedDocumentParser, "dispatch_split_parts")
+    def test_ocr_split(self, m_dispatch, m_ocr):
+        """
+        GIVEN:
+            - A PDF with 5 pages
+            - No other worker is available
+        WHEN:
+            - The PDF is parsed
+        THEN:
+            - All parts are OCRed by the parsing worker
+            - The archive file and text contain all pages in order
+        """
+        parser = RasterisedDocumentParser(None)
+        parser.parse(self.document_path, "application/pdf")
+
+        m_dispatch.assert_called_once()
+        self.assertEqual(m_ocr.call_count, 3)
+        self.assertDocumentParsed(parser)
+
+    @mock.patch.object(RasterisedDocumentParser, "dispatch_split_parts")
+    def test_ocr_split_outline(self, m_dispatch, m_ocr):
+        """
+        GIVEN:
+            - A PDF with 5 pages, an outline and page labels
+        WHEN:
+            - The PDF is parsed in parts
+        THEN:
+            - The archive file has the same outline, pointing to its own pages
+            - The archive file has the same page labels
+        """
+        with pikepdf.open(self.document_path, allow_overwriting_input=True) as pdf:
+            pdf.Root.Dests = pdf.make_indirect(
+                pikepdf.Dictionary(
+                    last=pikepdf.Array([pdf.pages[4].obj, pikepdf.Name.Fit]),
+                ),
+            )
+            with pdf.open_outline() as outline:
+                chapter = pikepdf.OutlineItem("Chapter", 0)
+                chapter.children.append(
+                    pikepdf.OutlineItem("Section", 3, "XYZ", left=0, top=50),
+                )
+                outline.root.append(chapter)
+                outline.root.append(
+                    pikepdf.OutlineItem("Appendix", pikepdf.Name("/last")),
+                )
+            pdf.Root.PageLabels = pdf.make_indirect(
+                pikepdf.Dictionary(
+                    Nums=pikepdf.Array(
+                        [
+                            0,
+                            pikepdf.Dictionary(S=pikepdf.Name.r),
+                            2,
+                            pikepdf.Dictionary(S=pikepdf.Name.D),
+                        ],
+                    ),
+                ),
+            )
+            pdf.save(self.document_path)
+
+        parser = RasterisedDocumentParser(None)
+        parser.parse(self.document_path, "application/pdf")
+        self.assertEqual(m_ocr.call_count, 3)
+        self.assertDocumentParsed(parser)
+
+        with pikepdf.open(parser.get_archive_path()) as pdf:
+
+            def page_of(item):
+                return pdf.pages.index(pikepdf.Page(item.destination[0]))
+
+            outline = pdf.open_outline().root
+            self.assertEqual(
+                [str(item.title) for item in outline],
+                ["Chapter", "Appendix"],
+            )
+            self.assertEqual(page_of(outline[0]), 0)
+            section = outline[0].children[0]
+            self.assertEqual(str(section.title), "Section")
+            self.assertEqual(page_of(section), 3)
+            self.assertEqual(section.destination[1], pikepdf.Name.XYZ)
+            self.assertEqual(page_of(outline[1]), 4)
+            self.assertEqual(
+                [page.label for page in pdf.pages],
+                ["i", "ii", "1", "2", "3"],
+            )
+
+    @mock.patch.object(RasterisedDocumentParser, "dispatch_split_parts")
+    def test_ocr_split_other_workers(self, m_dispatch, m_ocr):
+        """
+        GIVEN:
+            - A PDF with 5 pages
+            - Other workers OCR the parts handed out to them
+        WHEN:
+            - The PDF is parsed
+        THEN:
+            - Every part is OCRed exactly once
+            - The archive file and text contain all pages in order
+        """
+
+        def other_workers(part_dir, count, ocrmypdf_args):
+            for index in range(count):
+                self.assertTrue(ocr_split_part(part_dir, index, ocrmypdf_args))
+
+        m_dispatch.side_effect = other_workers
+
+        parser = RasterisedDocumentParser(None)
+        parser.parse(self.document_path, "application/pdf")
+
+        self.assertEqual(m_ocr.call_count, 3)
+        self.assertDocumentParsed(parser)
+
+    @mock.patch.object(RasterisedDocumentParser, "dispatch_split_parts")
+    def test_ocr_split_error(self, m_dispatch, m_ocr):
+        """
+        GIVEN:
+            - A PDF with 5 pages
+            - OCR of one of the parts fails
+        WHEN:
+            - The PDF is parsed
+        THEN:
+            - The whole document is OCRed instead
+        """
+
+        def fail_on_part(input_file, output_file, sidecar, **kwargs):
+            if "part-0001" in str(input_file):
+                raise SubprocessOutputError("Failed")
+            fake_ocr(input_file, output_file, sidecar, **kwargs)
+
+        m_ocr.side_effect = fail_on_part
+
+        parser = RasterisedDocumentParser(None)
+        parser.parse(self.document_path, "application/pdf")
+
+        self.assertEqual(m_ocr.call_count, 4)
+        self.assertEqual(m_ocr.call_args.kwargs["input_file"], self.document_path)
+        self.assertDocumentParsed(parser)
+
+    @mock.patch.object(RasterisedDocumentParser, "dispatch_split_parts")
+    def test_ocr_split_stale_claim(self, m_dispatch, m_ocr):
+        """
+        GIVEN:
+            - A PDF with 5 pages
+            - Another worker claimed a part and died before finishing it
+        WHEN:
+            - The PDF is parsed
+        THEN:
+            - The abandoned part is OCRed by the parsing worker
+            - The archive file and text contain all pages in order
+        """
+
+        def dead_worker(part_dir, count, ocrmypdf_args):
+            claim_file = part_dir / "part-0001.claim"
+            claim_file.touch()
+            os.utime(claim_file, (0, 0))
+
+        m_dispatch.side_effect = dead_worker
+
+        parser = RasterisedDocumentParser(None)
+        with self.assertLogs("paperless.parsing.tesseract", level="WARNING") as cm:
+            parser.parse(self.document_path, "application/pdf")
+
+        self.assertEqual(m_ocr.call_count, 3)
+        self.assertTrue(
+            any("pages 3 to 4 stopped responding" in line for line in cm.output),
+        )
+        self.assertDocumentParsed(parser)
+
+    @override_settings(CELERY_TASK_TIME_LIMIT=2)
+    @mock.patch.object(RasterisedDocumentParser, "dispatch_split_parts")
+    def test_ocr_split_timeout(self, m_dispatch, m_ocr):
+        """
+        GIVEN:
+            - A PDF with 5 pages
+            - Another worker claimed a part and is still busy with it
+        WHEN:
+            - The PDF is parsed and half the time left for the task passes
+        THEN:
+            - The whole document is OCRed instead, before the task is killed
+        """
+
+        def busy_worker(part_dir, count, ocrmypdf_args):
+            (part_dir / "part-0001.claim").touch()
+
+        m_dispatch.side_effect = busy_worker
+
+        parser = RasterisedDocumentParser(None)
+        parser.parse(self.document_path, "application/pdf")
+
+        self.assertEqual(m_ocr.call_count, 3)
+        self.assertEqual(m_ocr.call_args.kwargs["input_file"], self.document_path)
+        self.assertDocumentParsed(parser)
+
+    @mock.patch.object(RasterisedDocumentParser, "dispatch_split_parts")
+    def test_ocr_split_task_finished(self, m_dispatch, m_ocr):
+        """
+        GIVEN:
+            - A PDF with 5 pages
+            - The task of a part finished without OCRing the part claimed by
+              its worker
+        WHEN:
+            - The PDF is parsed
+        THEN:
+            - The part is OCRed by the parsing worker
+            - The parts are removed afterwards
+        """
+        finished = mock.Mock()
+        finished.ready.return_value = True
+
+        def lost_task(part_dir, count, ocrmypdf_args):
+            (part_dir / "part-0001.claim").write_text("other")
+            return [finished] * count
+
+        m_dispatch.side_effect = lost_task
+
+        parser = RasterisedDocumentParser(None)
+        parser.parse(self.document_path, "application/pdf")
+
+        self.assertEqual(m_ocr.call_count, 3)
+        self.assertDocumentParsed(parser)
+        self.assertEqual(
+            list((Path(self.dirs.scratch_dir) / "ocr-split").iterdir()),
+            [],
+        )
+
+    def test_ocr_split_part_taken_over(self, m_ocr):
+        """
+        GIVEN:
+            - A part of a split document
+        WHEN:
+            - The part is taken over while a worker OCRs it
+        THEN:
+            - The worker does not replace the results of the new owner
+            - OMP_THREAD_LIMIT is only set while OCRing
+        """
+        part_dir = Path(self.dirs.scratch_dir) / "split"
+        part_dir.mkdir()
+        shutil.copy(self.document_path, part_dir / "part-0000.pdf")
+        claim_file = part_dir / "part-0000.claim"
+
+        def taken_over(input_file, output_file, sidecar, **kwargs):
+            self.assertEqual(os.environ["OMP_THREAD_LIMIT"], "1")
+            fake_ocr(input_file, output_file, sidecar, **kwargs)
+            claim_file.write_text("other")
+            Path(part_dir / "part-0000-archive.pdf").write_text("new owner")
+
+        m_ocr.side_effect = taken_over
+
+        with mock.patch.dict(os.environ, {"OMP_THREAD_LIMIT": "4"}):
+            self.assertFalse(ocr_split_part(part_dir, 0, {}))
+            self.assertEqual(os.environ["OMP_THREAD_LIMIT"], "4")
+
+        self.assertEqual(
+            (part_dir / "part-0000-archive.pdf").read_text(),
+            "new owner",
+        )
+        self.assertFalse((part_dir / "part-0000.done").exists())
+        self.assertEqual(
+            sorted(path.name for path in part_dir.iterdir()),
+            ["part-0000-archive.pdf", "part-0000.claim", "part-0000.pdf"],
+        )
+
+
+def fake_ocr_skipped_pages(input_file, output_file, sidecar, **kwargs):
+    # OCRmyPDF skipped pages 2 and 3, and found no text on pages 1 and 4
+    if kwargs.get("force_ocr"):
+        fake_ocr(input_file, output_file, sidecar, **kwargs)
+    else:
+        shutil.copy(input_file, output_file)
+        Path(sidecar).write_text("\f[OCR skipped on page(s) 2-3]\f")
+
+
+@override_settings(OCR_MODE="skip")
+@mock.patch("ocrmypdf.ocr", side_effect=fake_ocr_skipped_pages)
+class TestParserFallbackOcr(DirectoriesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.document_path = Path(self.dirs.scratch_dir) / "document.pdf"
+        with pikepdf.new() as pdf:
+            for width in range(100, 104):
+                pdf.add_blank_page(page_size=(width, 100))
+            pdf.save(self.document_path)
+
+    def test_split_sidecar(self, m):
+        """
+        GIVEN:
+            - Sidecar texts with OCRed and skipped pages
+        WHEN:
+            - The sidecar texts are split into pages
+        THEN:
+            - Every page has its text, or None if it was skipped
+        """
+        self.assertEqual(
+            split_sidecar("a\f[OCR skipped on page(s) 2-3]\fb"),
+            ["a", None, None, "b"],
+        )
+        self.assertEqual(
+            split_sidecar("[OCR skipped on page(s) 1]\f\fc"),
+            [None, "", "c"],
+        )
+
+    @mock.patch(
+        "paperless_tesseract.ocr_cache.pop_page_timings",
+        return_value={1: 1.0, 2: 2.0},
+    )
+    def test_fallback_skipped_pages(self, m_timings, m_ocr):
+        """
+        GIVEN:
+            - A PDF where OCRmyPDF found no text on the pages it OCRed and
+              skipped the others
+        WHEN:
+            - The PDF is parsed
+        THEN:
+            - Only the skipped pages are OCRed again with force OCR
+            - The pages which needed the fallback and the page timings are recorded
+        """
+        parser = RasterisedDocumentParser(None)
+        parser.parse(self.document_path, "application/pdf")
+
+        self.assertEqual(m_ocr.call_count, 2)
+        fallback_args = m_ocr.call_args.kwargs
+        self.assertTrue(fallback_args["force_ocr"])
+        with pikepdf.open(fallback_args["input_file"]) as pdf:
+            self.assertEqual(len(pdf.pages), 2)
+
+        self.assertEqual(parser.get_ocr_fallback_pages(), [2, 3])
+        self.assertEqual(parser.get_text(), "page 101 page 102")
+        self.assertEqual(parser.get_ocr_page_timings(), {1: 1.0, 2: 3.0, 3: 2.0})
+
+    def test_no_fallback_all_pages_ocred(self, m):
+        """
+        GIVEN:
+            - A PDF where OCRmyPDF OCRed every page and found no text
+        WHEN:
+            - The PDF is parsed
+        THEN:
+            - The PDF is not OCRed again
+        """
+
+        def no_text(input_file, output_file, sidecar, **kwargs):
+            shutil.copy(input_file, output_file)
+            Path(sidecar).write_text("\f\f\f")
+
+        m.side_effect = no_text
+
+        parser = RasterisedDocumentParser(None)
+        parser.parse(self.document_path, "application/pdf")
+
+        m.assert_called_once()
+        self.assertEqual(parser.get_ocr_fallback_pages(), [])
+        self.assertEqual(parser.get_text(), "")
+
+    def test_fallback_whole_document(self, m):
+        """
+        GIVEN:
+            - A PDF which OCRmyPDF refuses to OCR
+        WHEN:
+            - The PDF is parsed
+        THEN:
+            - The whole PDF is OCRed again with force OCR
+        """
+
+        def input_error(input_file, output_file, sidecar, **kwargs):
+            if not kwargs.get("force_ocr"):
+                raise InputFileError("Failed")
+            fake_ocr(input_file, output_file, sidecar, **kwargs)
+
+        m.side_effect = input_error
+
+        parser = RasterisedDocumentParser(None)
+        parser.parse(self.document_path, "application/pdf")
+
+        self.assertEqual(m.call_count, 2)
+        self.assertEqual(m.call_args.kwargs["input_file"], self.document_path)
+        self.assertEqual(parser.get_ocr_fallback_pages(), [1, 2, 3, 4])
+        self.assertEqual(
+            parser.get_text(),
+            "page 100 page 101 page 102 page 103",
+        )
+
+    @override_settings(OCR_PAGES=2)
+    def test_fallback_whole_document_ocr_pages(self, m):
+        """
+        GIVEN:
+            - A PDF which OCRmyPDF refuses to OCR
+            - Only the first 2 pages are to be OCRed
+        WHEN:
+            - The PDF is parsed
+        THEN:
+            - The first 2 pages are OCRed again with force OCR
+        """
+
+        def input_error(input_file, output_file, sidecar=None, **kwargs):
+            if not kwargs.get("force_ocr"):
+                raise InputFileError("Failed")
+            shutil.copy(input_file, output_file)
+
+        m.side_effect = input_error
+
+        parser = RasterisedDocumentParser(None)
+        parser.parse(self.document_path, "application/pdf")
+
+        self.assertEqual(m.call_count, 2)
+        self.assertEqual(m.call_args.kwargs["input_file"], self.document_path)
+        self.assertEqual(m.call_args.kwargs["pages"], "1-2")
+        self.assertEqual(parser.get_ocr_fallback_pages(), [1, 2])
+
+    @override_settings(OCR_PAGES=2)
+    def test_fallback_skipped_pages_ocr_pages(self, m):
+        """
+        GIVEN:
+            - A PDF where OCRmyPDF found no text on the pages it OCRed and
+              skipped the others, including those after the pages to OCR
+            - Only the first 2 pages are to be OCRed
+        WHEN:
+            - The PDF is parsed
+        THEN:
+            - Only the skipped pages among the first 2 are OCRed again
+            - The pages to OCR are not selected again from these pages
+        """
+
+        def no_text(input_file, output_file, sidecar=None, **kwargs):
+            shutil.copy(input_file, output_file)
+            if kwargs.get("force_ocr"):
+                Path(sidecar).write_text("page 101")
+
+        m.side_effect = no_text
+
+        parser = RasterisedDocumentParser(None)
+        with mock.patch.object(
+            parser,
+            "get_page_texts",
+            return_value=["", None, None, None],
+        ):
+            parser.parse(self.document_path, "application/pdf")
+
+        self.assertEqual(m.call_count, 2)
+        fallback_args = m.call_args.kwargs
+        self.assertNotIn("pages", fallback_args)
+        with pikepdf.open(fallback_args["input_file"]) as pdf:
+            self.assertEqual(len(pdf.pages), 1)
+        self.assertEqual(parser.get_ocr_fallback_pages(), [2])
+        self.assertEqual(parser.get_text(), "page 101")
+
+
 class TestParserFileTypes(DirectoriesMixin, FileSystemAssertsMixin, TestCase):
     SAMPLE_FILES = os.path.join(os.path.dirname(__file__), "samples")
 